@@ -0,0 +1,383 @@
+"""Benchmarks of the decision tree.
+
+Run `python benchmark.py -h` for help.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from dataset import Dataset
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import find_best_split
+from decision_tree import majority_vote
+
+
+def synthetic_dataset(n_rows, n_features, n_classes=2, seed=0,
+                      cardinality=None):
+    """Generate a random dataset with learnable classes.
+
+    Parameters
+    ----------
+    n_rows: int
+        number of instances
+    n_features: int
+        number of numeric features
+    n_classes: int
+        number of classes (default to 2)
+    seed: int
+        seed of the random generator (default to 0)
+    cardinality: int
+        number of distinct values of every feature (default to None,
+        which means continuous numeric features); with a cardinality,
+        every other feature is categorical
+
+    Returns
+    -------
+    Dataset
+        the generated dataset
+    """
+    rng = np.random.RandomState(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    weights = rng.normal(size=n_features)
+    scores = X @ weights + rng.normal(scale=0.5, size=n_rows)
+    edges = np.quantile(scores, np.linspace(0, 1, n_classes + 1)[1:-1])
+    y = np.searchsorted(edges, scores)
+    classes = [f'class{i}' for i in range(n_classes)]
+    if cardinality is None:
+        return Dataset(X, y, classes)
+
+    categories = []
+    for col in range(n_features):
+        levels = np.quantile(X[:, col], np.linspace(0, 1, cardinality + 1))
+        X[:, col] = np.clip(np.searchsorted(levels[1:-1], X[:, col]), 0,
+                            cardinality - 1)
+        categories.append([f'level{i}' for i in range(cardinality)]
+                          if col % 2 else None)
+    return Dataset(X, y, classes, categories)
+
+
+def dataset_rows(data):
+    """Turn the rows of a dataset back into a list of instances."""
+    columns = []
+    for col in range(data.n_features):
+        values = data.column(col)
+        if not data.is_numeric(col):
+            values = np.array(data.categories[col], dtype=object)[
+                values.astype(np.intp)]
+        columns.append(values.tolist())
+    classes = np.array(data.classes, dtype=object)
+    columns.append(classes[data.labels()].tolist())
+    return [list(row) for row in zip(*columns)]
+
+
+def best_time(func, *args, repeat=3, **kwargs):
+    """Return the shortest wall time of repeat calls of func, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def peak_memory(func, *args, **kwargs):
+    """Return the peak memory allocated by a call of func, in bytes.
+
+    Allocations are traced by tracemalloc, which also sees the NumPy
+    arrays. The call is not timed, since tracing slows it down.
+    """
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def hot_paths(data, repeat=3, **tree_options):
+    """Time and measure the main functions of decision_tree on data.
+
+    Parameters
+    ----------
+    data: Dataset
+        the training data
+    repeat: int
+        number of timed calls per function (default to 3)
+    tree_options:
+        other keyword arguments of build_tree
+
+    Returns
+    -------
+    list[dict]
+        for every function, its name, its best time in seconds and its
+        peak memory in bytes
+    """
+    tree = build_tree(data, **tree_options)
+    rows = dataset_rows(data)
+    leaves = classify(data, tree)
+
+    def classify_rows():
+        for row in rows:
+            classify(row, tree)
+
+    def vote():
+        for leaf in leaves:
+            majority_vote(leaf)
+
+    calls = [
+        ('find_best_split', find_best_split, (data,), {}),
+        ('build_tree', build_tree, (data,), tree_options),
+        ('classify', classify, (data, tree), {}),
+        ('classify_rows', classify_rows, (), {}),
+        ('majority_vote', vote, (), {}),
+    ]
+    results = []
+    for name, func, args, kwargs in calls:
+        results.append({
+            'function': name,
+            'seconds': best_time(func, *args, repeat=repeat, **kwargs),
+            'peak_bytes': peak_memory(func, *args, **kwargs),
+        })
+
+    return results
+
+
+def environment():
+    """Describe the machine and the commit the benchmarks ran on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(rows, features, cardinalities, classes, repeat=3, seed=0,
+              **tree_options):
+    """Benchmark the hot paths on a grid of synthetic datasets.
+
+    Parameters
+    ----------
+    rows, features, cardinalities, classes: list
+        the numbers of instances, features, distinct values (None for
+        continuous features) and classes of the datasets; every
+        combination is benchmarked
+    repeat: int
+        number of timed calls per function (default to 3)
+    seed: int
+        seed of the generated datasets (default to 0)
+    tree_options:
+        other keyword arguments of build_tree
+
+    Returns
+    -------
+    dict
+        the environment, the tree options and one record per dataset
+        and function
+    """
+    records = []
+    for n_rows, n_features, cardinality, n_classes in itertools.product(
+            rows, features, cardinalities, classes):
+        data = synthetic_dataset(n_rows, n_features, n_classes, seed,
+                                 cardinality)
+        case = {'rows': n_rows, 'features': n_features,
+                'cardinality': cardinality, 'classes': n_classes}
+        for result in hot_paths(data, repeat, **tree_options):
+            records.append(dict(case, **result))
+
+    return {'environment': environment(), 'tree_options': tree_options,
+            'results': records}
+
+
+def compare(old, new):
+    """Match the records of two suite results.
+
+    Parameters
+    ----------
+    old, new: dict
+        results of run_suite, as read from their JSON files
+
+    Returns
+    -------
+    list[(dict, float, float)]
+        for every record of new also in old, the new record and the
+        ratios of its time and of its peak memory to the old ones
+    """
+    def key(record):
+        return (record['rows'], record['features'], record['cardinality'],
+                record['classes'], record['function'])
+
+    before = {key(record): record for record in old['results']}
+    matches = []
+    for record in new['results']:
+        if key(record) not in before:
+            continue
+        previous = before[key(record)]
+        matches.append((record,
+                        record['seconds'] / previous['seconds'],
+                        record['peak_bytes'] / max(previous['peak_bytes'], 1)))
+
+    return matches
+
+
+def parallel_scaling(data, jobs, repeat=3, **tree_options):
+    """Time build_tree for several numbers of threads.
+
+    Parameters
+    ----------
+    data: Dataset
+        the training data
+    jobs: list[int]
+        the numbers of threads to try; the first one is the reference
+    repeat: int
+        number of timed builds per number of threads (default to 3)
+    tree_options:
+        other keyword arguments of build_tree
+
+    Returns
+    -------
+    list[(int, float, float)]
+        for every number of threads, the best time in seconds and the
+        speedup over the reference
+    """
+    results = []
+    for n_jobs in jobs:
+        seconds = best_time(build_tree, data, repeat=repeat, n_jobs=n_jobs,
+                            **tree_options)
+        results.append((n_jobs, seconds, results[0][1] / seconds
+                        if results else 1.0))
+
+    return results
+
+
+def scaling_command(args):
+    """Print the speedup of build_tree against the number of threads."""
+    data = synthetic_dataset(args.rows, args.features)
+    jobs = [1]
+    while jobs[-1] * 2 <= args.max_jobs:
+        jobs.append(jobs[-1] * 2)
+    if jobs[-1] != args.max_jobs:
+        jobs.append(args.max_jobs)
+
+    print(f'{args.rows} rows, {args.features} features, '
+          f'max_depth={args.max_depth}, max_bins={args.max_bins}')
+    print('n_jobs   seconds   speedup')
+    for n_jobs, seconds, speedup in parallel_scaling(
+            data, jobs, max_depth=args.max_depth, max_bins=args.max_bins):
+        print(f'{n_jobs:>6}   {seconds:>7.3f}   {speedup:>7.2f}')
+
+
+def suite_command(args):
+    """Run the benchmark suite and write its results to a JSON file."""
+    cardinalities = [None if c == 0 else c for c in args.cardinality]
+    results = run_suite(args.rows, args.features, cardinalities,
+                        args.classes, repeat=args.repeat, seed=args.seed,
+                        max_depth=args.max_depth, max_bins=args.max_bins)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print('   rows  features  card.  classes  function          '
+          'seconds    peak MB')
+    for record in results['results']:
+        print(f"{record['rows']:>7}  {record['features']:>8}  "
+              f"{record['cardinality'] or '-':>5}  {record['classes']:>7}  "
+              f"{record['function']:<16}  {record['seconds']:>7.4f}  "
+              f"{record['peak_bytes'] / 2 ** 20:>9.2f}")
+
+
+def compare_command(args):
+    """Print the time and memory ratios between two suite results."""
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print('   rows  features  card.  classes  function          '
+          'time ratio  memory ratio')
+    for record, seconds, peak in compare(old, new):
+        print(f"{record['rows']:>7}  {record['features']:>8}  "
+              f"{record['cardinality'] or '-':>5}  {record['classes']:>7}  "
+              f"{record['function']:<16}  {seconds:>10.2f}  {peak:>12.2f}")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        prog='python benchmark.py',
+        description='Benchmarks of the decision tree.'
+    )
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    scaling = commands.add_parser(
+        'scaling', help='Time build_tree against the number of threads.')
+    scaling.add_argument('--rows', type=int, default=200000,
+                         help='Number of instances (default to 200000).')
+    scaling.add_argument('--features', type=int, default=32,
+                         help='Number of features (default to 32).')
+    scaling.add_argument('--max-depth', type=int, default=6,
+                         help='Depth of the trees (default to 6).')
+    scaling.add_argument('--max-bins', type=int, default=None,
+                         help='Bins per feature (default to None).')
+    scaling.add_argument('--max-jobs', type=int, default=os.cpu_count(),
+                         help='Largest number of threads '
+                              '(default to the number of CPUs).')
+    scaling.set_defaults(func=scaling_command)
+
+    suite = commands.add_parser(
+        'suite', help='Time find_best_split, build_tree, classify and '
+                      'majority_vote on synthetic datasets.')
+    suite.add_argument('--rows', type=int, nargs='+',
+                       default=[1000, 10000, 100000],
+                       help='Numbers of instances '
+                            '(default to 1000 10000 100000).')
+    suite.add_argument('--features', type=int, nargs='+', default=[8, 32],
+                       help='Numbers of features (default to 8 32).')
+    suite.add_argument('--cardinality', type=int, nargs='+',
+                       default=[0, 16],
+                       help='Numbers of distinct values per feature, 0 '
+                            'for continuous features (default to 0 16).')
+    suite.add_argument('--classes', type=int, nargs='+', default=[2, 5],
+                       help='Numbers of classes (default to 2 5).')
+    suite.add_argument('--max-depth', type=int, default=8,
+                       help='Depth of the trees (default to 8).')
+    suite.add_argument('--max-bins', type=int, default=None,
+                       help='Bins per feature (default to None).')
+    suite.add_argument('--repeat', type=int, default=3,
+                       help='Timed calls per function (default to 3).')
+    suite.add_argument('--seed', type=int, default=0,
+                       help='Seed of the datasets (default to 0).')
+    suite.add_argument('--output', default='benchmark.json',
+                       help='JSON file of the results '
+                            '(default to benchmark.json).')
+    suite.set_defaults(func=suite_command)
+
+    compare_parser = commands.add_parser(
+        'compare', help='Compare two JSON files written by suite.')
+    compare_parser.add_argument('old', help='Results of the reference.')
+    compare_parser.add_argument('new', help='Results to be compared.')
+    compare_parser.set_defaults(func=compare_command)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
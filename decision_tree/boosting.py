@@ -0,0 +1,321 @@
+"""Gradient-boosted regression trees."""
+import numpy as np
+
+from compiled import compile_tree
+from dataset import Dataset
+from dataset import encode_rows
+from decision_tree import Question
+from decision_tree import RegressionLeaf
+from decision_tree import grow_tree
+from splitter import column_mapper
+from splitter import gradient_histogram
+from splitter import gradient_split
+
+
+class SquaredError:
+    """Squared error loss, (target - score)**2 / 2."""
+
+    @staticmethod
+    def initial_score(targets):
+        return float(np.mean(targets))
+
+    @staticmethod
+    def gradients(targets, scores):
+        return scores - targets, np.ones_like(scores)
+
+    @staticmethod
+    def loss(targets, scores):
+        return float(np.mean((targets - scores) ** 2) / 2)
+
+
+class LogLoss:
+    """Binary log loss of the probability 1 / (1 + exp(-score))."""
+
+    @staticmethod
+    def initial_score(targets):
+        p = np.clip(np.mean(targets), 1e-12, 1 - 1e-12)
+        return float(np.log(p / (1 - p)))
+
+    @staticmethod
+    def gradients(targets, scores):
+        p = 1 / (1 + np.exp(-scores))
+        return p - targets, p * (1 - p)
+
+    @staticmethod
+    def loss(targets, scores):
+        return float(np.mean(np.logaddexp(0, scores) - targets * scores))
+
+
+LOSSES = {'squared_error': SquaredError, 'log_loss': LogLoss}
+
+
+class GradientBoosting:
+    """Gradient-boosted regression trees.
+
+    Every round grows a tree on the gradients and hessians of the loss
+    at the current scores, with the same `grow_tree` machinery as
+    `build_tree`. The features are binned once for all rounds, every
+    node is searched on its gradient histogram, and the histogram of
+    the larger child of a split is the parent's minus its sibling's.
+    The training scores are updated from the rows of every leaf, and
+    the validation scores from the compiled tree, both in one
+    vectorized step per round.
+
+    Attributes
+    ----------
+    trees: list
+        the root nodes of the trees, once fitted
+    compiled: list[CompiledTree]
+        the trees flattened for prediction, once fitted
+    initial_score: float
+        score of every row before the first tree
+    classes: list
+        with the log loss, the negative and the positive class
+    training_loss: list[float]
+        loss on the training data after every round
+    validation_loss: list[float]
+        loss on the validation data after every round
+    best_round: int
+        number of trees kept
+
+    Methods
+    -------
+    fit(rows, targets=None, validation=None, headers=None)
+        Grow the trees.
+    decision_function(X)
+        Raw score of every row.
+    predict(X)
+        Predicted target or class of every row.
+    predict_proba(X)
+        Class probabilities of every row, with the log loss.
+    """
+
+    def __init__(self, loss='squared_error', n_rounds=100,
+                 learning_rate=0.1, max_depth=3, max_leaf_nodes=None,
+                 min_samples_leaf=20, l2_regularization=1.0, max_bins=255,
+                 early_stopping_rounds=None, n_jobs=None):
+        """Initialize a gradient boosting model.
+
+        Parameters
+        ----------
+        loss: {'squared_error', 'log_loss'}, optional
+            Loss minimized (default is 'squared_error').
+        n_rounds: int, optional
+            Largest number of trees (default is 100).
+        learning_rate: float, optional
+            Shrinkage applied to the values of the leaves (default is
+            0.1).
+        max_depth: int, optional
+            Largest depth of the trees (default is 3).
+        max_leaf_nodes: int, optional
+            Largest number of leaves of the trees, grown best first
+            (default is None, which means unlimited).
+        min_samples_leaf: int, optional
+            Smallest number of rows of a leaf (default is 20).
+        l2_regularization: float, optional
+            L2 penalty on the values of the leaves (default is 1.0).
+        max_bins: int, optional
+            Largest number of bins of a numeric feature (default is 255).
+        early_stopping_rounds: int, optional
+            Stop once the validation loss has not improved for this many
+            rounds (default is None, which means never).
+        n_jobs: int, optional
+            Number of threads counting and scoring the features of large
+            nodes (default is None, which means 1).
+        """
+        self.loss = loss
+        self.n_rounds = n_rounds
+        self.learning_rate = learning_rate
+        self.max_depth = max_depth
+        self.max_leaf_nodes = max_leaf_nodes
+        self.min_samples_leaf = min_samples_leaf
+        self.l2_regularization = l2_regularization
+        self.max_bins = max_bins
+        self.early_stopping_rounds = early_stopping_rounds
+        self.n_jobs = n_jobs
+        self.trees = []
+        self.compiled = []
+        self.initial_score = 0.0
+        self.classes = []
+        self.categories = []
+        self.training_loss = []
+        self.validation_loss = []
+        self.best_round = 0
+
+    def _targets(self, data):
+        """Numeric targets of a dataset from its class names."""
+        if self.loss == 'log_loss':
+            if len(data.classes) != 2:
+                raise ValueError('log_loss needs exactly two classes, got '
+                                 f'{len(data.classes)}')
+            return (data.y == 1).astype(float)
+        return np.asarray(data.classes, dtype=float)[data.y]
+
+    def _validation_set(self, validation):
+        """Feature matrix and targets of validation data."""
+        if isinstance(validation, tuple):
+            X, targets = validation
+            return np.asarray(X, dtype=float), np.asarray(targets, float)
+
+        X = encode_rows(validation, self.categories)
+        labels = [row[-1] for row in validation]
+        if self.loss == 'log_loss':
+            return X, np.array([label == self.classes[1]
+                                for label in labels], dtype=float)
+        return X, np.asarray(labels, dtype=float)
+
+    def fit(self, rows, targets=None, validation=None, headers=None):
+        """Grow the trees.
+
+        Parameters
+        ----------
+        rows: list or Dataset
+            the training instances
+        targets: numpy.ndarray
+            target of every row (default to None, which means the class
+            names as numbers with the squared error, and whether the
+            class is the second one with the log loss)
+        validation: list or (numpy.ndarray, numpy.ndarray)
+            instances, or a feature matrix encoded like rows and its
+            targets, on which the loss is tracked for early stopping
+            (default to None)
+        headers: list[str]
+            list of names of the features (default to None)
+
+        Returns
+        -------
+        GradientBoosting
+            the fitted model
+        """
+        loss = LOSSES[self.loss]
+        data = rows
+        if not isinstance(data, Dataset):
+            data = Dataset.from_rows(rows, headers)
+        if targets is None:
+            targets = self._targets(data)
+        targets = np.asarray(targets, dtype=float)
+        self.classes = list(data.classes)
+        self.categories = data.categories
+        data = data.binned(self.max_bins)
+
+        self.initial_score = loss.initial_score(targets[data.indices])
+        scores = np.full(len(targets), self.initial_score)
+        if validation is not None:
+            X_valid, y_valid = self._validation_set(validation)
+            valid_scores = np.full(len(y_valid), self.initial_score)
+
+        self.trees, self.compiled = [], []
+        self.training_loss, self.validation_loss = [], []
+        best_loss = np.inf
+        l2 = self.l2_regularization
+        for _ in range(self.n_rounds):
+            grad, hess = loss.gradients(targets, scores)
+            update = np.zeros(len(targets))
+
+            def find_split(rows, hist, columns):
+                column, value, gain, missing = gradient_split(
+                    rows, hist, l2, self.min_samples_leaf,
+                    column_mapper(self.n_jobs, len(rows)), columns)
+                if column is None:
+                    return None, 0
+                return Question(column, value, headers, missing), gain
+
+            def count(rows):
+                return gradient_histogram(
+                    rows, grad, hess, column_mapper(self.n_jobs, len(rows)))
+
+            def make_leaf(rows):
+                value = (-self.learning_rate * grad[rows.indices].sum()
+                         / (hess[rows.indices].sum() + l2))
+                update[rows.indices] = value
+                return RegressionLeaf(value, len(rows))
+
+            tree = grow_tree(data, find_split, make_leaf, count,
+                             max_depth=self.max_depth,
+                             min_samples_split=2 * self.min_samples_leaf,
+                             max_leaf_nodes=self.max_leaf_nodes,
+                             priority=lambda rows, gain: gain)
+            scores += update
+            self.trees.append(tree)
+            self.compiled.append(compile_tree(tree, data))
+            self.training_loss.append(loss.loss(targets[data.indices],
+                                                scores[data.indices]))
+
+            if validation is None:
+                continue
+            valid_scores += self.compiled[-1].predict_value(X_valid)
+            self.validation_loss.append(loss.loss(y_valid, valid_scores))
+            if self.validation_loss[-1] < best_loss:
+                best_loss = self.validation_loss[-1]
+                self.best_round = len(self.trees)
+            elif (self.early_stopping_rounds is not None
+                  and len(self.trees) - self.best_round
+                  >= self.early_stopping_rounds):
+                break
+
+        if validation is None:
+            self.best_round = len(self.trees)
+        del self.trees[self.best_round:], self.compiled[self.best_round:]
+        return self
+
+    def decision_function(self, X):
+        """Raw score of every row.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            feature matrix encoded like the training Dataset, or a list
+            of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            float array of shape (n_samples,)
+        """
+        if not isinstance(X, np.ndarray):
+            X = encode_rows(X, self.categories)
+        scores = np.full(len(X), self.initial_score)
+        for tree in self.compiled:
+            scores += tree.predict_value(X)
+
+        return scores
+
+    def predict(self, X):
+        """Predicted target or class of every row.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            feature matrix encoded like the training Dataset, or a list
+            of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            the scores with the squared error, the class names with the
+            log loss
+        """
+        scores = self.decision_function(X)
+        if self.loss != 'log_loss':
+            return scores
+        classes = np.empty(2, dtype=object)
+        classes[:] = self.classes
+        return classes[(scores > 0).astype(int)]
+
+    def predict_proba(self, X):
+        """Class probabilities of every row, with the log loss.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            feature matrix encoded like the training Dataset, or a list
+            of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (n_samples, 2); column i holds the
+            probability of class classes[i]
+        """
+        p = 1 / (1 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1 - p, p])
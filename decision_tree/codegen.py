@@ -0,0 +1,265 @@
+"""Generate Python source code scoring a decision tree.
+
+The generated module only imports NumPy. Its `predict(row)` walks the
+tree as nested `if` statements on the raw values of an instance, and
+its `predict_batch(X)` evaluates every question once on a whole feature
+matrix, combines the masks down the tree in straight-line code, and
+picks the prediction of every row with `np.select`. That costs one
+pass over the rows per node, so for deep trees the level-by-level walk
+of `CompiledTree.predict_batch` is faster on large batches.
+"""
+import math
+import types
+
+import numpy as np
+
+from compiled import CompiledTree
+from compiled import compile_tree
+
+# Deepest nesting of `if` statements in one generated function; deeper
+# subtrees get functions of their own, as Python limits indentation.
+MAX_NESTING = 40
+
+_HEADER = '''"""Decision tree generated by codegen.py."""
+import numpy as np
+
+'''
+
+_ENCODE = '''
+
+def encode(rows):
+    """Turn a list of instances into the feature matrix of predict_batch.
+
+    Categories are replaced by their codes, unknown ones by -1, and
+    missing values, None or NaN, by NaN.
+    """
+    X = np.empty((len(rows), N_FEATURES))
+    for i, row in enumerate(rows):
+        for j, codes in enumerate(CATEGORIES):
+            val = row[j]
+            if val is None or val != val:
+                X[i, j] = np.nan
+            elif codes is None:
+                X[i, j] = val
+            else:
+                X[i, j] = codes.get(val, -1)
+    return X
+'''
+
+
+def _literal(value):
+    """Python source of a number, string or class name."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return f"float('{value}')"
+    return repr(value)
+
+
+class _Generator:
+    """Write the source of the functions of a compiled tree."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.helpers = []
+
+    def category(self, column, code):
+        return self.tree.categories[column][int(code)]
+
+    def set_codes(self, i):
+        start, end = np.searchsorted(self.tree.set_node, [i, i + 1])
+        return [int(code) for code in self.tree.set_code[start:end]]
+
+    def leaf_value(self, i):
+        tree = self.tree
+        if tree.prediction[i] < 0:
+            return _literal(float(tree.value[i]))
+        return _literal(tree.classes[int(tree.prediction[i])])
+
+    def row_condition(self, i):
+        """Condition of the question of node i on an instance."""
+        tree = self.tree
+        column = int(tree.feature[i])
+        val = f'row[{column}]'
+        is_missing = f'{val} is None or {val} != {val}'
+        if tree.numeric[i]:
+            threshold = _literal(float(tree.threshold[i]))
+            if tree.missing[i]:
+                # NaN fails every comparison, so it passes this one.
+                return f'{val} is None or not {val} < {threshold}'
+            return f'{val} is not None and {val} >= {threshold}'
+
+        if tree.subset[i]:
+            values = [self.category(column, code)
+                      for code in self.set_codes(i)]
+            condition = (f'{val} in {{'
+                         + ', '.join(_literal(value) for value in values)
+                         + '}')
+        elif tree.threshold[i] >= 0:
+            value = self.category(column, tree.threshold[i])
+            condition = f'{val} == {_literal(value)}'
+        else:
+            condition = 'False'
+        if tree.missing[i]:
+            return f'{condition} or {is_missing}'
+        return condition
+
+    def comment(self, i):
+        headers = self.tree.headers
+        if headers is None:
+            return ''
+        return f'  # {headers[int(self.tree.feature[i])]}'
+
+    def row_function(self, name, root):
+        """Source of the function scoring the subtree of root on an
+        instance."""
+        lines = [f'def {name}(row):']
+        stack = [(root, 1)]
+        # Each item is a node, or the line closing a true branch.
+        while stack:
+            item, depth = stack.pop()
+            indent = '    ' * depth
+            if isinstance(item, str):
+                lines.append(indent + item)
+                continue
+            i = item
+            if self.tree.feature[i] < 0:
+                lines.append(f'{indent}return {self.leaf_value(i)}')
+            elif depth > MAX_NESTING:
+                helper = f'_node_{i}'
+                self.helpers.append(self.row_function(helper, i))
+                lines.append(f'{indent}return {helper}(row)')
+            else:
+                lines.append(f'{indent}if {self.row_condition(i)}:'
+                             f'{self.comment(i)}')
+                stack.append((int(self.tree.false_child[i]), depth + 1))
+                stack.append(('else:', depth))
+                stack.append((int(self.tree.true_child[i]), depth + 1))
+        return '\n'.join(lines)
+
+    def batch_condition(self, i):
+        """Condition of the question of node i on a feature matrix."""
+        tree = self.tree
+        val = f'X[:, {int(tree.feature[i])}]'
+        if tree.numeric[i]:
+            threshold = _literal(float(tree.threshold[i]))
+            if tree.missing[i]:
+                return f'~({val} < {threshold})'
+            return f'{val} >= {threshold}'
+
+        if tree.subset[i]:
+            condition = f'np.isin({val}, {self.set_codes(i)})'
+        else:
+            condition = f'{val} == {_literal(float(tree.threshold[i]))}'
+        if tree.missing[i]:
+            return f'({condition}) | np.isnan({val})'
+        return condition
+
+    def batch_function(self):
+        """Source of the function scoring a feature matrix."""
+        tree = self.tree
+        lines = [
+            'def predict_batch(X):',
+            '    """Predict every row of a feature matrix, or of a list of',
+            '    instances."""',
+            '    if not isinstance(X, np.ndarray):',
+            '        X = encode(X)',
+            '    m0 = np.ones(len(X), dtype=bool)',
+        ]
+        masks, values = [], []
+        for i in range(len(tree)):
+            if tree.feature[i] < 0:
+                masks.append(f'm{i}')
+                values.append(self.leaf_value(i))
+                continue
+            lines.append(f'    c{i} = {self.batch_condition(i)}')
+            lines.append(f'    m{int(tree.true_child[i])} = m{i} & c{i}')
+            lines.append(f'    m{int(tree.false_child[i])} = m{i} & ~c{i}')
+        regression = tree.prediction[tree.feature < 0].min() < 0
+        dtype = 'float' if regression else 'object'
+        lines.append(f'    values = np.array([{", ".join(values)}], '
+                     f'dtype={dtype})')
+        lines.append(f'    leaf = np.select([{", ".join(masks)}], '
+                     f'range({len(masks)}))')
+        lines.append('    return values[leaf]')
+        return '\n'.join(lines)
+
+
+def to_source(tree, data=None):
+    """Generate the source of a Python module scoring a decision tree.
+
+    Parameters
+    ----------
+    tree: Leaf, Node, or CompiledTree
+        the decision tree
+    data: Dataset
+        the dataset whose encoding the feature matrices of
+        predict_batch use (default to None, which means the encoding of
+        `compile_tree`)
+
+    Returns
+    -------
+    str
+        the source of a module defining `predict(row)`, returning the
+        class name or number predicted for an instance, `encode(rows)`,
+        and `predict_batch(X)`, returning those of every row of a
+        feature matrix or list of instances
+    """
+    if not isinstance(tree, CompiledTree):
+        tree = compile_tree(tree, data)
+    generator = _Generator(tree)
+    predict = generator.row_function('predict', 0)
+    functions = [predict] + generator.helpers + [generator.batch_function()]
+
+    categories = [None if cats is None
+                  else {val: code for code, val in enumerate(cats)}
+                  for cats in tree.categories]
+    n_features = max(len(categories), int(tree.feature.max()) + 1)
+    categories += [None] * (n_features - len(categories))
+    constants = [
+        'CLASSES = [' + ', '.join(_literal(label) for label in tree.classes)
+        + ']',
+        f'N_FEATURES = {n_features}',
+        'CATEGORIES = [' + ', '.join(
+            'None' if codes is None else '{' + ', '.join(
+                f'{_literal(val)}: {code}' for val, code in codes.items())
+            + '}' for codes in categories) + ']',
+    ]
+    return (_HEADER + '\n'.join(constants) + '\n' + _ENCODE + '\n\n'
+            + '\n\n\n'.join(functions) + '\n')
+
+
+def export_tree(tree, path, data=None):
+    """Write the module generated by `to_source` to a file.
+
+    Parameters
+    ----------
+    tree: Leaf, Node, or CompiledTree
+        the decision tree
+    path: str
+        path of the .py file written
+    data: Dataset
+        the dataset whose encoding predict_batch uses (default to None)
+    """
+    with open(path, 'w') as f:
+        f.write(to_source(tree, data))
+
+
+def load_source(source, name='generated_tree'):
+    """Run generated source as a new module.
+
+    Parameters
+    ----------
+    source: str
+        source returned by `to_source`
+    name: str
+        name of the module (default to 'generated_tree')
+
+    Returns
+    -------
+    module
+        the module, with its predict and predict_batch functions
+    """
+    module = types.ModuleType(name)
+    exec(compile(source, f'<{name}>', 'exec'), module.__dict__)
+    return module
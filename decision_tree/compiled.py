@@ -0,0 +1,405 @@
+"""Flat-array representation of decision trees for batch prediction."""
+import numpy as np
+
+from dataset import encode_rows
+from dataset import is_numeric
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import Question
+from decision_tree import RegressionLeaf
+from decision_tree import majority_vote
+
+
+class CompiledTree:
+    """A decision tree flattened into parallel arrays.
+
+    Node 0 is the root. Internal nodes ask whether the value of feature
+    `feature[i]` is `>=` (numeric) or `==` (categorical) to
+    `threshold[i]`; categorical values are compared by their code in
+    `categories`. A categorical question of node i with `subset[i]` asks
+    instead whether the code is one of the `set_code` entries whose
+    `set_node` is i. Missing values, NaN, match the question of node i
+    if `missing[i]`. Leaves have a feature of -1.
+
+    Attributes
+    ----------
+    feature: numpy.ndarray
+        int array, column number of the question of each node
+    threshold: numpy.ndarray
+        float array, value or category code of the question of each node
+    numeric: numpy.ndarray
+        bool array, whether the question of each node is a `>=` one
+    true_child: numpy.ndarray
+        int array, node reached when the question is true
+    false_child: numpy.ndarray
+        int array, node reached when the question is false
+    counts: numpy.ndarray
+        array of shape (n_nodes, n_classes), class counts of each leaf
+    prediction: numpy.ndarray
+        int array, class code voted by each leaf
+    value: numpy.ndarray
+        float array, number predicted by each RegressionLeaf
+    missing: numpy.ndarray
+        bool array, whether missing values match the question of each
+        node
+    subset: numpy.ndarray
+        bool array, whether the question of each node asks for a set of
+        categories
+    set_node: numpy.ndarray
+        int array, in increasing order, node of every category of the
+        sets
+    set_code: numpy.ndarray
+        int array, code of every category of the sets, in increasing
+        order within a node
+    classes: list
+        class names; code i stands for classes[i]
+    categories: list
+        for every feature, None if it is numeric, otherwise the list of
+        its values, empty if the tree ignores it; code i stands for
+        categories[column][i]
+    headers: list[str]
+        list of names of the features (default to None)
+
+    Methods
+    -------
+    encode(rows)
+        Turn a list of instances into a feature matrix.
+    apply(X)
+        Find the leaf of every row of a feature matrix.
+    predict_batch(X)
+        Classify every row of a feature matrix.
+    predict_proba(X)
+        Class probabilities of every row of a feature matrix.
+    predict_value(X)
+        Number predicted for every row of a feature matrix.
+    to_node()
+        Rebuild the tree of Node and Leaf objects.
+    """
+
+    def __init__(self, feature, threshold, numeric, true_child, false_child,
+                 counts, prediction, classes, categories, headers=None,
+                 value=None, missing=None, subset=None, set_node=None,
+                 set_code=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.numeric = numeric
+        self.true_child = true_child
+        self.false_child = false_child
+        self.counts = counts
+        self.prediction = prediction
+        self.classes = classes
+        self.categories = categories
+        self.headers = headers
+        if value is None:
+            value = np.zeros(len(feature))
+        self.value = value
+        if missing is None:
+            missing = np.zeros(len(feature), dtype=bool)
+        self.missing = missing
+        if subset is None:
+            subset = np.zeros(len(feature), dtype=bool)
+        self.subset = subset
+        if set_node is None:
+            set_node = np.zeros(0, dtype=np.intp)
+        self.set_node = set_node
+        if set_code is None:
+            set_code = np.zeros(0, dtype=np.intp)
+        self.set_code = set_code
+
+    def __len__(self):
+        return len(self.feature)
+
+    def encode(self, rows):
+        """Turn a list of instances into a feature matrix.
+
+        Categories never seen by the tree are encoded as -1, which
+        matches no question, and missing values as NaN.
+
+        Parameters
+        ----------
+        rows: list
+            a list of instances; a trailing class name is ignored
+
+        Returns
+        -------
+        numpy.ndarray
+            float array of shape (len(rows), n_features)
+        """
+        return encode_rows(rows, self.categories)
+
+    def apply(self, X):
+        """Find the leaf of every row of a feature matrix.
+
+        All rows go down the tree together, one level per step, so the
+        loop runs as many times as the tree is deep. Missing values are
+        routed by a mask like any other value, and a value is looked up
+        in the set of categories of its node by a binary search on the
+        sorted (node, code) pairs.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            float array of shape (n_samples, n_features) encoded like
+            `encode` does, or a list of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            int array of shape (n_samples,), the leaf of every row
+        """
+        if not isinstance(X, np.ndarray):
+            X = self.encode(X)
+        nodes = np.zeros(len(X), dtype=np.intp)
+        active = np.flatnonzero(self.feature[nodes] >= 0)
+        stride = int(self.set_code.max()) + 1 if len(self.set_code) else 1
+        keys = self.set_node.astype(np.int64) * stride + self.set_code
+        while len(active) > 0:
+            current = nodes[active]
+            values = X[active, self.feature[current]]
+            threshold = self.threshold[current]
+            matches = np.where(self.numeric[current], values >= threshold,
+                               values == threshold)
+            in_set = np.flatnonzero(self.subset[current])
+            if len(in_set) > 0:
+                codes = values[in_set]
+                known = (codes >= 0) & (codes < stride)
+                wanted = (current[in_set].astype(np.int64) * stride
+                          + np.where(known, codes, 0).astype(np.int64))
+                found = np.searchsorted(keys, wanted)
+                hit = found < len(keys)
+                hit[hit] = keys[found[hit]] == wanted[hit]
+                matches[in_set] = known & hit
+            matches |= self.missing[current] & np.isnan(values)
+            current = np.where(matches, self.true_child[current],
+                               self.false_child[current])
+            nodes[active] = current
+            active = active[self.feature[current] >= 0]
+
+        return nodes
+
+    def predict_batch(self, X):
+        """Classify every row of a feature matrix.
+
+        Each row gets the class `majority_vote` gives to its leaf.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            float array of shape (n_samples, n_features) encoded like
+            `encode` does, or a list of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (n_samples,) of class names
+        """
+        classes = np.empty(len(self.classes), dtype=object)
+        classes[:] = self.classes
+        return classes[self.prediction[self.apply(X)]]
+
+    def predict_proba(self, X):
+        """Class probabilities of every row of a feature matrix.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            float array of shape (n_samples, n_features) encoded like
+            `encode` does, or a list of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (n_samples, n_classes); column i holds the
+            share of the instances of class classes[i] in the leaf
+        """
+        counts = self.counts[self.apply(X)]
+        return counts / counts.sum(axis=1, keepdims=True)
+
+    def predict_value(self, X):
+        """Number predicted for every row of a feature matrix.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            float array of shape (n_samples, n_features) encoded like
+            `encode` does, or a list of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            float array of shape (n_samples,), the value of the
+            RegressionLeaf of every row
+        """
+        return self.value[self.apply(X)]
+
+    def to_node(self):
+        """Rebuild the tree of Node and Leaf objects.
+
+        The questions hold the feature values and headers again, so the
+        tree can be printed by `print_tree` and used by `classify`.
+
+        Returns
+        -------
+        Leaf or Node
+            the root of the tree
+        """
+        nodes = [None] * len(self)
+        # Children have larger numbers than their parent.
+        for i in reversed(range(len(self))):
+            if self.feature[i] >= 0:
+                column = int(self.feature[i])
+                value = float(self.threshold[i])
+                if self.subset[i]:
+                    start, end = np.searchsorted(self.set_node, [i, i + 1])
+                    value = frozenset(self.categories[column][int(code)]
+                                      for code in self.set_code[start:end])
+                elif not self.numeric[i]:
+                    value = self.categories[column][int(value)]
+                question = Question(column, value, self.headers,
+                                    bool(self.missing[i]))
+                nodes[i] = Node(question, nodes[self.true_child[i]],
+                                nodes[self.false_child[i]])
+            elif self.prediction[i] < 0:
+                nodes[i] = RegressionLeaf(float(self.value[i]), 0)
+            else:
+                # The voted class comes first, so ties keep the same vote.
+                order = [int(self.prediction[i])] + [
+                    code for code in range(len(self.classes))
+                    if code != self.prediction[i] and self.counts[i, code]]
+                leaf = object.__new__(Leaf)
+                leaf.predictions = {self.classes[code]:
+                                    _count(self.counts[i, code])
+                                    for code in order}
+                nodes[i] = leaf
+
+        return nodes[0]
+
+
+def _count(count):
+    """A class count as an int when it is whole."""
+    count = float(count)
+    return int(count) if count.is_integer() else count
+
+
+def compile_tree(node, data=None):
+    """Flatten a decision tree into a CompiledTree.
+
+    Parameters
+    ----------
+    node: Leaf or Node
+        the decision tree
+    data: Dataset
+        the dataset whose encoding the compiled tree uses, categories
+        of questions missing from it getting the next codes (default to
+        None, which means the features and classes found in the tree;
+        features no question uses then have no categories)
+
+    Returns
+    -------
+    CompiledTree
+        the flattened tree; with data, `predict_batch(data.X)` classifies
+        the rows of the dataset
+    """
+    # Number the nodes in depth-first order.
+    nodes = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if not isinstance(node, Leaf):
+            stack.append(node.false_branch)
+            stack.append(node.true_branch)
+    ids = {id(node): i for i, node in enumerate(nodes)}
+
+    if data is not None:
+        classes = list(data.classes)
+        categories = [None if cats is None else list(cats)
+                      for cats in data.categories]
+        headers = data.headers
+    else:
+        classes, categories, headers = [], [], None
+        numeric_columns = set()
+        for node in nodes:
+            if isinstance(node, RegressionLeaf):
+                continue
+            if isinstance(node, Leaf):
+                classes.extend(label for label in node.predictions
+                               if label not in classes)
+                continue
+
+            column, value = node.question.column, node.question.value
+            # Columns no question uses are categorical without any
+            # category, so whatever they hold is encoded as -1 or NaN.
+            categories.extend([] for _ in range(column + 1
+                                                 - len(categories)))
+            if headers is None:
+                headers = node.question.headers
+            if is_numeric(value):
+                numeric_columns.add(column)
+                continue
+            values = sorted(value) if isinstance(value, frozenset) else [value]
+            categories[column].extend(val for val in values
+                                      if val not in categories[column])
+        for column in numeric_columns:
+            if not categories[column]:
+                categories[column] = None
+    class_codes = {label: code for code, label in enumerate(classes)}
+    category_codes = [None if cats is None
+                      else {val: code for code, val in enumerate(cats)}
+                      for cats in categories]
+
+    def category_code(column, val):
+        # Categories of questions missing from the encoding of data get
+        # codes of their own, past the others, so they only match the
+        # rows holding them, never the unseen ones encoded as -1.
+        codes = category_codes[column]
+        if val not in codes:
+            codes[val] = len(categories[column])
+            categories[column].append(val)
+        return codes[val]
+
+    n_nodes = len(nodes)
+    feature = np.full(n_nodes, -1, dtype=np.intp)
+    threshold = np.zeros(n_nodes)
+    numeric = np.zeros(n_nodes, dtype=bool)
+    true_child = np.full(n_nodes, -1, dtype=np.intp)
+    false_child = np.full(n_nodes, -1, dtype=np.intp)
+    counts = np.zeros((n_nodes, len(classes)))
+    prediction = np.full(n_nodes, -1, dtype=np.intp)
+    value = np.zeros(n_nodes)
+    missing = np.zeros(n_nodes, dtype=bool)
+    subset = np.zeros(n_nodes, dtype=bool)
+    set_node, set_code = [], []
+    for i, node in enumerate(nodes):
+        if isinstance(node, RegressionLeaf):
+            value[i] = node.value
+            continue
+        if isinstance(node, Leaf):
+            for label, count in node.predictions.items():
+                counts[i, class_codes[label]] = count
+            prediction[i] = class_codes[majority_vote(node)]
+            continue
+
+        question = node.question
+        feature[i] = question.column
+        missing[i] = question.missing
+        numeric[i] = is_numeric(question.value)
+        if numeric[i]:
+            threshold[i] = question.value
+        elif isinstance(question.value, frozenset):
+            subset[i] = True
+            threshold[i] = -1
+            codes = sorted(category_code(question.column, val)
+                           for val in question.value)
+            set_node.extend([i] * len(codes))
+            set_code.extend(codes)
+        else:
+            threshold[i] = category_code(question.column, question.value)
+        true_child[i] = ids[id(node.true_branch)]
+        false_child[i] = ids[id(node.false_branch)]
+
+    return CompiledTree(feature, threshold, numeric, true_child, false_child,
+                        counts, prediction, classes, categories, headers,
+                        value, missing, subset,
+                        np.array(set_node, dtype=np.intp),
+                        np.array(set_code, dtype=np.intp))
@@ -0,0 +1,257 @@
+"""Impurity criteria of the split search.
+
+A criterion measures the impurity of a set of rows from statistics of
+their targets that add up over disjoint sets of rows: class counts for
+classification, the number of rows and the sums of the targets and of
+their squares for regression. The statistics of both sides of every
+question on a column therefore follow from those of its values by sums,
+and every candidate is scored in one vectorized step. Rows may carry
+weights, in which case every row adds up its weight where it would
+count as one.
+
+A criterion is any object with the methods documented by `Criterion`;
+the classes below only have static methods, like the losses of
+`boosting`.
+"""
+import numpy as np
+
+
+def gini_impurity(counts):
+    """Compute the Gini index of every row of a class count table.
+
+    Parameters
+    ----------
+    counts: numpy.ndarray
+        array of shape (..., n_classes) of class counts
+
+    Returns
+    -------
+    numpy.ndarray
+        Gini index of every collection of counts. Empty collections have
+        a Gini index of 0.
+
+    Notes
+    -----
+    The squared proportions are subtracted one class at a time, in the
+    order of the columns, which rounds exactly like
+    `decision_tree.gini_from_counts` with the classes in that order.
+    """
+    n_total = counts.sum(axis=-1)
+    gini_index = np.where(n_total > 0, 1.0, 0.0)
+    # Weighted totals may be below 1; only empty collections are
+    # divided by 1 instead, their counts being all 0.
+    n_total = np.where(n_total > 0, n_total, 1)
+    for k in range(counts.shape[-1]):
+        gini_index -= (counts[..., k] / n_total) ** 2
+
+    return gini_index
+
+
+def entropy(counts):
+    """Compute the entropy, in bits, of every row of a class count table.
+
+    Parameters
+    ----------
+    counts: numpy.ndarray
+        array of shape (..., n_classes) of class counts
+
+    Returns
+    -------
+    numpy.ndarray
+        entropy of every collection of counts. Empty collections have an
+        entropy of 0.
+    """
+    n_total = counts.sum(axis=-1, keepdims=True)
+    p = counts / np.where(n_total > 0, n_total, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(p > 0, p * np.log2(p), 0.0)
+    return -terms.sum(axis=-1)
+
+
+class Criterion:
+    """Interface of the impurity criteria.
+
+    This class only documents the methods a criterion has, and provides
+    `n_samples` to the criteria deriving from it; the statistics are
+    arrays of shape (..., n_stats).
+
+    Methods
+    -------
+    statistics(groups, n_groups, targets, n_classes, weights=None)
+        Sum the statistics of the rows of every group, as an array of
+        shape (n_groups, n_stats). groups is the int array of the group
+        of every row, from 0 to n_groups - 1, and targets holds a class
+        code from 0 to n_classes - 1 for classification, or a number for
+        regression, for every row. Rows weigh their weights, by default
+        1.
+    n_rows(stats)
+        Number of rows, or total weight, of every set of statistics.
+    n_samples(stats)
+        Number of rows of every set of statistics, whatever their
+        weights.
+    impurity(stats)
+        Impurity of every set of statistics, 0 for no rows.
+    target_statistic(stats)
+        Number by which the categories are ordered for subset splits,
+        as a float array of shape (n_groups,) from the statistics of
+        the rows of every category.
+    """
+
+    @classmethod
+    def n_samples(cls, stats):
+        """Number of rows of every set of statistics, whatever their
+        weights; `n_rows` unless the criterion counts them apart."""
+        return cls.n_rows(stats)
+
+
+class ClassificationCriterion(Criterion):
+    """A criterion computed from class counts.
+
+    Parameters
+    ----------
+    impurity: callable
+        impurity(counts) returns the impurity of every row of an array
+        of shape (..., n_classes) of class counts, 0 for no rows
+    """
+
+    def __init__(self, impurity):
+        self.impurity = impurity
+
+    @staticmethod
+    def statistics(groups, n_groups, targets, n_classes, weights=None):
+        counts = np.bincount(groups * n_classes + targets, weights,
+                             minlength=n_groups * n_classes)
+        return counts.reshape(n_groups, n_classes)
+
+    @staticmethod
+    def n_rows(stats):
+        return stats.sum(axis=-1)
+
+    @staticmethod
+    def target_statistic(stats):
+        # The share of the most frequent class. With two classes, the
+        # best subset split is among the prefixes of this order
+        # (Breiman); with more, it is a heuristic.
+        majority = stats.sum(axis=0).argmax()
+        n_total = stats.sum(axis=1)
+        return stats[:, majority] / np.where(n_total > 0, n_total, 1)
+
+
+class Gini(ClassificationCriterion):
+    """Gini index of the classes."""
+
+    impurity = staticmethod(gini_impurity)
+
+
+class Entropy(ClassificationCriterion):
+    """Entropy of the classes, in bits."""
+
+    impurity = staticmethod(entropy)
+
+
+class MSE(Criterion):
+    """Variance of numeric targets, the mean squared error of their mean.
+
+    The statistics of a set of rows are its number of rows and the sums
+    of the targets and of their squares, all weighted by the weights of
+    the rows, if any.
+    """
+
+    @staticmethod
+    def statistics(groups, n_groups, targets, n_classes, weights=None):
+        stats = np.empty((n_groups, 3))
+        if weights is None:
+            stats[:, 0] = np.bincount(groups, minlength=n_groups)
+            weighted = targets
+        else:
+            stats[:, 0] = np.bincount(groups, weights, minlength=n_groups)
+            weighted = weights * targets
+        stats[:, 1] = np.bincount(groups, weighted, minlength=n_groups)
+        stats[:, 2] = np.bincount(groups, weighted * targets,
+                                  minlength=n_groups)
+        return stats
+
+    @staticmethod
+    def n_rows(stats):
+        return stats[..., 0]
+
+    @staticmethod
+    def impurity(stats):
+        n_rows = np.where(stats[..., 0] > 0, stats[..., 0], 1)
+        mean = stats[..., 1] / n_rows
+        return np.maximum(stats[..., 2] / n_rows - mean ** 2, 0)
+
+    @staticmethod
+    def target_statistic(stats):
+        # The mean target, whose order holds the best subset split.
+        return stats[:, 1] / np.where(stats[:, 0] > 0, stats[:, 0], 1)
+
+
+class Weighted(Criterion):
+    """A criterion of weighted rows that also counts the rows.
+
+    The statistics are those of the wrapped criterion, followed by the
+    number of rows, so the bounds on the number of rows of a split do
+    not depend on the weights.
+
+    Parameters
+    ----------
+    criterion: Criterion
+        the criterion of the weighted statistics
+    """
+
+    def __init__(self, criterion):
+        self.criterion = criterion
+
+    def statistics(self, groups, n_groups, targets, n_classes, weights=None):
+        stats = self.criterion.statistics(groups, n_groups, targets,
+                                          n_classes, weights)
+        counts = np.bincount(groups, minlength=n_groups)
+        return np.column_stack([stats, counts])
+
+    def n_rows(self, stats):
+        return self.criterion.n_rows(stats[..., :-1])
+
+    def n_samples(self, stats):
+        return stats[..., -1]
+
+    def impurity(self, stats):
+        return self.criterion.impurity(stats[..., :-1])
+
+    def target_statistic(self, stats):
+        return self.criterion.target_statistic(stats[..., :-1])
+
+
+def weighted(criterion, weights):
+    """The criterion of rows of the given weights: `Weighted` if there
+    are weights, the criterion itself otherwise."""
+    if weights is None or isinstance(criterion, Weighted):
+        return criterion
+    return Weighted(criterion)
+
+
+CRITERIA = {'gini': Gini, 'entropy': Entropy, 'mse': MSE,
+            'squared_error': MSE}
+
+
+def get_criterion(criterion):
+    """Turn the name of a criterion or an impurity function into a
+    criterion.
+
+    Parameters
+    ----------
+    criterion: str, Criterion, or callable
+        a name in CRITERIA, an object with the methods of Criterion, or
+        a function of class counts wrapped into a
+        ClassificationCriterion
+
+    Returns
+    -------
+    Criterion
+        the criterion
+    """
+    if isinstance(criterion, str):
+        return CRITERIA[criterion]
+    if hasattr(criterion, 'impurity'):
+        return criterion
+    return ClassificationCriterion(criterion)
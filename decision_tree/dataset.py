@@ -0,0 +1,592 @@
+import csv
+import itertools
+
+import numpy as np
+
+# Fields of a CSV file read as missing values.
+MISSING_VALUES = frozenset(['', '?', 'NA', 'N/A', 'NaN', 'nan', 'null'])
+
+
+def is_numeric(val):
+    """Whether val is a number."""
+    return isinstance(val, int) or isinstance(val, float)
+
+
+def is_missing(val):
+    """Whether val is a missing value, None or NaN."""
+    return val is None or (isinstance(val, float) and val != val)
+
+
+def encode_rows(rows, categories):
+    """Turn a list of instances into a feature matrix.
+
+    Categories not listed are encoded as -1, which matches no question,
+    and missing values as NaN.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances; a trailing class name is ignored
+    categories: list
+        for every feature, None if it is numeric, otherwise the list of
+        its values; code i stands for categories[column][i]
+
+    Returns
+    -------
+    numpy.ndarray
+        float array of shape (len(rows), len(categories))
+    """
+    X = np.empty((len(rows), len(categories)))
+    for col, cats in enumerate(categories):
+        if cats is None:
+            X[:, col] = [row[col] for row in rows]
+        else:
+            codes = {val: code for code, val in enumerate(cats)}
+            X[:, col] = [np.nan if is_missing(row[col])
+                         else codes.get(row[col], -1) for row in rows]
+
+    return X
+
+
+class Dataset:
+    """A dataset stored column by column in NumPy arrays.
+
+    Numeric features are stored as floats and categorical features as
+    integer codes into `categories`; missing values of both are NaN.
+    Class names are stored as integer codes into `classes`. A dataset is
+    a view on the rows listed in `indices`: views share the feature and
+    label arrays, so splitting a dataset never copies the instances.
+
+    Attributes
+    ----------
+    X: numpy.ndarray
+        float array of shape (n_samples, n_features) holding the features
+    y: numpy.ndarray
+        int array of shape (n_samples,) holding the class codes
+    classes: list
+        class names; code i stands for classes[i]
+    categories: list
+        for every feature, None if it is numeric, otherwise the list of
+        its values; code i stands for categories[column][i]
+    headers: list[str]
+        list of names of the features (default to None)
+    indices: numpy.ndarray
+        rows of X and y belonging to this view
+    weights: numpy.ndarray
+        float array of shape (n_samples,) holding the weight of every
+        row, or None if every row weighs 1
+    bins: numpy.ndarray
+        int array of the same shape as X holding the bin of every value,
+        or None if the dataset is not binned; missing values are in the
+        bin numbered like the largest number of bins of a feature
+    bin_values: list[numpy.ndarray]
+        for every feature, the smallest value of each of its bins, or
+        None if the dataset is not binned
+
+    Methods
+    -------
+    from_rows(rows, headers=None)
+        Build a dataset from a list of instances.
+    subset(indices)
+        View on the given rows of the dataset.
+    binned(max_bins)
+        View on the dataset with its numeric features quantized.
+    column(column)
+        Values of a feature for the rows of the view.
+    labels()
+        Class codes of the rows of the view.
+    row_weights()
+        Weights of the rows of the view.
+    total_weight()
+        Total weight of the rows of the view.
+    with_weights(sample_weight=None, class_weight=None)
+        View on the dataset with weighted rows.
+    encode(column, value)
+        Turn a feature value into the number stored in X.
+    decode(column, value)
+        Turn a number stored in X back into a feature value.
+    match(column, value)
+        Test which rows of the view match a question.
+    split_in_place(column, value)
+        Reorder the indices of the view so matching rows come first.
+    train_test_split(test_size, seed=None)
+        Split the rows of the view at random into two views.
+    """
+
+    def __init__(self, X, y, classes, categories=None, headers=None,
+                 indices=None, weights=None):
+        self.X = np.asfortranarray(X, dtype=float)
+        self.y = np.asarray(y, dtype=np.intp)
+        self.classes = list(classes)
+        if categories is None:
+            categories = [None] * self.X.shape[1]
+        self.categories = categories
+        self.headers = headers
+        if indices is None:
+            indices = np.arange(len(self.y))
+        self.indices = indices
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float)
+        self.weights = weights
+        self.bins = None
+        self.bin_values = None
+        self._codes = [None if cats is None
+                       else {val: code for code, val in enumerate(cats)}
+                       for cats in categories]
+
+    @classmethod
+    def from_rows(cls, rows, headers=None):
+        """Build a dataset from a list of instances.
+
+        A feature is numeric if all its values are numbers and
+        categorical if none of them is, leaving out the missing values,
+        None and NaN. The codes of categories and classes follow their
+        order of first appearance.
+
+        Parameters
+        ----------
+        rows: list
+            a list of instances, the last element of each being its
+            class name
+        headers: list[str]
+            list of names of the features (default to None)
+
+        Returns
+        -------
+        Dataset
+            the dataset holding all rows
+        """
+        n_features = len(rows[0]) - 1
+        X = np.empty((len(rows), n_features), order='F')
+        categories = []
+        for col in range(n_features):
+            values = [row[col] for row in rows]
+            present = [val for val in values if not is_missing(val)]
+            if all(is_numeric(val) for val in present):
+                X[:, col] = values
+                categories.append(None)
+            elif not any(is_numeric(val) for val in present):
+                codes = {}
+                X[:, col] = [np.nan if is_missing(val)
+                             else codes.setdefault(val, len(codes))
+                             for val in values]
+                categories.append(list(codes))
+            else:
+                raise ValueError(f'column {col} mixes numeric and '
+                                 'non-numeric values')
+
+        classes = {}
+        y = [classes.setdefault(row[-1], len(classes)) for row in rows]
+
+        return cls(X, y, list(classes), categories, headers)
+
+    def subset(self, indices):
+        """View on the given rows of the dataset.
+
+        Parameters
+        ----------
+        indices: numpy.ndarray
+            rows of X and y to be viewed
+
+        Returns
+        -------
+        Dataset
+            a dataset sharing its arrays with this one
+        """
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.indices = indices
+        return view
+
+    def binned(self, max_bins):
+        """View on the dataset with its numeric features quantized.
+
+        Every numeric feature is cut into at most max_bins bins holding
+        about as many rows each. The edges between bins are values of
+        the feature, so the question `>= bin_values[column][b]` is true
+        exactly for the rows in bins b and above. Every category of a
+        categorical feature is a bin of its own. The missing values of
+        every feature go to one more bin, after the largest number of
+        bins of a feature.
+
+        Parameters
+        ----------
+        max_bins: int
+            largest number of bins of a numeric feature
+
+        Returns
+        -------
+        Dataset
+            a dataset sharing its arrays with this one, with bins and
+            bin_values filled in
+        """
+        n_bins = max([max_bins] + [len(cats) for cats in self.categories
+                                   if cats is not None]) + 1
+        dtype = np.uint8 if n_bins <= 256 else np.uint16
+        bins = np.empty(self.X.shape, dtype=dtype, order='F')
+        bin_values = []
+        for col in range(self.n_features):
+            values = self.X[:, col]
+            if not self.is_numeric(col):
+                bins[:, col] = np.nan_to_num(values)
+                bin_values.append(np.arange(len(self.categories[col]),
+                                            dtype=float))
+                continue
+
+            edges = np.sort(values[~np.isnan(values)])
+            if len(np.unique(edges)) > max_bins:
+                edges = edges[len(edges) * np.arange(max_bins) // max_bins]
+            edges = np.unique(edges)
+            bins[:, col] = np.maximum(
+                np.searchsorted(edges, values, side='right') - 1, 0)
+            bin_values.append(edges)
+
+        missing_bin = max(len(values) for values in bin_values)
+        for col in range(self.n_features):
+            missing = np.isnan(self.X[:, col])
+            if missing.any():
+                bins[missing, col] = missing_bin
+
+        view = self.subset(self.indices)
+        view.bins = bins
+        view.bin_values = bin_values
+        return view
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def n_features(self):
+        """Number of features."""
+        return self.X.shape[1]
+
+    def is_numeric(self, column):
+        """Whether the feature at column is numeric."""
+        return self.categories[column] is None
+
+    def column(self, column):
+        """Values of a feature for the rows of the view."""
+        return self.X[self.indices, column]
+
+    def labels(self):
+        """Class codes of the rows of the view."""
+        return self.y[self.indices]
+
+    def row_weights(self):
+        """Weights of the rows of the view, None if they all weigh 1."""
+        if self.weights is None:
+            return None
+        return self.weights[self.indices]
+
+    def total_weight(self):
+        """Total weight of the rows of the view, their number if they
+        all weigh 1."""
+        if self.weights is None:
+            return len(self)
+        return float(self.weights[self.indices].sum())
+
+    def with_weights(self, sample_weight=None, class_weight=None):
+        """View on the dataset with weighted rows.
+
+        The weight of a row is the product of its sample weight, of its
+        class weight and of the weight it already had, if any. Rows
+        outside the view weigh 0.
+
+        Parameters
+        ----------
+        sample_weight: numpy.ndarray
+            non-negative weight of every row of the view, in the order
+            of indices (default to None, which means 1)
+        class_weight: dict or 'balanced'
+            class names mapped to the weight of their rows; classes not
+            listed weigh 1. 'balanced' weighs every class inversely to
+            its number of rows in the view, n_rows / (n_classes *
+            n_rows_of_class) (default to None, which means 1)
+
+        Returns
+        -------
+        Dataset
+            a dataset sharing its features and labels with this one
+        """
+        weights = self.row_weights()
+        if weights is None:
+            weights = np.ones(len(self))
+        if sample_weight is not None:
+            sample_weight = np.asarray(sample_weight, dtype=float)
+            if sample_weight.shape != (len(self),):
+                raise ValueError(f'expected {len(self)} sample weights, '
+                                 f'got {sample_weight.shape}')
+            if (sample_weight < 0).any():
+                raise ValueError('sample weights must be non-negative')
+            weights = weights * sample_weight
+        if class_weight is not None:
+            labels = self.labels()
+            if class_weight == 'balanced':
+                counts = np.bincount(labels, minlength=len(self.classes))
+                n_present = np.count_nonzero(counts)
+                per_class = len(self) / (n_present * np.maximum(counts, 1))
+            else:
+                per_class = np.array([class_weight.get(label, 1.0)
+                                      for label in self.classes],
+                                     dtype=float)
+            weights = weights * per_class[labels]
+
+        view = self.subset(self.indices)
+        view.weights = np.zeros(len(self.y))
+        view.weights[self.indices] = weights
+        return view
+
+    def encode(self, column, value):
+        """Turn a feature value into the number stored in X.
+
+        Unknown categories are encoded as -1, which matches no row, and
+        missing values as NaN.
+        """
+        if is_missing(value):
+            return np.nan
+        if self.is_numeric(column):
+            return float(value)
+        return self._codes[column].get(value, -1)
+
+    def decode(self, column, value):
+        """Turn a number stored in X back into a feature value."""
+        if self.is_numeric(column):
+            return float(value)
+        return self.categories[column][int(value)]
+
+    def match(self, column, value, missing=False):
+        """Test which rows of the view match a question.
+
+        Parameters
+        ----------
+        column: int
+            column number of the feature
+        value: int, float, str, or frozenset
+            the value of the question, as it appears in the instances; a
+            frozenset of categories matches any of them
+        missing: bool
+            whether the rows missing the feature match (default to
+            False)
+
+        Returns
+        -------
+        numpy.ndarray
+            bool array, True for the rows matching the question
+        """
+        values = self.column(column)
+        if self.is_numeric(column):
+            matches = values >= value
+        elif isinstance(value, frozenset):
+            matches = np.isin(values, [self.encode(column, val)
+                                       for val in value])
+        else:
+            matches = values == self.encode(column, value)
+        if missing:
+            matches |= np.isnan(values)
+        return matches
+
+    def split_in_place(self, column, value, missing=False):
+        """Reorder the indices of the view so matching rows come first.
+
+        The indices array is overwritten, so the two views returned are
+        slices of it and no index is copied. Rows keep their relative
+        order on both sides.
+
+        Parameters
+        ----------
+        column: int
+            column number of the feature
+        value: int, float, str, or frozenset
+            the value of the question, as it appears in the instances
+        missing: bool
+            whether the rows missing the feature match (default to
+            False)
+
+        Returns
+        -------
+        (Dataset, Dataset)
+            views on the matching and on the other rows
+        """
+        mask = self.match(column, value, missing)
+        n_trues = np.count_nonzero(mask)
+        self.indices[:] = np.concatenate([self.indices[mask],
+                                          self.indices[~mask]])
+        return (self.subset(self.indices[:n_trues]),
+                self.subset(self.indices[n_trues:]))
+
+    def train_test_split(self, test_size, seed=None):
+        """Split the rows of the view at random into two views.
+
+        Every row is drawn into the test set with probability
+        test_size, from a generator seeded with seed, so the split does
+        not depend on how the rows were read.
+
+        Parameters
+        ----------
+        test_size: float
+            expected fraction of the rows in the test set
+        seed: int
+            seed of the random generator (default to None)
+
+        Returns
+        -------
+        (Dataset, Dataset)
+            views on the training and on the test rows
+        """
+        rng = np.random.RandomState(seed)
+        is_test = rng.random_sample(len(self)) < test_size
+        return (self.subset(self.indices[~is_test]),
+                self.subset(self.indices[is_test]))
+
+
+class _ColumnReader:
+    """Accumulate the values of a CSV column chunk by chunk.
+
+    A column is numeric as long as every value parses as a float, and
+    categorical otherwise; categories are coded in order of first
+    appearance. Unless missing is False, the fields in MISSING_VALUES
+    are read as NaN.
+    """
+
+    def __init__(self, column, missing=True):
+        self.column = column
+        self.missing = missing
+        self.numeric = None
+        self.codes = {}
+        self.chunks = []
+
+    def add(self, values, first_line, last_line):
+        """Parse the values of the column in a chunk of lines."""
+        if self.numeric is not False:
+            try:
+                self.chunks.append(self._parse_numbers(values))
+                self.numeric = True
+                return
+            except ValueError:
+                # Chunks of missing values only fit both kinds.
+                if self.numeric and not all(np.isnan(chunk).all()
+                                            for chunk in self.chunks):
+                    raise ValueError(f'column {self.column} mixes numeric '
+                                     'and non-numeric values (lines '
+                                     f'{first_line} to {last_line})')
+                self.numeric = False
+
+        codes = self.codes
+        if not self.missing:
+            self.chunks.append(np.array([codes.setdefault(val, len(codes))
+                                         for val in values], dtype=np.int32))
+            return
+        self.chunks.append(np.array([np.nan if val in MISSING_VALUES
+                                     else codes.setdefault(val, len(codes))
+                                     for val in values]))
+
+    def _parse_numbers(self, values):
+        """Parse values as floats, missing values included."""
+        try:
+            return np.array(values, dtype=float)
+        except ValueError:
+            if not self.missing:
+                raise
+        return np.array([np.nan if val in MISSING_VALUES else val
+                         for val in values], dtype=float)
+
+    def values(self):
+        """Concatenate the chunks read so far and forget them."""
+        values = np.concatenate(self.chunks) if self.chunks else np.empty(0)
+        self.chunks = []
+        return values
+
+
+def read_csv(path, headers=None, has_header=False, chunk_rows=65536,
+             delimiter=',', test_size=None, seed=None):
+    """Read a CSV file into a Dataset, a chunk of lines at a time.
+
+    Only chunk_rows lines are held as Python objects at once; each chunk
+    is parsed column by column into NumPy arrays. Columns whose values
+    all parse as numbers are numeric and the others categorical,
+    leaving out the missing values listed in MISSING_VALUES. The last
+    column holds the class names, which are numbers if they all parse
+    as such.
+
+    Parameters
+    ----------
+    path: str
+        path of the CSV file
+    headers: list[str]
+        list of names of the features (default to None, which means the
+        first line if has_header, otherwise no names)
+    has_header: bool
+        whether the first line holds the names of the columns (default
+        to False)
+    chunk_rows: int
+        number of lines parsed at once (default to 65536)
+    delimiter: str
+        field delimiter (default to ',')
+    test_size: float
+        expected fraction of the rows drawn into a test set (default to
+        None, which means no test set)
+    seed: int
+        seed of the generator drawing the test set (default to None)
+
+    Returns
+    -------
+    Dataset or (Dataset, Dataset)
+        the dataset, or views on its training and test rows
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        if has_header:
+            names = next(reader)
+            if headers is None:
+                headers = names
+        columns = None
+        while True:
+            first_line = reader.line_num + 1
+            chunk = []
+            n_lines = 0
+            for row in itertools.islice(reader, chunk_rows):
+                n_lines += 1
+                # Blank lines hold no instance.
+                if not row:
+                    continue
+                if columns is None:
+                    n_columns = len(row)
+                    columns = [_ColumnReader(col, col < n_columns - 1)
+                               for col in range(n_columns)]
+                if len(row) != len(columns):
+                    raise ValueError(f'line {reader.line_num} of {path} '
+                                     f'has {len(row)} fields instead of '
+                                     f'{len(columns)}')
+                chunk.append(row)
+            if not n_lines:
+                break
+            if chunk:
+                for column, values in zip(columns, zip(*chunk)):
+                    column.add(values, first_line, reader.line_num)
+            del chunk
+
+    if columns is None:
+        raise ValueError(f'{path} holds no instances')
+
+    label_column = columns.pop()
+    labels = label_column.values()
+    if label_column.numeric:
+        classes, first, y = np.unique(labels, return_index=True,
+                                      return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty(len(classes), dtype=np.intp)
+        rank[order] = np.arange(len(classes))
+        classes, y = classes[order].tolist(), rank[y.ravel()]
+    else:
+        classes, y = list(label_column.codes), labels
+
+    X = np.empty((len(y), len(columns)), order='F')
+    categories = []
+    for col, column in enumerate(columns):
+        X[:, col] = column.values()
+        categories.append(None if column.numeric else list(column.codes))
+
+    data = Dataset(X, y, classes, categories, headers)
+    if test_size is None:
+        return data
+    return data.train_test_split(test_size, seed)
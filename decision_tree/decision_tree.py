@@ -1,5 +1,19 @@
-import csv
-import random
+import heapq
+import itertools
+import time
+
+import numpy as np
+
+from criteria import Gini
+from criteria import get_criterion
+from dataset import Dataset
+from dataset import is_missing
+from dataset import is_numeric
+from dataset import read_csv
+from splitter import best_split
+from splitter import column_mapper
+from splitter import histogram
+from splitter import histogram_split
 
 
 class Question:
@@ -9,10 +23,14 @@ class Question:
     ----------
     column: int
         column number of the feature
-    value: int, float, or str
-        the value used to decide the partition
+    value: int, float, str, or frozenset
+        the value used to decide the partition; a frozenset of
+        categories matches any of them
     headers: list[str]
         list of names of the features (default to None)
+    missing: bool
+        whether the instances missing the feature, None or NaN, match
+        the question (default to False)
 
     Methods
     -------
@@ -20,10 +38,11 @@ class Question:
         Test whether the example matches the question.
     """
 
-    def __init__(self, column, value, headers=None):
+    def __init__(self, column, value, headers=None, missing=False):
         self.column = column
         self.value = value
         self.headers = headers
+        self.missing = missing
 
     def match(self, example):
         """Test whether the example matches the question.
@@ -40,7 +59,13 @@ class Question:
         """
         val = example[self.column]
         if is_numeric(val):
+            if val != val:
+                return self.missing
             return val >= self.value
+        elif val is None:
+            return self.missing
+        elif isinstance(self.value, frozenset):
+            return val in self.value
         else:
             return val == self.value
 
@@ -50,14 +75,15 @@ class Question:
         header_name = f'headers[{self.column}]'
         if self.headers is not None:
             header_name = self.headers[self.column]
-        if is_numeric(self.value):
+        value = self.value
+        if is_numeric(value):
             condition = '>='
-        return f'Is {header_name} {condition} {self.value}?'
-
-
-def is_numeric(val):
-    """Whether val is a number."""
-    return isinstance(val, int) or isinstance(val, float)
+        elif isinstance(value, frozenset):
+            condition = 'in'
+            value = '{' + ', '.join(sorted(map(str, value))) + '}'
+        if self.missing:
+            return f'Is {header_name} {condition} {value} or missing?'
+        return f'Is {header_name} {condition} {value}?'
 
 
 def partition(rows, question):
@@ -65,17 +91,23 @@ def partition(rows, question):
 
     Parameters
     ----------
-    rows: list
+    rows: list or Dataset
         a list of instances
     question: Question
         the question used to do the partition
 
     Returns
     -------
-    (list, list)
+    (list, list) or (Dataset, Dataset)
         a pair of lists. The left one is the list of true instances and
-        the right one the list of false instances.
+        the right one the list of false instances. A dataset is split
+        into two views on its rows.
     """
+    if isinstance(rows, Dataset):
+        mask = rows.match(question.column, question.value, question.missing)
+        trues, falses = rows.indices[mask], rows.indices[~mask]
+        return rows.subset(trues), rows.subset(falses)
+
     trues, falses = [], []
     for row in rows:
         if question.match(row):
@@ -86,34 +118,74 @@ def partition(rows, question):
     return trues, falses
 
 
-def class_counts(rows):
+def class_counts(rows, sample_weight=None, class_weight=None):
     """Count the occurrence of each class in rows.
 
     Each element of rows is a tuple or list representing a single
     instance. We assume the last element of every instance is the class
     name (or the label).
 
+    With weights, every row counts as its sample weight times the weight
+    of its class, so a row of weight 3 counts like three copies of it.
+
     Parameters
     ----------
-    rows: list
+    rows: list or Dataset
         a list of instances
+    sample_weight: list[float]
+        weight of every row (default to None, which means the weights
+        of the dataset, if any, otherwise 1)
+    class_weight: dict
+        class names mapped to the weight of their rows; classes not
+        listed weigh 1 (default to None)
 
     Returns
     -------
     dict
         statistics of the occurrences of classes in rows. The keys are
-        the class names and the values are the corresponding number of
-        occurrences.
+        the class names, in order of first appearance, and the values
+        are the corresponding number of occurrences, or total weights
+        as floats if the rows are weighted.
     """
+    if isinstance(rows, Dataset):
+        if sample_weight is not None or class_weight is not None:
+            rows = rows.with_weights(sample_weight, class_weight)
+        labels = rows.labels()
+        codes, first = np.unique(labels, return_index=True)
+        weights = rows.row_weights()
+        if weights is None:
+            totals = np.bincount(labels)
+            return {rows.classes[code]: int(totals[code])
+                    for code in codes[np.argsort(first)]}
+        totals = np.bincount(labels, weights)
+        return {rows.classes[code]: float(totals[code])
+                for code in codes[np.argsort(first)]}
+
+    if sample_weight is None and class_weight is None:
+        counts = {}
+        for row in rows:
+            label = row[-1]
+            counts[label] = counts.get(label, 0) + 1
+
+        return counts
+
+    if sample_weight is None:
+        sample_weight = itertools.repeat(1.0)
+    elif len(sample_weight) != len(rows):
+        raise ValueError(f'expected {len(rows)} sample weights, got '
+                         f'{len(sample_weight)}')
+    if class_weight is None:
+        class_weight = {}
     counts = {}
-    for row in rows:
+    for row, weight in zip(rows, sample_weight):
         label = row[-1]
-        counts[label] = counts.get(label, 0) + 1
+        counts[label] = (counts.get(label, 0.0)
+                         + weight * class_weight.get(label, 1.0))
 
     return counts
 
 
-def gini(rows):
+def gini(rows, sample_weight=None, class_weight=None):
     """Compute the Gini index of rows according to its class names.
 
     Each element of rows is a tuple or list representing a single
@@ -122,16 +194,38 @@ def gini(rows):
 
     Parameters
     ----------
-    rows: list
+    rows: list or Dataset
         a list of instances
+    sample_weight: list[float]
+        weight of every row (default to None); see `class_counts`
+    class_weight: dict
+        class names mapped to the weight of their rows (default to
+        None)
 
     Returns
     -------
     float
         Gini index of rows according to its class names
     """
-    counts = class_counts(rows)
-    n_total = len(rows)
+    counts = class_counts(rows, sample_weight, class_weight)
+    return gini_from_counts(counts, sum(counts.values()))
+
+
+def gini_from_counts(counts, n_total):
+    """Compute the Gini index from class counts.
+
+    Parameters
+    ----------
+    counts: dict
+        class names mapped to their number of occurrences
+    n_total: int
+        total number of instances
+
+    Returns
+    -------
+    float
+        Gini index of a collection with the given class counts
+    """
     gini_index = 1
     for label in counts:
         gini_index -= (counts[label] / n_total) ** 2
@@ -139,10 +233,14 @@ def gini(rows):
     return gini_index
 
 
-def info_gain(trues, falses, current_gini):
+def info_gain(trues, falses, current_gini, true_weight=None,
+              false_weight=None, class_weight=None):
     """Compute the information gain of splitting the current collection
     into left and right.
 
+    The sides are weighted by their total weight, which is their number
+    of instances when nothing is weighted.
+
     Parameters
     ----------
     trues: list
@@ -151,62 +249,435 @@ def info_gain(trues, falses, current_gini):
         list of false instances after splitting
     current_gini: float
         Gini index of current list
+    true_weight: list[float]
+        weight of every true instance (default to None); see
+        `class_counts`
+    false_weight: list[float]
+        weight of every false instance (default to None)
+    class_weight: dict
+        class names mapped to the weight of their instances (default to
+        None)
 
     Returns
     -------
     float
         Information gain
     """
-    p = len(trues) / (len(trues) + len(falses))
-    return current_gini - p * gini(trues) - (1 - p) * gini(falses)
-
-
-def find_best_split(rows, headers=None):
+    true_counts = class_counts(trues, true_weight, class_weight)
+    false_counts = class_counts(falses, false_weight, class_weight)
+    n_trues = sum(true_counts.values())
+    n_falses = sum(false_counts.values())
+    p = n_trues / (n_trues + n_falses)
+    return (current_gini - p * gini_from_counts(true_counts, n_trues)
+            - (1 - p) * gini_from_counts(false_counts, n_falses))
+
+
+def find_best_split(rows, headers=None, hist=None, min_samples_leaf=1,
+                    n_jobs=None, columns=None, criterion='gini',
+                    targets=None, categorical_subsets=False,
+                    max_categories=None, profile=None, sample_weight=None,
+                    class_weight=None):
     """Find the best question to split the rows.
 
     Iterate through every feature and value to find the best binary
-    split.
+    split. Instead of partitioning the rows once per candidate, the
+    information gain of every value of a column is computed in a single
+    pass: numeric columns are sorted once and swept from the largest
+    value down with running class counts, and categorical columns are
+    counted once per value. The gain of a question is computed from the
+    class counts of its two sides, taken in the order the classes first
+    appear in rows, so questions splitting the rows into the same class
+    counts have exactly the same gain. Of the questions of equal gain,
+    the last column wins, and within a column the value visited last by
+    a loop over the set of its values. Gains computed from partitions of
+    the rows, as `info_gain` does, may differ from these in their last
+    bits, so near ties may be broken otherwise by such a search. A
+    Dataset is searched with the vectorized
+    `splitter.best_split`, and a binned Dataset with
+    `splitter.histogram_split`, which only looks at its histogram.
+
+    Instances missing a feature, None or NaN, go to the false side of
+    its questions, or to the true side if that gains strictly more; the
+    side is stored in the `missing` attribute of the question.
+
+    Other criteria than the Gini index, questions on groups of
+    categories and weighted rows are only evaluated on a Dataset, so a
+    list of instances is turned into one first. The rows of a Dataset
+    carrying weights are weighted even without sample_weight.
 
     Parameters
     ----------
-    rows: list
+    rows: list or Dataset
         a list of instances
     headers: list[str]
-        list of names of the features (default to None)
+        list of names of the features (default to None, which means the
+        headers of the dataset, if any)
+    hist: numpy.ndarray
+        histogram of a binned dataset (default to None, which means it
+        is counted from the rows)
+    min_samples_leaf: int
+        smallest number of rows on either side of the question of a
+        Dataset, whatever their weights (default to 1)
+    n_jobs: int
+        number of threads scoring the columns of a Dataset in parallel
+        (default to None, which means 1; -1 means one per CPU). The
+        question found does not depend on it.
+    columns: list[int]
+        the features searched, in increasing order (default to None,
+        which means all of them)
+    criterion: str or Criterion or callable
+        impurity criterion, a name of `criteria.CRITERIA`, a Criterion,
+        or a function of class counts (default to 'gini')
+    targets: numpy.ndarray
+        numeric target of every row of the Dataset, for a regression
+        criterion (default to None, which means the classes)
+    categorical_subsets: bool
+        whether to ask if a categorical feature is in a subset of its
+        categories, found by sorting them by their share of the majority
+        class or their mean target (default to False, which means `==`
+        one category)
+    max_categories: int
+        largest number of groups of categories of a feature; the rarest
+        categories are pooled into one group (default to None, which
+        means no pooling)
+    profile: profiling.TreeProfile
+        record of the time spent scoring every feature of a Dataset
+        (default to None, which means no record)
+    sample_weight: list[float] or numpy.ndarray
+        weight of every row (default to None, which means 1)
+    class_weight: dict or 'balanced'
+        class names mapped to the weight of their rows, or 'balanced' to
+        weigh the classes inversely to their number of rows; see
+        `Dataset.with_weights` (default to None, which means 1)
 
     Returns
     -------
     (Question, float)
         the pair of best question and its corresponding information gain
     """
+    criterion = get_criterion(criterion)
+    weighted = sample_weight is not None or class_weight is not None
+    if not isinstance(rows, Dataset) and (
+            criterion is not Gini or targets is not None or weighted
+            or categorical_subsets or max_categories is not None):
+        rows = Dataset.from_rows(rows, headers)
+    if isinstance(rows, Dataset):
+        if weighted:
+            rows = rows.with_weights(sample_weight, class_weight)
+        map_columns = column_mapper(n_jobs, len(rows))
+        if profile is not None:
+            map_columns = profile.map_columns(map_columns, rows, 'search')
+        if rows.bins is None:
+            column, value, gain, missing = best_split(
+                rows, min_samples_leaf, map_columns, columns, criterion,
+                targets, categorical_subsets, max_categories)
+        else:
+            if hist is None:
+                hist = histogram(rows, map_columns, criterion, targets)
+            column, value, gain, missing = histogram_split(
+                rows, hist, min_samples_leaf, map_columns, columns,
+                criterion, categorical_subsets, max_categories)
+        if column is None:
+            return None, gain
+        if headers is None:
+            headers = rows.headers
+        return Question(column, value, headers, missing), gain
+
     best_gain = 0
     best_question = None
     current_gini = gini(rows)
-    n_features = len(rows[0]) - 1
-
-    for col in range(n_features):
-        values = set([row[col] for row in rows])
-        for val in values:
-            question = Question(col, val, headers)
-            trues, falses = partition(rows, question)
+    if columns is None:
+        columns = range(len(rows[0]) - 1)
+
+    for col in columns:
+        values = [row[col] for row in rows]
+        matched = {}
+        if any(is_missing(val) for val in values):
+            gains, matched = missing_split_gains(rows, col, current_gini)
+        elif all(is_numeric(val) for val in values):
+            gains = numeric_split_gains(rows, col, current_gini)
+        elif not any(is_numeric(val) for val in values):
+            gains = categorical_split_gains(rows, col, current_gini)
+        else:
+            gains = partition_split_gains(rows, col, current_gini)
 
-            # Sanity check.
-            if len(trues) == 0 or len(falses) == 0:
+        for val in set(values):
+            # Values missing from gains leave one side empty.
+            if val not in gains:
                 continue
 
-            gain = info_gain(trues, falses, current_gini)
-
+            gain = gains[val]
             if best_gain <= gain:
-                best_question, best_gain = question, gain
+                best_question = Question(col, val, headers,
+                                         matched.get(val, False))
+                best_gain = gain
 
     return best_question, best_gain
 
 
+def numeric_split_gains(rows, column, current_gini):
+    """Compute the information gain of every `>=` question on a numeric
+    column with one sorted sweep.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    current_gini: float
+        Gini index of rows
+
+    Returns
+    -------
+    dict
+        values of the column mapped to the information gain of the
+        question `Is column >= value?`. Values whose question leaves one
+        side empty are left out.
+    """
+    totals = class_counts(rows)
+    n_total = len(rows)
+    gains = {}
+    for val, trues, n_trues in sorted_true_counts(rows, column, totals):
+        if n_trues == n_total:
+            continue
+
+        falses = {label: totals[label] - trues[label] for label in totals}
+        gains[val] = counts_info_gain(trues, n_trues, falses,
+                                      n_total - n_trues, current_gini)
+
+    return gains
+
+
+def sorted_true_counts(rows, column, labels):
+    """Yield the class counts of the true side of every `>=` question on
+    a numeric column, from one sorted sweep.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    labels: iterable
+        class names of rows
+
+    Yields
+    ------
+    (float, dict, int)
+        every value of the column, in decreasing order, the class counts
+        of the rows at least that value and their number
+    """
+    ordered = sorted(rows, key=lambda row: row[column], reverse=True)
+    trues = dict.fromkeys(labels, 0)
+    for i, row in enumerate(ordered, 1):
+        trues[row[-1]] += 1
+        # Wait until every row with this value is on the true side.
+        if i < len(ordered) and ordered[i][column] == row[column]:
+            continue
+
+        yield row[column], dict(trues), i
+
+
+def categorical_split_gains(rows, column, current_gini):
+    """Compute the information gain of every `==` question on a
+    categorical column with one counting pass.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    current_gini: float
+        Gini index of rows
+
+    Returns
+    -------
+    dict
+        values of the column mapped to the information gain of the
+        question `Is column == value?`. Values whose question leaves one
+        side empty are left out.
+    """
+    totals = class_counts(rows)
+    n_total = len(rows)
+    gains = {}
+    for val, trues, n_trues in value_true_counts(rows, column, totals):
+        if n_trues == n_total:
+            continue
+
+        falses = {label: totals[label] - trues[label] for label in totals}
+        gains[val] = counts_info_gain(trues, n_trues, falses,
+                                      n_total - n_trues, current_gini)
+
+    return gains
+
+
+def value_true_counts(rows, column, labels):
+    """Yield the class counts of the true side of every `==` question on
+    a categorical column, from one counting pass.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    labels: iterable
+        class names of rows
+
+    Yields
+    ------
+    (object, dict, int)
+        every value of the column, the class counts of the rows holding
+        it and their number
+    """
+    by_value = {}
+    for row in rows:
+        counts = by_value.setdefault(row[column], dict.fromkeys(labels, 0))
+        counts[row[-1]] += 1
+
+    for val, trues in by_value.items():
+        yield val, trues, sum(trues.values())
+
+
+def partition_split_gains(rows, column, current_gini):
+    """Compute the information gain of every question on a column by
+    partitioning the rows once per value.
+
+    This is the fallback for columns mixing numeric and non-numeric
+    values, where the question asked depends on the value.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    current_gini: float
+        Gini index of rows
+
+    Returns
+    -------
+    dict
+        values of the column mapped to the information gain of their
+        question. Values whose question leaves one side empty are left
+        out.
+    """
+    gains = {}
+    for val in set([row[column] for row in rows]):
+        trues, falses = partition(rows, Question(column, val))
+        if len(trues) == 0 or len(falses) == 0:
+            continue
+
+        gains[val] = info_gain(trues, falses, current_gini)
+
+    return gains
+
+
+def missing_split_gains(rows, column, current_gini):
+    """Compute the information gain of every question on a column with
+    missing values.
+
+    The instances missing the value go to the false side of every
+    question, or to its true side if that gains strictly more. The
+    class counts of the other instances on the true side of every
+    question come from one sorted sweep of a numeric column, or one
+    counting pass of a categorical one, and the missing ones are added
+    to either side; only columns mixing numeric and non-numeric values
+    are partitioned once per value.
+
+    Parameters
+    ----------
+    rows: list
+        a list of instances
+    column: int
+        column number of the feature
+    current_gini: float
+        Gini index of rows
+
+    Returns
+    -------
+    (dict, dict)
+        values of the column mapped to the information gain of their
+        question, and to whether the missing values match it. Values
+        whose question leaves one side empty are left out.
+    """
+    totals = class_counts(rows)
+    n_total = len(rows)
+    present = [row for row in rows if not is_missing(row[column])]
+    absent = dict.fromkeys(totals, 0)
+    absent.update(class_counts(
+        [row for row in rows if is_missing(row[column])]))
+    n_absent = n_total - len(present)
+
+    values = [row[column] for row in present]
+    if all(is_numeric(val) for val in values):
+        true_counts = sorted_true_counts(present, column, totals)
+    elif not any(is_numeric(val) for val in values):
+        true_counts = value_true_counts(present, column, totals)
+    else:
+        true_counts = []
+        for val in set(values):
+            trues = partition(present, Question(column, val))[0]
+            true_counts.append((val, class_counts(trues), len(trues)))
+
+    gains, matched = {}, {}
+    for val, trues, n_trues in true_counts:
+        trues = {label: trues.get(label, 0) for label in totals}
+        for missing in (False, True):
+            if missing:
+                trues = {label: trues[label] + absent[label]
+                         for label in totals}
+                n_trues += n_absent
+            if n_trues == 0 or n_trues == n_total:
+                continue
+
+            falses = {label: totals[label] - trues[label] for label in totals}
+            gain = counts_info_gain(trues, n_trues, falses,
+                                    n_total - n_trues, current_gini)
+            if val not in gains or gains[val] < gain:
+                gains[val], matched[val] = gain, missing
+
+    return gains, matched
+
+
+def counts_info_gain(trues, n_trues, falses, n_falses, current_gini):
+    """Compute the information gain of a split from the class counts of
+    both sides.
+
+    Parameters
+    ----------
+    trues: dict
+        class counts of the true instances
+    n_trues: int
+        number of true instances
+    falses: dict
+        class counts of the false instances
+    n_falses: int
+        number of false instances
+    current_gini: float
+        Gini index of the collection before splitting
+
+    Returns
+    -------
+    float
+        Information gain
+    """
+    p = n_trues / (n_trues + n_falses)
+    return (current_gini - p * gini_from_counts(trues, n_trues)
+            - (1 - p) * gini_from_counts(falses, n_falses))
+
+
 class Leaf:
-    """A leaf node."""
+    """A leaf node.
+
+    Its predictions are the class counts of its rows, weighted like in
+    `class_counts` by sample_weight and class_weight, if any.
+    """
 
-    def __init__(self, rows):
-        self.predictions = class_counts(rows)
+    def __init__(self, rows, sample_weight=None, class_weight=None):
+        self.predictions = class_counts(rows, sample_weight, class_weight)
 
     def __repr__(self):
         return str(self.predictions)
@@ -219,6 +690,20 @@ class Leaf:
         return str(probs)
 
 
+class RegressionLeaf(Leaf):
+    """A leaf node predicting a number."""
+
+    def __init__(self, value, n_samples):
+        self.value = value
+        self.n_samples = n_samples
+
+    def __repr__(self):
+        return str(self.value)
+
+    def __str__(self):
+        return f'{self.value:.4g}'
+
+
 class Node:
     """A decision node."""
 
@@ -231,31 +716,365 @@ class Node:
         return str(self.question)
 
 
-def build_tree(rows, headers=None):
+def build_tree(rows, headers=None, max_bins=None, max_depth=None,
+               min_samples_split=2, min_samples_leaf=1, max_leaf_nodes=None,
+               n_jobs=None, max_features=None, random_state=None,
+               min_impurity_decrease=0, criterion='gini',
+               categorical_subsets=False, max_categories=None, profile=None,
+               sample_weight=None, class_weight=None):
     """Build the binary decision tree.
 
+    A list of instances is first turned into a Dataset, so the tree is
+    grown on NumPy arrays by `grow_tree`.
+
+    With max_bins, numeric features are quantized once up front and the
+    splits are searched on per-bin class counts.
+
+    Weighted rows count as their weight in the impurities, in the
+    gains compared to min_impurity_decrease and in the predictions of
+    the leaves, so the tree does not depend on the scale of the weights.
+    min_samples_split and min_samples_leaf still count rows. An
+    imbalanced dataset can be reweighted by class instead of resampled.
+
     Parameters
     ----------
-    rows: list
+    rows: list or Dataset
         a list of instances
     headers: list[str]
         list of names of the features (default to None)
+    max_bins: int
+        largest number of bins of a numeric feature (default to None,
+        which means every value is a candidate split)
+    max_depth: int
+        largest depth of a leaf, the root being at depth 0 (default to
+        None, which means unlimited)
+    min_samples_split: int
+        smallest number of rows of a node to be split (default to 2)
+    min_samples_leaf: int
+        smallest number of rows of a leaf, whatever their weights
+        (default to 1)
+    max_leaf_nodes: int
+        largest number of leaves (default to None, which means
+        unlimited)
+    n_jobs: int
+        number of threads scoring and counting the features of large
+        nodes in parallel (default to None, which means 1; -1 means one
+        per CPU). The tree does not depend on it.
+    max_features: int
+        number of features drawn at random and searched at every node
+        (default to None, which means all of them)
+    random_state: int or numpy.random.RandomState
+        seed or generator drawing the features (default to None)
+    min_impurity_decrease: float
+        smallest decrease of the impurity of the whole training set for
+        a node to be split, that is its information gain weighted by its
+        share of the rows, or of their total weight (default to 0)
+    criterion: str or Criterion or callable
+        impurity criterion, 'gini', 'entropy', a Criterion of class
+        counts, or a function of class counts (default to 'gini')
+    categorical_subsets: bool
+        whether to ask if a categorical feature is in a subset of its
+        categories (default to False, which means `==` one category)
+    max_categories: int
+        largest number of groups of categories of a feature; the rarest
+        categories are pooled into one group (default to None, which
+        means no pooling)
+    profile: profiling.TreeProfile
+        filled with the work done on every node and feature (default to
+        None, which means nothing is recorded)
+    sample_weight: list[float] or numpy.ndarray
+        non-negative weight of every row (default to None, which means
+        the weights of the dataset, if any, otherwise 1)
+    class_weight: dict or 'balanced'
+        class names mapped to the weight of their rows, or 'balanced' to
+        weigh the classes inversely to their number of rows (default to
+        None, which means 1)
 
     Returns
     -------
     Node
         the root node of the binary decision tree
     """
-    question, gain = find_best_split(rows, headers)
-    if gain == 0:
-        return Leaf(rows)
+    if not isinstance(rows, Dataset):
+        rows = Dataset.from_rows(rows, headers)
+    if sample_weight is not None or class_weight is not None:
+        rows = rows.with_weights(sample_weight, class_weight)
+    if max_bins is not None:
+        rows = rows.binned(max_bins)
+    criterion = get_criterion(criterion)
+
+    def find_split(rows, hist, columns):
+        return find_best_split(rows, headers, hist, min_samples_leaf, n_jobs,
+                               columns, criterion, None, categorical_subsets,
+                               max_categories, profile)
+
+    def count(rows):
+        map_columns = column_mapper(n_jobs, len(rows))
+        if profile is not None:
+            map_columns = profile.map_columns(map_columns, rows, 'count')
+        return histogram(rows, map_columns, criterion)
+
+    return grow_tree(rows, find_split, Leaf,
+                     count if rows.bins is not None else None,
+                     max_depth=max_depth,
+                     min_samples_split=min_samples_split,
+                     max_leaf_nodes=max_leaf_nodes,
+                     max_features=max_features, random_state=random_state,
+                     min_impurity_decrease=min_impurity_decrease,
+                     profile=profile)
+
+
+def build_regression_tree(rows, targets=None, headers=None, criterion='mse',
+                          max_bins=None, max_depth=None, min_samples_split=2,
+                          min_samples_leaf=1, max_leaf_nodes=None, n_jobs=None,
+                          max_features=None, random_state=None,
+                          min_impurity_decrease=0, categorical_subsets=False,
+                          max_categories=None, sample_weight=None):
+    """Build a binary regression tree.
+
+    The splits minimize the variance of the targets, computed from the
+    running counts, sums and sums of squares of the targets, and every
+    leaf is a RegressionLeaf predicting the mean target of its rows.
+    With sample_weight, the counts, sums and means are weighted.
 
-    true_rows, false_rows = partition(rows, question)
+    Parameters
+    ----------
+    rows: list or Dataset
+        a list of instances; without targets, their last column holds
+        numeric targets
+    targets: numpy.ndarray
+        numeric target of every row of the Dataset (default to None,
+        which means the class names, as numbers)
+    headers: list[str]
+        list of names of the features (default to None)
+    criterion: str or Criterion
+        impurity criterion of numeric targets (default to 'mse')
+    max_bins: int
+        largest number of bins of a numeric feature (default to None,
+        which means every value is a candidate split)
+    max_depth: int
+        largest depth of a leaf, the root being at depth 0 (default to
+        None, which means unlimited)
+    min_samples_split: int
+        smallest number of rows of a node to be split (default to 2)
+    min_samples_leaf: int
+        smallest number of rows of a leaf (default to 1)
+    max_leaf_nodes: int
+        largest number of leaves (default to None, which means
+        unlimited)
+    n_jobs: int
+        number of threads scoring and counting the features of large
+        nodes in parallel (default to None, which means 1; -1 means one
+        per CPU). The tree does not depend on it.
+    max_features: int
+        number of features drawn at random and searched at every node
+        (default to None, which means all of them)
+    random_state: int or numpy.random.RandomState
+        seed or generator drawing the features (default to None)
+    min_impurity_decrease: float
+        smallest decrease of the variance of the whole training set for
+        a node to be split (default to 0)
+    categorical_subsets: bool
+        whether to ask if a categorical feature is in a subset of its
+        categories, sorted by their mean target (default to False, which
+        means `==` one category)
+    max_categories: int
+        largest number of groups of categories of a feature; the rarest
+        categories are pooled into one group (default to None, which
+        means no pooling)
+    sample_weight: list[float] or numpy.ndarray
+        non-negative weight of every row (default to None, which means
+        the weights of the dataset, if any, otherwise 1)
 
-    true_branch = build_tree(true_rows, headers)
-    false_branch = build_tree(false_rows, headers)
+    Returns
+    -------
+    Node
+        the root node of the regression tree
+    """
+    if not isinstance(rows, Dataset):
+        rows = Dataset.from_rows(rows, headers)
+    if sample_weight is not None:
+        rows = rows.with_weights(sample_weight)
+    if targets is None:
+        targets = np.asarray(rows.classes, dtype=float)[rows.y]
+    targets = np.asarray(targets, dtype=float)
+    if max_bins is not None:
+        rows = rows.binned(max_bins)
+    criterion = get_criterion(criterion)
+
+    def mean_target(rows):
+        weights = rows.row_weights()
+        if weights is None or weights.sum() == 0:
+            return targets[rows.indices].mean()
+        return np.average(targets[rows.indices], weights=weights)
+
+    # Centered targets keep the sums of squares of the variances precise.
+    offset = mean_target(rows) if len(rows) else 0.0
+    centered = targets - offset
+
+    def find_split(rows, hist, columns):
+        if np.ptp(centered[rows.indices]) == 0:
+            return None, 0
+        return find_best_split(rows, headers, hist, min_samples_leaf, n_jobs,
+                               columns, criterion, centered,
+                               categorical_subsets, max_categories)
+
+    def make_leaf(rows):
+        return RegressionLeaf(float(mean_target(rows)), len(rows))
+
+    def count(rows):
+        return histogram(rows, column_mapper(n_jobs, len(rows)), criterion,
+                         centered)
+
+    return grow_tree(rows, find_split, make_leaf,
+                     count if rows.bins is not None else None,
+                     max_depth=max_depth,
+                     min_samples_split=min_samples_split,
+                     max_leaf_nodes=max_leaf_nodes,
+                     max_features=max_features, random_state=random_state,
+                     min_impurity_decrease=min_impurity_decrease)
+
+
+def grow_tree(rows, find_split, make_leaf, count=None, max_depth=None,
+              min_samples_split=2, max_leaf_nodes=None, max_features=None,
+              random_state=None, priority=None, min_impurity_decrease=0,
+              profile=None):
+    """Grow a binary tree on a dataset with a given split search.
+
+    The tree is grown from an explicit stack of nodes rather than by
+    recursion, and every split reorders one shared index array in
+    place, so memory does not grow with the depth of the tree. With
+    max_leaf_nodes, the node with the highest priority is grown first.
+
+    With count, the split search is handed the histogram of every node.
+    Only the smaller child of a split is counted; the histogram of the
+    larger one is the parent's minus its sibling's.
+
+    Parameters
+    ----------
+    rows: Dataset
+        the training instances
+    find_split: callable
+        find_split(rows, hist, columns) returns the pair of the best
+        question on the given columns (all of them if None) and its
+        gain; a gain of 0 makes the node a leaf
+    make_leaf: callable
+        make_leaf(rows) returns the leaf holding rows
+    count: callable
+        count(rows) returns the histogram of rows (default to None,
+        which means the split search uses no histogram)
+    max_depth: int
+        largest depth of a leaf, the root being at depth 0 (default to
+        None, which means unlimited)
+    min_samples_split: int
+        smallest number of rows of a node to be split (default to 2)
+    max_leaf_nodes: int
+        largest number of leaves (default to None, which means
+        unlimited)
+    max_features: int
+        number of features drawn at random and searched at every node
+        (default to None, which means all of them)
+    random_state: int or numpy.random.RandomState
+        seed or generator drawing the features (default to None)
+    priority: callable
+        priority(rows, gain) ranks the nodes when max_leaf_nodes is
+        given (default to None, which means the gain weighted by the
+        total weight of the rows)
+    min_impurity_decrease: float
+        smallest gain weighted by the share of the total weight of the
+        rows of a node for it to be split (default to 0)
+    profile: profiling.TreeProfile
+        filled with the rows, question, gain, and time spent counting,
+        searching and partitioning of every node (default to None)
 
-    return Node(question, true_branch, false_branch)
+    Returns
+    -------
+    Node
+        the root node of the binary tree
+    """
+    # The indices are reordered in place, so work on a copy of them.
+    rows = rows.subset(np.array(rows.indices))
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    if priority is None:
+        def priority(rows, gain):
+            return gain * rows.total_weight()
+    n_features = rows.n_features
+    total_weight = rows.total_weight()
+
+    def grow(rows, depth, hist, parent, branch):
+        """Search the split of a node and add it to the frontier."""
+        question, gain = None, 0
+        count_time = search_time = 0.0
+        if (len(rows) >= min_samples_split
+                and (max_depth is None or depth < max_depth)):
+            if count is not None and hist is None:
+                start = time.perf_counter()
+                hist = count(rows)
+                count_time = time.perf_counter() - start
+            columns = None
+            if max_features is not None and max_features < n_features:
+                columns = np.sort(random_state.choice(
+                    n_features, max_features, replace=False))
+            start = time.perf_counter()
+            question, gain = find_split(rows, hist, columns)
+            search_time = time.perf_counter() - start
+            if (gain * rows.total_weight()
+                    < min_impurity_decrease * total_weight):
+                question, gain = None, 0
+        record = None
+        if profile is not None:
+            record = profile.add_node(depth, len(rows), question, gain,
+                                      count_time, search_time)
+        item = (rows, depth, hist, question, gain, parent, branch, record)
+        if max_leaf_nodes is None:
+            frontier.append(item)
+        else:
+            heapq.heappush(frontier, (-priority(rows, gain), next(counter),
+                                      item))
+
+    root = Node(None, None, None)
+    frontier = []
+    counter = itertools.count()
+    n_leaves = 1
+    grow(rows, 0, None, root, 'true_branch')
+    while frontier:
+        if max_leaf_nodes is None:
+            item = frontier.pop()
+        else:
+            item = heapq.heappop(frontier)[-1]
+        rows, depth, hist, question, gain, parent, branch, record = item
+
+        if gain == 0 or (max_leaf_nodes is not None
+                         and n_leaves >= max_leaf_nodes):
+            setattr(parent, branch, make_leaf(rows))
+            continue
+
+        start = time.perf_counter()
+        true_rows, false_rows = rows.split_in_place(
+            question.column, question.value, question.missing)
+        partition_time = time.perf_counter() - start
+        true_hist = false_hist = None
+        if hist is not None:
+            if len(true_rows) <= len(false_rows):
+                true_hist = count(true_rows)
+                false_hist = hist - true_hist
+            else:
+                false_hist = count(false_rows)
+                true_hist = hist - false_hist
+        if record is not None:
+            record['partition_time'] = partition_time
+            record['count_time'] += (time.perf_counter() - start
+                                     - partition_time)
+
+        node = Node(question, None, None)
+        setattr(parent, branch, node)
+        n_leaves += 1
+        # The true branch is pushed last so it is grown first.
+        grow(false_rows, depth + 1, false_hist, node, 'false_branch')
+        grow(true_rows, depth + 1, true_hist, node, 'true_branch')
+
+    return root.true_branch
 
 
 def print_tree(node, spacing=''):
@@ -286,29 +1105,87 @@ def classify(row, node):
 
     Parameters
     ----------
-    row: list
-        a single instance
+    row: list or Dataset
+        a single instance, or a dataset whose rows are all classified
     node: Leaf or Node
         the decision tree
 
     Returns
     -------
-    Leaf
-        the leaf in which the instance falls
+    Leaf or list[Leaf]
+        the leaf in which the instance falls, or the leaves in which the
+        rows of the dataset fall
     """
-    if isinstance(node, Leaf):
-        return node
+    if isinstance(row, Dataset):
+        return classify_dataset(row, node)
 
-    if node.question.match(row):
-        return classify(row, node.true_branch)
-    else:
-        return classify(row, node.false_branch)
+    while not isinstance(node, Leaf):
+        if node.question.match(row):
+            node = node.true_branch
+        else:
+            node = node.false_branch
+
+    return node
+
+
+def classify_dataset(data, node):
+    """Classify every row of a dataset according to the decision tree.
+
+    The rows are sent down the tree together, one vectorized question
+    per node.
+
+    Parameters
+    ----------
+    data: Dataset
+        the instances to be classified
+    node: Leaf or Node
+        the decision tree
+
+    Returns
+    -------
+    list[Leaf]
+        the leaves in which the rows fall, in the order of the rows
+    """
+    leaves = [None] * len(data)
+    stack = [(node, np.arange(len(data)))]
+    while stack:
+        node, positions = stack.pop()
+        if isinstance(node, Leaf):
+            for pos in positions:
+                leaves[pos] = node
+            continue
+
+        view = data.subset(data.indices[positions])
+        question = node.question
+        mask = view.match(question.column, question.value, question.missing)
+        stack.append((node.false_branch, positions[~mask]))
+        stack.append((node.true_branch, positions[mask]))
+
+    return leaves
+
+
+def majority_vote(leaf, class_weight=None):
+    """Determine the class of the leaf by majority vote.
 
+    Parameters
+    ----------
+    leaf: Leaf
+        a leaf, whose class counts may be weighted
+    class_weight: dict
+        class names mapped to the weight of their votes; classes not
+        listed weigh 1 (default to None)
 
-def majority_vote(leaf):
-    """Determine the class of the leaf by majority vote."""
+    Returns
+    -------
+    str
+        the class with the largest, possibly weighted, count; ties go
+        to the first one in the predictions
+    """
     pred = leaf.predictions
-    return max(pred, key=lambda elem: int(pred.get(elem)))
+    if class_weight is None:
+        return max(pred, key=lambda elem: float(pred[elem]))
+    return max(pred, key=lambda elem: (float(pred[elem])
+                                       * class_weight.get(elem, 1.0)))
 
 
 if __name__ == '__main__':
@@ -332,21 +1209,14 @@ if __name__ == '__main__':
     iris_headers = ['SepalLength', 'SepalWidth', 'PetalLength', 'PetalWidth',
                     'Class']
 
-    with open('iris.csv') as f:
-        irisreader = csv.reader(f, delimiter=',', quoting=csv.QUOTE_NONNUMERIC)
-        iris_data = list(irisreader)
-
-    random.shuffle(iris_data)
-    n_train = int(len(iris_data) * 0.8)
-    training_data = iris_data[:n_train]
-    test_data = iris_data[n_train:]
+    training_data, test_data = read_csv('iris.csv', iris_headers,
+                                        test_size=0.2)
     tree = build_tree(training_data, iris_headers)
     print_tree(tree)
 
     n_false = 0
-    for row in test_data:
-        prediction = majority_vote(classify(row, tree))
-        if row[-1] != prediction:
+    for leaf, label in zip(classify(test_data, tree), test_data.labels()):
+        if test_data.classes[label] != majority_vote(leaf):
             n_false += 1
     accuracy = 1 - n_false / len(test_data)
 
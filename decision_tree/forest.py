@@ -0,0 +1,217 @@
+"""Random forests of decision trees."""
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from compiled import compile_tree
+from dataset import Dataset
+from decision_tree import build_tree
+
+# Arrays shared with the worker processes of a pool, set once per
+# worker by its initializer instead of being sent with every task.
+_shared = {}
+
+
+def _init_worker(data, X=None):
+    _shared['data'] = data
+    _shared['X'] = X
+
+
+def _fit_tree(data, seed, bootstrap, tree_options):
+    """Grow one tree of a forest on a bootstrap sample of data."""
+    rng = np.random.RandomState(seed)
+    sample = data
+    if bootstrap:
+        sample = data.subset(data.indices[rng.randint(0, len(data),
+                                                      len(data))])
+    tree = build_tree(sample, random_state=rng, **tree_options)
+    return tree, compile_tree(tree, data)
+
+
+def _fit_tree_in_worker(args):
+    return _fit_tree(_shared['data'], *args)
+
+
+def _sum_proba_in_worker(trees):
+    return sum(tree.predict_proba(_shared['X']) for tree in trees)
+
+
+def _n_workers(n_jobs):
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+class RandomForest:
+    """A random forest classifier built on `decision_tree.build_tree`.
+
+    Every tree is grown on a bootstrap sample of the training data and
+    searches a random subset of the features at every node. The class
+    probabilities of the forest are the average over its trees of the
+    class shares of the leaves, as counted by `Leaf.predictions`.
+
+    Attributes
+    ----------
+    trees: list
+        the root nodes of the trees, once fitted
+    compiled: list[CompiledTree]
+        the trees flattened for prediction, once fitted
+    classes: list
+        class names, in the order of the probability columns
+
+    Methods
+    -------
+    fit(rows, headers=None)
+        Grow the trees of the forest.
+    predict_proba(X)
+        Class probabilities of every row.
+    predict(X)
+        Classify every row.
+    """
+
+    def __init__(self, n_trees=100, max_features='sqrt', bootstrap=True,
+                 max_depth=None, min_samples_split=2, min_samples_leaf=1,
+                 max_bins=None, n_jobs=None, random_state=None):
+        """Initialize a random forest.
+
+        Parameters
+        ----------
+        n_trees: int, optional
+            Number of trees (default is 100).
+        max_features: int, float, str, or None, optional
+            Number of features searched at every node: a number, a
+            fraction of the features, 'sqrt', 'log2', or None for all of
+            them (default is 'sqrt').
+        bootstrap: bool, optional
+            Whether every tree is grown on a bootstrap sample (default
+            is True).
+        max_depth, min_samples_split, min_samples_leaf, max_bins:
+            Options of `build_tree` used for every tree.
+        n_jobs: int, optional
+            Number of worker processes growing and evaluating the trees
+            (default is None, which means 1; -1 means one per CPU).
+        random_state: int, optional
+            Seed of the random generator (default is None). The forest
+            does not depend on n_jobs.
+        """
+        self.n_trees = n_trees
+        self.max_features = max_features
+        self.bootstrap = bootstrap
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.max_bins = max_bins
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.trees = []
+        self.compiled = []
+        self.classes = []
+
+    def _n_features(self, n_total):
+        """Number of features searched at every node."""
+        max_features = self.max_features
+        if max_features is None:
+            return n_total
+        if max_features == 'sqrt':
+            return max(int(math.sqrt(n_total)), 1)
+        if max_features == 'log2':
+            return max(int(math.log2(n_total)), 1)
+        if isinstance(max_features, float):
+            return max(int(max_features * n_total), 1)
+        return min(max_features, n_total)
+
+    def fit(self, rows, headers=None):
+        """Grow the trees of the forest.
+
+        Parameters
+        ----------
+        rows: list or Dataset
+            the training instances
+        headers: list[str]
+            list of names of the features (default to None)
+
+        Returns
+        -------
+        RandomForest
+            the fitted forest
+        """
+        data = rows
+        if not isinstance(data, Dataset):
+            data = Dataset.from_rows(rows, headers)
+        if self.max_bins is not None:
+            data = data.binned(self.max_bins)
+
+        tree_options = {
+            'headers': headers,
+            'max_depth': self.max_depth,
+            'min_samples_split': self.min_samples_split,
+            'min_samples_leaf': self.min_samples_leaf,
+            'max_features': self._n_features(data.n_features),
+        }
+        rng = np.random.RandomState(self.random_state)
+        tasks = [(seed, self.bootstrap, tree_options)
+                 for seed in rng.randint(2 ** 31 - 1, size=self.n_trees)]
+
+        n_workers = _n_workers(self.n_jobs)
+        if n_workers == 1:
+            fitted = [_fit_tree(data, *task) for task in tasks]
+        else:
+            with multiprocessing.Pool(n_workers, _init_worker,
+                                      (data,)) as pool:
+                fitted = pool.map(_fit_tree_in_worker, tasks)
+
+        self.trees = [tree for tree, _ in fitted]
+        self.compiled = [compiled for _, compiled in fitted]
+        self.classes = list(data.classes)
+        return self
+
+    def predict_proba(self, X):
+        """Class probabilities of every row.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            feature matrix encoded like the training Dataset, or a list
+            of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (n_samples, n_classes); column i holds the
+            probability of class classes[i]
+        """
+        if not isinstance(X, np.ndarray):
+            X = self.compiled[0].encode(X)
+
+        n_workers = min(_n_workers(self.n_jobs), len(self.compiled))
+        if n_workers == 1:
+            total = sum(tree.predict_proba(X) for tree in self.compiled)
+        else:
+            chunks = [self.compiled[i::n_workers] for i in range(n_workers)]
+            with multiprocessing.Pool(n_workers, _init_worker,
+                                      (None, X)) as pool:
+                total = sum(pool.map(_sum_proba_in_worker, chunks))
+
+        return total / len(self.compiled)
+
+    def predict(self, X):
+        """Classify every row.
+
+        Parameters
+        ----------
+        X: numpy.ndarray or list
+            feature matrix encoded like the training Dataset, or a list
+            of instances
+
+        Returns
+        -------
+        numpy.ndarray
+            array of shape (n_samples,) of class names
+        """
+        classes = np.empty(len(self.classes), dtype=object)
+        classes[:] = self.classes
+        return classes[self.predict_proba(X).argmax(axis=1)]
@@ -0,0 +1,467 @@
+"""Hoeffding trees, decision trees learned one instance at a time."""
+import math
+
+import numpy as np
+
+from criteria import Entropy
+from criteria import get_criterion
+from dataset import is_missing
+from dataset import is_numeric
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import Question
+from decision_tree import majority_vote
+from splitter import grouped_gains
+
+
+def hoeffding_bound(value_range, delta, n_samples):
+    """Largest gap between a mean of n_samples observations and its
+    expectation, with probability 1 - delta.
+
+    Parameters
+    ----------
+    value_range: float
+        range of the observed values
+    delta: float
+        probability of a larger gap
+    n_samples: int
+        number of observations
+
+    Returns
+    -------
+    float
+        the bound, sqrt(R**2 ln(1 / delta) / (2 n))
+    """
+    return math.sqrt(value_range ** 2 * math.log(1 / delta)
+                     / (2 * n_samples))
+
+
+def _add_count(counts, code):
+    """Count an instance of the class with the given code."""
+    if code >= len(counts):
+        counts.extend([0] * (code + 1 - len(counts)))
+    counts[code] += 1
+
+
+def _class_counts(counts, n_classes):
+    """A list of class counts as an array of n_classes counts."""
+    array = np.zeros(n_classes)
+    array[:len(counts)] = counts
+    return array
+
+
+class GaussianObserver:
+    """The values of a numeric feature at a leaf, as a normal
+    distribution by class.
+
+    Each class keeps its number of values, their mean and sum of squared
+    deviations, updated one value at a time (Welford, 1962), and their
+    smallest and largest values, so the memory of a feature does not
+    grow with the number of instances. The number of values of a class
+    above a threshold is estimated from its normal distribution, as in
+    the numeric Hoeffding trees of Pfahringer, Holmes and Kirkby (2008).
+
+    Attributes
+    ----------
+    n: numpy.ndarray
+        number of values of every class, by class code
+    mean: numpy.ndarray
+        mean of the values of every class
+    m2: numpy.ndarray
+        sum of the squared deviations of the values of every class
+    low: numpy.ndarray
+        smallest value of every class
+    high: numpy.ndarray
+        largest value of every class
+    missing: list
+        class counts of the missing values, by class code
+
+    Methods
+    -------
+    add(val, code)
+        Count a value of the class with the given code.
+    thresholds(n_thresholds)
+        Thresholds evenly spaced between the extreme values.
+    above(threshold, n_classes)
+        Estimated number of values of every class above a threshold.
+    """
+
+    def __init__(self, missing=None):
+        self.n = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.low = np.zeros(0)
+        self.high = np.zeros(0)
+        self.missing = list(missing or [])
+
+    def add(self, val, code):
+        """Count a value, or a missing one if val is None, of the class
+        with the given code."""
+        if val is None:
+            _add_count(self.missing, code)
+            return
+        if code >= len(self.n):
+            extra = code + 1 - len(self.n)
+            self.n = np.append(self.n, np.zeros(extra))
+            self.mean = np.append(self.mean, np.zeros(extra))
+            self.m2 = np.append(self.m2, np.zeros(extra))
+            self.low = np.append(self.low, np.full(extra, np.inf))
+            self.high = np.append(self.high, np.full(extra, -np.inf))
+        self.n[code] += 1
+        delta = val - self.mean[code]
+        self.mean[code] += delta / self.n[code]
+        self.m2[code] += delta * (val - self.mean[code])
+        self.low[code] = min(self.low[code], val)
+        self.high[code] = max(self.high[code], val)
+
+    def thresholds(self, n_thresholds):
+        """Thresholds evenly spaced between the smallest and the largest
+        values, both excluded; empty if all the values are equal."""
+        if not self.n.any():
+            return np.zeros(0)
+        low, high = self.low.min(), self.high.max()
+        if not low < high:
+            return np.zeros(0)
+        steps = np.arange(1, n_thresholds + 1) / (n_thresholds + 1)
+        return np.unique(low + (high - low) * steps)
+
+    def above(self, threshold, n_classes):
+        """Estimated number of values of every class that are at least
+        threshold, as an array of n_classes counts."""
+        counts = np.zeros(n_classes)
+        for code, n in enumerate(self.n):
+            if n == 0 or threshold > self.high[code]:
+                continue
+            if threshold <= self.low[code]:
+                counts[code] = n
+                continue
+            std = math.sqrt(self.m2[code] / n)
+            if std > 0:
+                z = (threshold - self.mean[code]) / (std * math.sqrt(2))
+                counts[code] = n * 0.5 * math.erfc(z)
+            else:
+                counts[code] = n * (self.mean[code] >= threshold)
+        return counts
+
+
+class HoeffdingLeaf(Leaf):
+    """A leaf of a Hoeffding tree.
+
+    Besides the class counts of the instances it received, the leaf
+    counts the classes of every category of every categorical feature,
+    and keeps a `GaussianObserver` of every numeric feature, so the gain
+    of any question can be computed without keeping the instances, in a
+    memory that does not grow with their number.
+
+    Attributes
+    ----------
+    predictions: dict
+        class names mapped to their number of instances
+    depth: int
+        depth of the leaf, the root being at depth 0
+    values: list
+        for every feature, a GaussianObserver if its first value seen by
+        the leaf is a number, or else a dict of its values mapped to the
+        list of their class counts, by class code; missing values are
+        counted under None, and non-numeric values of a numeric feature
+        as missing
+    n_seen: int
+        number of instances received since the leaf was made
+    n_checked: int
+        value of n_seen when a split was last tried
+    """
+
+    def __init__(self, predictions=None, depth=0):
+        self.predictions = dict(predictions or {})
+        self.depth = depth
+        self.values = []
+        self.n_seen = 0
+        self.n_checked = 0
+
+    def add(self, row, code):
+        """Count an instance of the class with the given code."""
+        label = row[-1]
+        self.predictions[label] = self.predictions.get(label, 0) + 1
+        self.n_seen += 1
+        if not self.values:
+            self.values = [{} for _ in range(len(row) - 1)]
+        for column, val in enumerate(row[:-1]):
+            values = self.values[column]
+            if is_missing(val):
+                val = None
+            elif (isinstance(values, dict) and is_numeric(val)
+                  and all(key is None for key in values)):
+                values = self.values[column] = GaussianObserver(
+                    values.get(None))
+            if isinstance(values, GaussianObserver):
+                values.add(val if is_numeric(val) else None, code)
+            else:
+                _add_count(values.setdefault(val, []), code)
+
+
+class HoeffdingTree:
+    """An incremental decision tree for streams of instances.
+
+    Every instance is routed to its leaf, O(depth), where the class
+    counts of its values are updated. Every grace_period instances, a
+    leaf scores the best question on each feature, among n_thresholds
+    thresholds of a numeric one, with
+    `splitter.grouped_gains`, like `build_tree` does on a node. It
+    splits once the Hoeffding bound shows, with probability 1 - delta,
+    that the best question beats the best one on any other feature, or
+    when the bound gets below tie_threshold and the two are as good
+    (Domingos and Hulten, 2000). The children start with the class
+    counts of the split, and learn from the next instances.
+
+    The tree is made of the usual `Node`, `Question` and `Leaf` objects,
+    so `classify`, `print_tree` and `compile_tree` apply to it.
+
+    Attributes
+    ----------
+    tree: HoeffdingLeaf or Node
+        the root node of the tree
+    classes: list
+        class names, in order of first appearance
+    n_seen: int
+        number of instances learned
+
+    Methods
+    -------
+    learn_one(row)
+        Learn from one instance.
+    partial_fit(rows)
+        Learn from a batch of instances.
+    predict(rows)
+        Classify a list of instances.
+    """
+
+    def __init__(self, grace_period=200, delta=1e-7, tie_threshold=0.05,
+                 max_depth=None, min_samples_leaf=1, criterion='gini',
+                 n_thresholds=20, headers=None):
+        """Initialize a Hoeffding tree.
+
+        Parameters
+        ----------
+        grace_period: int, optional
+            Number of instances a leaf receives between two split
+            attempts (default is 200).
+        delta: float, optional
+            Probability of splitting on a question that is not the best
+            one (default is 1e-7).
+        tie_threshold: float, optional
+            Bound below which the best question is taken even if it is
+            not clearly better than the second best (default is 0.05).
+        max_depth: int, optional
+            Largest depth of a leaf, the root being at depth 0 (default
+            is None, which means unlimited).
+        min_samples_leaf: int, optional
+            Smallest number of instances seen by a leaf on either side
+            of a question (default is 1).
+        criterion: {'gini', 'entropy'} or Criterion, optional
+            Impurity criterion of the class counts (default is 'gini').
+        n_thresholds: int, optional
+            Number of thresholds tried on a numeric feature, evenly
+            spaced between its extreme values at the leaf (default is
+            20).
+        headers: list[str], optional
+            List of names of the features (default is None).
+        """
+        self.grace_period = grace_period
+        self.delta = delta
+        self.tie_threshold = tie_threshold
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.criterion = criterion
+        self.n_thresholds = n_thresholds
+        self.headers = headers
+        self.tree = HoeffdingLeaf()
+        self.classes = []
+        self._codes = {}
+        self.n_seen = 0
+
+    def _leaf(self, row):
+        """The node holding row and its parent."""
+        parent, node = None, self.tree
+        while not isinstance(node, Leaf):
+            parent = node
+            if node.question.match(row):
+                node = node.true_branch
+            else:
+                node = node.false_branch
+
+        return node, parent
+
+    def learn_one(self, row):
+        """Learn from one instance.
+
+        Parameters
+        ----------
+        row: list
+            an instance, its class name last
+
+        Returns
+        -------
+        HoeffdingTree
+            the updated model
+        """
+        label = row[-1]
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.classes)
+            self.classes.append(label)
+        self.n_seen += 1
+
+        leaf, parent = self._leaf(row)
+        if self.max_depth is not None and leaf.depth >= self.max_depth:
+            # The leaf never splits, so only its class counts matter.
+            leaf.predictions[label] = leaf.predictions.get(label, 0) + 1
+            return self
+        leaf.add(row, code)
+        if leaf.n_seen - leaf.n_checked >= self.grace_period:
+            leaf.n_checked = leaf.n_seen
+            node = self._try_split(leaf)
+            if node is not None:
+                if parent is None:
+                    self.tree = node
+                elif parent.true_branch is leaf:
+                    parent.true_branch = node
+                else:
+                    parent.false_branch = node
+
+        return self
+
+    def partial_fit(self, rows):
+        """Learn from a batch of instances, one after the other.
+
+        Parameters
+        ----------
+        rows: list
+            a list of instances, their class names last
+
+        Returns
+        -------
+        HoeffdingTree
+            the updated model
+        """
+        for row in rows:
+            self.learn_one(row)
+
+        return self
+
+    def predict(self, rows):
+        """Classify a list of instances.
+
+        Parameters
+        ----------
+        rows: list
+            a list of instances; a trailing class name is ignored
+
+        Returns
+        -------
+        list
+            the class voted by the leaf of every instance
+        """
+        if not self.classes:
+            raise ValueError('the tree has not learned any instance')
+        return [majority_vote(self._leaf(row)[0]) for row in rows]
+
+    def _column_split(self, values, column, current_impurity, criterion,
+                      n_classes):
+        """Best question on a column of a leaf, or None."""
+        if isinstance(values, GaussianObserver):
+            thresholds = values.thresholds(self.n_thresholds)
+            if len(thresholds) == 0:
+                return None
+            # Values between two thresholds are grouped as one, at the
+            # lower threshold, or at the smallest value below the first.
+            uniques = np.concatenate([[values.low.min()], thresholds])
+            above = np.array([values.above(val, n_classes)
+                              for val in uniques] + [np.zeros(n_classes)])
+            counts = above[:-1] - above[1:]
+            missing = None
+            if values.missing:
+                missing = _class_counts(values.missing, n_classes)
+            numeric = True
+        else:
+            missing = None
+            if None in values:
+                missing = _class_counts(values[None], n_classes)
+            keys = [val for val in values if val is not None]
+            if not keys:
+                return None
+            counts = np.array([_class_counts(values[val], n_classes)
+                               for val in keys])
+            uniques = np.empty(len(keys), dtype=object)
+            uniques[:] = keys
+            numeric = False
+        candidates, gains, matched = grouped_gains(
+            uniques, counts, numeric, current_impurity,
+            self.min_samples_leaf, missing, criterion)
+        if len(gains) == 0:
+            return None
+
+        best = gains.argmax()
+        value = candidates[best]
+        value = float(value) if numeric else value
+        question = Question(column, value, self.headers, bool(matched[best]))
+        return float(gains[best]), question
+
+    def _try_split(self, leaf):
+        """Split a leaf if the Hoeffding bound allows it.
+
+        Returns
+        -------
+        Node
+            the node replacing the leaf, or None if it is kept
+        """
+        if len(leaf.predictions) < 2:
+            return None
+        criterion = get_criterion(self.criterion)
+        n_classes = len(self.classes)
+        totals = np.zeros(n_classes)
+        for label, count in leaf.predictions.items():
+            totals[self._codes[label]] = count
+        current_impurity = float(criterion.impurity(totals))
+
+        splits = []
+        for column, values in enumerate(leaf.values):
+            split = self._column_split(values, column, current_impurity,
+                                       criterion, n_classes)
+            if split is not None:
+                splits.append(split)
+        if not splits:
+            return None
+        splits.sort(key=lambda split: split[0], reverse=True)
+        best_gain, question = splits[0]
+        second_gain = splits[1][0] if len(splits) > 1 else 0.0
+
+        value_range = 1.0
+        if criterion is Entropy:
+            value_range = math.log2(max(n_classes, 2))
+        bound = hoeffding_bound(value_range, self.delta, leaf.n_seen)
+        if best_gain <= 0 or (best_gain - second_gain <= bound
+                              and bound >= self.tie_threshold):
+            return None
+
+        values = leaf.values[question.column]
+        if isinstance(values, GaussianObserver):
+            missing = _class_counts(values.missing, n_classes)
+            true_counts = values.above(question.value, n_classes)
+            false_counts = values.above(-np.inf, n_classes) - true_counts
+            if question.missing:
+                true_counts = true_counts + missing
+            else:
+                false_counts = false_counts + missing
+        else:
+            true_counts = np.zeros(n_classes)
+            false_counts = np.zeros(n_classes)
+            for val, counts in values.items():
+                if question.match({question.column: val}):
+                    true_counts += _class_counts(counts, n_classes)
+                else:
+                    false_counts += _class_counts(counts, n_classes)
+        trues, falses = ({self.classes[code]: float(count)
+                          for code, count in enumerate(counts) if count}
+                         for counts in (true_counts, false_counts))
+        return Node(question, HoeffdingLeaf(trues, leaf.depth + 1),
+                    HoeffdingLeaf(falses, leaf.depth + 1))
@@ -0,0 +1,228 @@
+"""Cross-validation and grid search of decision trees."""
+import itertools
+import multiprocessing
+import time
+
+import numpy as np
+
+from dataset import Dataset
+from dataset import read_csv
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import majority_vote
+from forest import _n_workers
+
+# Dataset and folds shared with the worker processes of a pool, set once
+# per worker by its initializer, so a task only carries a fold number
+# and the options of build_tree.
+_shared = {}
+
+
+def _init_worker(data, folds):
+    _shared['data'] = data
+    _shared['folds'] = folds
+
+
+def k_folds(data, n_folds=5, seed=None):
+    """Split the rows of a dataset at random into folds.
+
+    Parameters
+    ----------
+    data: Dataset
+        the instances
+    n_folds: int
+        number of folds (default to 5)
+    seed: int
+        seed of the random generator shuffling the rows (default to
+        None)
+
+    Returns
+    -------
+    list[numpy.ndarray]
+        the row numbers of every fold, in increasing order; their sizes
+        differ by at most one
+    """
+    if not 2 <= n_folds <= len(data):
+        raise ValueError(f'n_folds must be between 2 and {len(data)}, got '
+                         f'{n_folds}')
+    rng = np.random.RandomState(seed)
+    order = data.indices[rng.permutation(len(data))]
+    return [np.sort(fold) for fold in np.array_split(order, n_folds)]
+
+
+def parameter_grid(param_grid):
+    """List every combination of a grid of options.
+
+    Parameters
+    ----------
+    param_grid: dict
+        names of options mapped to the list of their values
+
+    Returns
+    -------
+    list[dict]
+        the combinations, the last option varying fastest
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values))
+            for values in itertools.product(*(param_grid[name]
+                                              for name in names))]
+
+
+def _evaluate(data, folds, fold, tree_options):
+    """Grow a tree on all folds but one and score it on that one.
+
+    Returns
+    -------
+    (float, float, float)
+        the accuracy on the held-out fold, and the time spent growing
+        the tree and classifying the fold, in seconds
+    """
+    train = data.subset(np.concatenate(folds[:fold] + folds[fold + 1:]))
+    test = data.subset(folds[fold])
+
+    start = time.perf_counter()
+    tree = build_tree(train, **tree_options)
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    votes = [majority_vote(leaf) for leaf in classify(test, tree)]
+    predict_time = time.perf_counter() - start
+
+    classes = np.empty(len(data.classes), dtype=object)
+    classes[:] = data.classes
+    accuracy = float(np.mean(np.array(votes, dtype=object)
+                             == classes[test.labels()]))
+    return accuracy, fit_time, predict_time
+
+
+def _evaluate_in_worker(args):
+    return _evaluate(_shared['data'], _shared['folds'], *args)
+
+
+def _run(data, folds, tasks, n_jobs):
+    """Evaluate (fold, tree_options) tasks, in a pool if n_jobs asks."""
+    n_workers = min(_n_workers(n_jobs), len(tasks))
+    if n_workers == 1:
+        return [_evaluate(data, folds, *task) for task in tasks]
+    with multiprocessing.Pool(n_workers, _init_worker,
+                              (data, folds)) as pool:
+        return pool.map(_evaluate_in_worker, tasks, chunksize=1)
+
+
+def _summary(scores):
+    """Mean and spread of the scores of the folds."""
+    accuracy, fit_time, predict_time = map(np.array, zip(*scores))
+    return {
+        'accuracy': accuracy,
+        'mean_accuracy': float(accuracy.mean()),
+        'std_accuracy': float(accuracy.std()),
+        'fit_time': fit_time,
+        'mean_fit_time': float(fit_time.mean()),
+        'predict_time': predict_time,
+        'mean_predict_time': float(predict_time.mean()),
+    }
+
+
+def cross_validate(rows, n_folds=5, headers=None, n_jobs=None, seed=None,
+                   **tree_options):
+    """Estimate the accuracy of `build_tree` by k-fold cross-validation.
+
+    A list of instances is encoded once into a Dataset. With n_jobs,
+    the folds are fitted in a pool of processes that receive the
+    Dataset once each, when they start, and then only fold numbers.
+
+    Parameters
+    ----------
+    rows: list or Dataset
+        the instances
+    n_folds: int
+        number of folds (default to 5)
+    headers: list[str]
+        list of names of the features (default to None)
+    n_jobs: int
+        number of processes (default to None, which means 1; -1 means
+        one per CPU). The scores do not depend on it.
+    seed: int
+        seed of the random split into folds (default to None)
+    **tree_options
+        options of `build_tree`
+
+    Returns
+    -------
+    dict
+        'accuracy', 'fit_time' and 'predict_time' hold the accuracy on
+        every held-out fold and the seconds spent growing the tree and
+        classifying the fold; 'mean_accuracy', 'std_accuracy',
+        'mean_fit_time' and 'mean_predict_time' summarize them
+    """
+    data = rows
+    if not isinstance(data, Dataset):
+        data = Dataset.from_rows(rows, headers)
+    folds = k_folds(data, n_folds, seed)
+    tasks = [(fold, tree_options) for fold in range(n_folds)]
+    return _summary(_run(data, folds, tasks, n_jobs))
+
+
+def grid_search(rows, param_grid, n_folds=5, headers=None, n_jobs=None,
+                seed=None):
+    """Cross-validate `build_tree` for every combination of options.
+
+    Every combination is scored on the same folds, and all the fits of
+    all the combinations are spread over one pool of processes.
+
+    Parameters
+    ----------
+    rows: list or Dataset
+        the instances
+    param_grid: dict
+        names of options of `build_tree` mapped to the list of their
+        values
+    n_folds: int
+        number of folds (default to 5)
+    headers: list[str]
+        list of names of the features (default to None)
+    n_jobs: int
+        number of processes (default to None, which means 1; -1 means
+        one per CPU). The scores do not depend on it.
+    seed: int
+        seed of the random split into folds (default to None)
+
+    Returns
+    -------
+    (dict, list[dict])
+        the options of the highest mean accuracy, the first one on
+        ties, and for every combination, in the order of
+        `parameter_grid`, the summary of `cross_validate` with the
+        options under 'params'
+    """
+    data = rows
+    if not isinstance(data, Dataset):
+        data = Dataset.from_rows(rows, headers)
+    folds = k_folds(data, n_folds, seed)
+    grid = parameter_grid(param_grid)
+    tasks = [(fold, params) for params in grid for fold in range(n_folds)]
+    scores = _run(data, folds, tasks, n_jobs)
+
+    results = []
+    for i, params in enumerate(grid):
+        result = _summary(scores[i * n_folds:(i + 1) * n_folds])
+        result['params'] = params
+        results.append(result)
+    best = max(range(len(results)),
+               key=lambda i: (results[i]['mean_accuracy'], -i))
+    return results[best]['params'], results
+
+
+if __name__ == '__main__':
+    iris_headers = ['SepalLength', 'SepalWidth', 'PetalLength', 'PetalWidth',
+                    'Class']
+    data = read_csv('iris.csv', iris_headers)
+    best, results = grid_search(data, {'max_depth': [1, 2, 3, None],
+                                       'min_samples_leaf': [1, 5]},
+                                seed=0, n_jobs=-1)
+    for result in results:
+        print(f"{result['params']}: {result['mean_accuracy']:.2%} "
+              f"+/- {result['std_accuracy']:.2%}, fit "
+              f"{result['mean_fit_time'] * 1000:.1f} ms")
+    print(f'Best options: {best}')
@@ -0,0 +1,267 @@
+"""Profiles of tree growth and impurity-based feature importances."""
+import threading
+import time
+
+import numpy as np
+
+from decision_tree import Leaf
+from decision_tree import gini_from_counts
+from pruning import node_counts
+
+
+class TreeProfile:
+    """Record of the work done growing a tree.
+
+    Pass a TreeProfile as the profile of `build_tree`. Every node grown
+    adds a record, and every feature scored or counted adds its time
+    to the totals of that feature. Nothing is recorded, and nothing is
+    timed per feature, without a profile.
+
+    Attributes
+    ----------
+    nodes: list[dict]
+        one record per node, in the order they were grown: its 'depth',
+        'n_rows', the 'column' and 'gain' of its question (None and 0 for
+        a leaf), and the seconds spent counting its histograms
+        ('count_time'), searching its split ('search_time') and
+        partitioning its rows ('partition_time')
+    search_time: dict
+        column numbers mapped to the seconds spent scoring their
+        questions
+    count_time: dict
+        column numbers mapped to the seconds spent counting their
+        histograms
+    candidates: dict
+        column numbers mapped to the number of candidate questions
+        scored: the distinct values, or filled bins, of every node
+
+    Methods
+    -------
+    map_columns(map_columns, rows, task)
+        Wrap a column map function so it times every column.
+    add_node(depth, n_rows, question, gain, count_time, search_time)
+        Record a node.
+    feature_importances(n_features)
+        Impurity decrease brought by every feature.
+    feature_costs(n_features)
+        Training cost of every feature.
+    report(headers=None)
+        Table of the cost and importance of every feature.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.search_time = {}
+        self.count_time = {}
+        self.candidates = {}
+        self._lock = threading.Lock()
+
+    def map_columns(self, map_columns, rows, task):
+        """Wrap a column map function so it times every column.
+
+        Parameters
+        ----------
+        map_columns: callable
+            the map function, such as one of `splitter.column_mapper`
+        rows: Dataset
+            the rows of the node
+        task: {'search', 'count'}
+            whether the columns are scored or counted
+
+        Returns
+        -------
+        callable
+            a map function adding the time spent on every column to
+            search_time or count_time
+        """
+        totals = self.search_time if task == 'search' else self.count_time
+
+        def timed_map(function, columns):
+            def timed(col):
+                start = time.perf_counter()
+                result = function(col)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    totals[col] = totals.get(col, 0.0) + elapsed
+                return result
+
+            if task == 'search':
+                for col in columns:
+                    self.candidates[col] = (self.candidates.get(col, 0)
+                                            + _n_candidates(rows, col))
+            return map_columns(timed, columns)
+
+        return timed_map
+
+    def add_node(self, depth, n_rows, question, gain, count_time,
+                 search_time):
+        """Record a node.
+
+        Returns
+        -------
+        dict
+            the record, whose 'partition_time' is filled in if the node
+            is split
+        """
+        record = {
+            'depth': depth,
+            'n_rows': n_rows,
+            'column': None if question is None else question.column,
+            'gain': gain,
+            'count_time': count_time,
+            'search_time': search_time,
+            'partition_time': 0.0,
+        }
+        self.nodes.append(record)
+        return record
+
+    def feature_importances(self, n_features):
+        """Impurity decrease brought by every feature.
+
+        Parameters
+        ----------
+        n_features: int
+            number of features
+
+        Returns
+        -------
+        numpy.ndarray
+            float array of shape (n_features,), the gains of the
+            questions on every feature weighted by their number of rows,
+            normalized to sum to 1 (all zeros if nothing was split)
+        """
+        importances = np.zeros(n_features)
+        for record in self.nodes:
+            if record['column'] is not None:
+                importances[record['column']] += (record['gain']
+                                                  * record['n_rows'])
+        total = importances.sum()
+        return importances / total if total > 0 else importances
+
+    def feature_costs(self, n_features):
+        """Training cost of every feature.
+
+        Parameters
+        ----------
+        n_features: int
+            number of features
+
+        Returns
+        -------
+        dict
+            'search_time', 'count_time', 'candidates' and 'n_splits' map
+            to arrays of shape (n_features,): the seconds spent scoring
+            and counting every feature, the questions scored on it, and
+            the nodes split on it
+        """
+        def array(totals):
+            values = np.zeros(n_features)
+            for col, value in totals.items():
+                values[col] = value
+            return values
+
+        n_splits = np.zeros(n_features, dtype=int)
+        for record in self.nodes:
+            if record['column'] is not None:
+                n_splits[record['column']] += 1
+        return {
+            'search_time': array(self.search_time),
+            'count_time': array(self.count_time),
+            'candidates': array(self.candidates).astype(int),
+            'n_splits': n_splits,
+        }
+
+    def report(self, headers=None):
+        """Table of the cost and importance of every feature.
+
+        The features are listed from the most to the least costly, so
+        the costly features that never help stand out at the top.
+
+        Parameters
+        ----------
+        headers: list[str]
+            list of names of the features (default to None)
+
+        Returns
+        -------
+        str
+            the table, one line per feature
+        """
+        columns = (set(self.search_time) | set(self.count_time)
+                   | {record['column'] for record in self.nodes
+                      if record['column'] is not None})
+        n_features = max(columns) + 1 if columns else 0
+        if headers is None:
+            headers = [f'headers[{col}]' for col in range(n_features)]
+        costs = self.feature_costs(n_features)
+        importances = self.feature_importances(n_features)
+        seconds = costs['search_time'] + costs['count_time']
+
+        width = max([len('feature')] + [len(str(header))
+                                        for header in headers])
+        lines = [f'{"feature":<{width}}  {"seconds":>9}  {"candidates":>10}  '
+                 f'{"splits":>6}  {"importance":>10}']
+        for col in np.argsort(-seconds, kind='stable'):
+            lines.append(f'{headers[col]:<{width}}  {seconds[col]:>9.4f}  '
+                         f'{costs["candidates"][col]:>10}  '
+                         f'{costs["n_splits"][col]:>6}  '
+                         f'{importances[col]:>10.2%}')
+        return '\n'.join(lines)
+
+
+def _n_candidates(rows, col):
+    """Number of questions scored on a column of a node."""
+    if rows.bins is not None:
+        bins = rows.bins[rows.indices, col]
+        return int(np.count_nonzero(
+            np.bincount(bins, minlength=len(rows.bin_values[col]) + 1)
+            [:len(rows.bin_values[col])]))
+    values = rows.column(col)
+    return len(np.unique(values[~np.isnan(values)]))
+
+
+def feature_importances(tree, n_features=None):
+    """Impurity decrease brought by every feature of a tree.
+
+    The decrease of the Gini index at every node is computed from the
+    class counts of the leaves below it, so this applies to any
+    classification tree, such as a loaded or a pruned one.
+
+    Parameters
+    ----------
+    tree: Leaf or Node
+        a classification tree
+    n_features: int
+        number of features (default to None, which means one more than
+        the largest column asked about)
+
+    Returns
+    -------
+    numpy.ndarray
+        float array of shape (n_features,), normalized to sum to 1 (all
+        zeros for a single leaf)
+    """
+    counts = node_counts(tree)
+    decreases = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Leaf):
+            continue
+        impurity = 0.0
+        for child, sign in ((node, 1), (node.true_branch, -1),
+                            (node.false_branch, -1)):
+            child_counts = counts[id(child)]
+            n_rows = sum(child_counts.values())
+            impurity += sign * n_rows * gini_from_counts(child_counts, n_rows)
+        column = node.question.column
+        decreases[column] = decreases.get(column, 0.0) + impurity
+        stack.extend([node.true_branch, node.false_branch])
+
+    if n_features is None:
+        n_features = max(decreases) + 1 if decreases else 0
+    importances = np.zeros(n_features)
+    for column, decrease in decreases.items():
+        importances[column] = decrease
+    total = importances.sum()
+    return importances / total if total > 0 else importances
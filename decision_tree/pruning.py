@@ -0,0 +1,291 @@
+"""Minimal cost-complexity pruning of decision trees.
+
+The cost of a tree is the Gini index of its leaves weighted by their
+share of the training rows, plus alpha times its number of leaves.
+Pruning collapses first the node whose subtree lowers the cost the
+least per extra leaf, the weakest link. Every statistic is computed
+from the class counts of the leaves, summed up the tree by
+`node_counts`, so the training rows are never partitioned again.
+"""
+import heapq
+
+import numpy as np
+
+from dataset import Dataset
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import classify
+from decision_tree import gini_from_counts
+from decision_tree import majority_vote
+
+
+def node_counts(node):
+    """Class counts of the training rows reaching every node of a tree.
+
+    The counts of a Node are the sum of those of its branches. They are
+    summed on every call and the nodes are left unchanged, so the counts
+    of trees that keep learning, like Hoeffding trees, are never stale.
+
+    Parameters
+    ----------
+    node: Leaf or Node
+        the root of the tree
+
+    Returns
+    -------
+    dict
+        the ids of the nodes mapped to their class counts, class names
+        mapped to their number of rows
+    """
+    counts = {}
+    stack = [(node, False)]
+    while stack:
+        top, summed = stack.pop()
+        if isinstance(top, Leaf):
+            counts[id(top)] = top.predictions
+        elif not summed:
+            stack.extend([(top, True), (top.false_branch, False),
+                          (top.true_branch, False)])
+        else:
+            total = dict(counts[id(top.true_branch)])
+            for label, count in counts[id(top.false_branch)].items():
+                total[label] = total.get(label, 0) + count
+            counts[id(top)] = total
+
+    return counts
+
+
+def _counts_leaf(counts):
+    """A leaf predicting given class counts."""
+    leaf = object.__new__(Leaf)
+    leaf.predictions = dict(counts)
+    return leaf
+
+
+def _flatten(tree):
+    """Number the nodes of a tree in depth-first order.
+
+    The subtree of node i holds the nodes i to end[i] - 1.
+    """
+    nodes, parents = [], []
+    stack = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        parents.append(parent)
+        nodes.append(node)
+        if not isinstance(node, Leaf):
+            stack.append((node.false_branch, len(nodes) - 1))
+            stack.append((node.true_branch, len(nodes) - 1))
+
+    end = list(range(1, len(nodes) + 1))
+    for i in reversed(range(1, len(nodes))):
+        end[parents[i]] = max(end[parents[i]], end[i])
+
+    return nodes, parents, end
+
+
+def _validation_counts(tree, nodes, validation):
+    """Class counts of the validation rows reaching every node."""
+    if isinstance(validation, Dataset):
+        leaves = classify(validation, tree)
+        classes = np.empty(len(validation.classes), dtype=object)
+        classes[:] = validation.classes
+        labels = classes[validation.labels()]
+    else:
+        leaves = [classify(row, tree) for row in validation]
+        labels = [row[-1] for row in validation]
+
+    by_leaf = {}
+    for leaf, label in zip(leaves, labels):
+        counts = by_leaf.setdefault(id(leaf), {})
+        counts[label] = counts.get(label, 0) + 1
+    return [by_leaf.get(id(node), {}) for node in nodes]
+
+
+def _weakest_links(tree, validation=None):
+    """Prune a tree one weakest link at a time.
+
+    Yields
+    ------
+    (float, int, float, int, int)
+        after the tree itself, and after every collapsed node: the
+        effective alpha, the number of the node collapsed (-1 for the
+        tree itself), the cost of the leaves, the number of leaves and
+        the number of validation rows classified right
+    """
+    counts_of = node_counts(tree)
+    nodes, parents, end = _flatten(tree)
+    n_nodes = len(nodes)
+    n_total = sum(counts_of[id(tree)].values())
+    if validation is not None:
+        validation = _validation_counts(tree, nodes, validation)
+
+    # Risk of every node as a leaf, and of the leaves below it.
+    risk = [0.0] * n_nodes
+    subtree_risk = [0.0] * n_nodes
+    n_leaves = [int(isinstance(node, Leaf)) for node in nodes]
+    correct = [0] * n_nodes
+    subtree_correct = [0] * n_nodes
+    for i in reversed(range(n_nodes)):
+        counts = counts_of[id(nodes[i])]
+        n_rows = sum(counts.values())
+        risk[i] = n_rows / n_total * gini_from_counts(counts, n_rows)
+        if validation is not None:
+            vote = majority_vote(_counts_leaf(counts))
+            correct[i] = validation[i].get(vote, 0)
+        if isinstance(nodes[i], Leaf):
+            subtree_risk[i] = risk[i]
+            subtree_correct[i] = correct[i]
+        parent = parents[i]
+        if parent >= 0:
+            n_leaves[parent] += n_leaves[i]
+            subtree_risk[parent] += subtree_risk[i]
+            subtree_correct[parent] += subtree_correct[i]
+            if validation is not None:
+                counts = validation[parent]
+                for label, count in validation[i].items():
+                    counts[label] = counts.get(label, 0) + count
+
+    def weakness(i):
+        return (risk[i] - subtree_risk[i]) / (n_leaves[i] - 1)
+
+    heap = [(weakness(i), i) for i in range(n_nodes)
+            if not isinstance(nodes[i], Leaf)]
+    heapq.heapify(heap)
+    collapsed = [False] * n_nodes
+    dead = [False] * n_nodes
+    alpha = 0.0
+    yield alpha, -1, subtree_risk[0], n_leaves[0], subtree_correct[0]
+    while heap:
+        g, i = heapq.heappop(heap)
+        if dead[i] or collapsed[i] or g != weakness(i):
+            continue
+
+        alpha = max(alpha, g)
+        collapsed[i] = True
+        j = i + 1
+        while j < end[i]:
+            if collapsed[j]:
+                j = end[j]
+                continue
+            dead[j] = True
+            j += 1
+
+        delta_risk = risk[i] - subtree_risk[i]
+        delta_leaves = n_leaves[i] - 1
+        delta_correct = correct[i] - subtree_correct[i]
+        subtree_risk[i], n_leaves[i] = risk[i], 1
+        subtree_correct[i] = correct[i]
+        parent = parents[i]
+        while parent >= 0:
+            subtree_risk[parent] += delta_risk
+            n_leaves[parent] -= delta_leaves
+            subtree_correct[parent] += delta_correct
+            heapq.heappush(heap, (weakness(parent), parent))
+            parent = parents[parent]
+        yield alpha, i, subtree_risk[0], n_leaves[0], subtree_correct[0]
+
+
+def cost_complexity_path(tree, validation=None):
+    """Compute the pruning path of a tree.
+
+    Entry k of the path is the largest subtree minimizing the cost for
+    alphas from alphas[k] up to alphas[k + 1]; the first entry is the
+    tree itself and the last one its root alone.
+
+    Parameters
+    ----------
+    tree: Leaf or Node
+        a classification tree
+    validation: list or Dataset
+        instances on which the subtrees are scored (default to None)
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        the effective alphas, in increasing order, and for every one the
+        Gini index of the leaves weighted by their share of the training
+        rows, the number of leaves, and the accuracy on the validation
+        instances (NaN without them)
+    """
+    path = []
+    for alpha, _, impurity, n_leaves, correct in _weakest_links(
+            tree, validation):
+        if path and path[-1][0] == alpha:
+            path.pop()
+        path.append((alpha, impurity, n_leaves, correct))
+
+    alphas, impurities, n_leaves, correct = map(np.array, zip(*path))
+    if validation is None:
+        accuracies = np.full(len(alphas), np.nan)
+    else:
+        accuracies = correct / max(len(validation), 1)
+    return alphas, impurities, n_leaves, accuracies
+
+
+def select_alpha(tree, validation):
+    """Choose the alpha whose pruned tree is the most accurate.
+
+    Parameters
+    ----------
+    tree: Leaf or Node
+        a classification tree
+    validation: list or Dataset
+        instances held out of the training of the tree
+
+    Returns
+    -------
+    float
+        the alpha of the most accurate subtree of the pruning path; the
+        smallest subtree wins ties
+    """
+    alphas, _, _, accuracies = cost_complexity_path(tree, validation)
+    best = len(accuracies) - 1 - np.argmax(accuracies[::-1])
+    return float(alphas[best])
+
+
+def prune_tree(tree, ccp_alpha):
+    """Prune a tree at a given complexity parameter.
+
+    Parameters
+    ----------
+    tree: Leaf or Node
+        a classification tree; it is left unchanged
+    ccp_alpha: float
+        complexity parameter; the nodes whose effective alpha is at most
+        ccp_alpha become leaves
+
+    Returns
+    -------
+    Leaf or Node
+        the pruned tree, sharing its questions and leaves with tree
+    """
+    nodes, parents, _ = _flatten(tree)
+    counts_of = node_counts(tree)
+    collapsed = set()
+    for alpha, i, _, _, _ in _weakest_links(tree):
+        if alpha > ccp_alpha:
+            break
+        if i >= 0:
+            collapsed.add(i)
+
+    pruned = [None] * len(nodes)
+    for i in reversed(range(len(nodes))):
+        node = nodes[i]
+        if i in collapsed:
+            pruned[i] = _counts_leaf(counts_of[id(node)])
+        elif isinstance(node, Leaf):
+            pruned[i] = node
+        else:
+            pruned[i] = Node(node.question, None, None)
+
+    for i in range(1, len(nodes)):
+        parent = pruned[parents[i]]
+        if isinstance(parent, Leaf):
+            continue
+        if parent.true_branch is None:
+            parent.true_branch = pruned[i]
+        else:
+            parent.false_branch = pruned[i]
+
+    return pruned[0]
@@ -0,0 +1,151 @@
+"""Binary files of compiled decision trees.
+
+A file starts with the magic bytes `DTREE`, a format version and the
+length of a JSON header, all little-endian. The header holds the class
+names, categories and feature names of every tree, and the dtype, shape
+and offset of each of its arrays. The arrays follow as raw little-endian
+data, every one aligned to ALIGNMENT bytes, so they can be used in place
+from a memory map of the file.
+"""
+import json
+import struct
+
+import numpy as np
+
+from compiled import CompiledTree
+from compiled import compile_tree
+
+MAGIC = b'DTREE'
+VERSION = 3
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<5sHI')
+_ARRAYS = {
+    'feature': '<i4',
+    'threshold': '<f8',
+    'numeric': '|b1',
+    'true_child': '<i4',
+    'false_child': '<i4',
+    'counts': '<f8',
+    'prediction': '<i4',
+    'value': '<f8',
+    'missing': '|b1',
+    'subset': '|b1',
+    'set_node': '<i4',
+    'set_code': '<i4',
+}
+# Arrays left out of the file, mapped to the array that has to be all
+# zeros for them to be.
+_OPTIONAL = {
+    'value': 'value',
+    'missing': 'missing',
+    'subset': 'subset',
+    'set_node': 'subset',
+    'set_code': 'subset',
+}
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_tree(tree, path):
+    """Write one or several decision trees to a binary file.
+
+    Node numbers and features are stored as 32-bit integers. The value,
+    missing and category set arrays are left out when they are all
+    zeros.
+
+    Parameters
+    ----------
+    tree: Leaf, Node, CompiledTree, or list
+        the tree, or a list of trees such as `RandomForest.compiled`
+    path: str
+        path of the file written
+    """
+    trees = tree if isinstance(tree, list) else [tree]
+    trees = [node if isinstance(node, CompiledTree) else compile_tree(node)
+             for node in trees]
+
+    arrays, specs, offset = [], [], 0
+    for compiled in trees:
+        spec = {
+            'classes': compiled.classes,
+            'categories': compiled.categories,
+            'headers': compiled.headers,
+            'arrays': {},
+        }
+        for name, dtype in _ARRAYS.items():
+            array = getattr(compiled, name)
+            if (name in _OPTIONAL
+                    and not np.any(getattr(compiled, _OPTIONAL[name]))):
+                continue
+            array = np.ascontiguousarray(array, dtype=dtype)
+            offset = _aligned(offset)
+            spec['arrays'][name] = [dtype, list(array.shape), offset]
+            arrays.append((offset, array))
+            offset += array.nbytes
+        specs.append(spec)
+
+    header = json.dumps({'list': isinstance(tree, list),
+                         'trees': specs}).encode()
+    start = _aligned(_PREAMBLE.size + len(header))
+    with open(path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for position, array in arrays:
+            f.seek(start + position)
+            f.write(array.tobytes())
+        f.truncate(start + offset)
+
+
+def load_tree(path, mmap=True):
+    """Read decision trees written by `save_tree`.
+
+    With mmap, the arrays of the trees are read-only views on a memory
+    map of the file: loading reads only the header, and the processes
+    loading the same file share one copy of the arrays in the page
+    cache.
+
+    Parameters
+    ----------
+    path: str
+        path of the file
+    mmap: bool
+        whether to map the file instead of reading it (default to True)
+
+    Returns
+    -------
+    CompiledTree or list[CompiledTree]
+        the tree, or the list of trees if a list was saved
+    """
+    with open(path, 'rb') as f:
+        magic, version, header_size = _PREAMBLE.unpack(
+            f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a decision tree file')
+        if version > VERSION:
+            raise ValueError(f'{path} has format version {version}, newer '
+                             f'than the supported version {VERSION}')
+        header = json.loads(f.read(header_size).decode())
+
+    if mmap:
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+    start = _aligned(_PREAMBLE.size + header_size)
+
+    trees = []
+    for spec in header['trees']:
+        arrays = {}
+        for name, (dtype, shape, offset) in spec['arrays'].items():
+            dtype = np.dtype(dtype)
+            size = dtype.itemsize * int(np.prod(shape))
+            offset += start
+            arrays[name] = data[offset:offset + size].view(dtype).reshape(
+                shape)
+        trees.append(CompiledTree(classes=spec['classes'],
+                                  categories=spec['categories'],
+                                  headers=spec['headers'], **arrays))
+
+    return trees if header['list'] else trees[0]
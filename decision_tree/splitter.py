@@ -0,0 +1,705 @@
+"""Vectorized split search on a columnar Dataset."""
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from criteria import Gini
+from criteria import weighted
+
+# Below this many rows, scoring a column takes less time than handing
+# it to a thread.
+PARALLEL_MIN_ROWS = 5000
+
+
+def column_gains(values, targets, n_classes, numeric, current_impurity,
+                 min_samples_leaf=1, criterion=Gini, weights=None):
+    """Compute the information gain of every question on a column.
+
+    The rows are grouped by value once, and the statistics of every
+    question follow from the per-value statistics of the criterion: a
+    suffix sum for the `>=` questions of a numeric column, the
+    statistics themselves for the `==` questions of a categorical
+    column. The rows missing the value are summed apart and sent to the
+    side where they gain most.
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        the values of the column, NaN where missing
+    targets: numpy.ndarray
+        the class codes, or the numeric targets, of the rows
+    n_classes: int
+        number of classes
+    numeric: bool
+        whether the column is numeric
+    current_impurity: float
+        impurity of the rows
+    min_samples_leaf: int
+        smallest number of rows on either side of a question (default
+        to 1)
+    criterion: Criterion
+        the impurity criterion (default to Gini)
+    weights: numpy.ndarray
+        weight of every row (default to None, which means 1)
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        the candidate values, their information gain and whether the
+        missing values match them. Values whose question leaves fewer
+        than min_samples_leaf rows on one side are left out.
+    """
+    criterion = weighted(criterion, weights)
+    uniques, stats, missing = value_statistics(values, targets, n_classes,
+                                               criterion, weights)
+    return grouped_gains(uniques, stats, numeric, current_impurity,
+                         min_samples_leaf, missing, criterion)
+
+
+def value_statistics(values, targets, n_classes, criterion=Gini,
+                     weights=None):
+    """Sum the statistics of the criterion for every value of a column.
+
+    Parameters
+    ----------
+    values: numpy.ndarray
+        the values of the column, NaN where missing
+    targets: numpy.ndarray
+        the class codes, or the numeric targets, of the rows
+    n_classes: int
+        number of classes
+    criterion: Criterion
+        the impurity criterion (default to Gini)
+    weights: numpy.ndarray
+        weight of every row (default to None, which means 1)
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        the distinct values, in increasing order, the statistics of
+        their rows, and those of the rows missing the value (None if
+        there are none)
+    """
+    missing = None
+    is_missing = np.isnan(values)
+    if is_missing.any():
+        n_missing = np.count_nonzero(is_missing)
+        missing = criterion.statistics(
+            np.zeros(n_missing, dtype=np.intp), 1, targets[is_missing],
+            n_classes, None if weights is None else weights[is_missing])[0]
+        values, targets = values[~is_missing], targets[~is_missing]
+        if weights is not None:
+            weights = weights[~is_missing]
+    uniques, inverse = np.unique(values, return_inverse=True)
+    stats = criterion.statistics(inverse.ravel(), len(uniques), targets,
+                                 n_classes, weights)
+    if weights is not None:
+        # Values held only by rows weighing nothing are no candidates.
+        weighed = criterion.n_rows(stats) > 0
+        uniques, stats = uniques[weighed], stats[weighed]
+    return uniques, stats, missing
+
+
+def grouped_gains(uniques, stats, numeric, current_impurity,
+                  min_samples_leaf=1, missing=None, criterion=Gini):
+    """Compute the information gain of every question on a column from
+    the statistics of each of its values.
+
+    Every question is scored with the rows missing the value on its
+    false side, and on its true side if that gains more.
+
+    Parameters
+    ----------
+    uniques: numpy.ndarray
+        the distinct values of the column, in increasing order
+    stats: numpy.ndarray
+        array of shape (len(uniques), n_stats); stats[j] are the
+        statistics of the criterion of the rows whose value is
+        uniques[j]
+    numeric: bool
+        whether the column is numeric
+    current_impurity: float
+        impurity of the rows
+    min_samples_leaf: int
+        smallest number of rows on either side of a question, whatever
+        their weights (default to 1)
+    missing: numpy.ndarray
+        statistics of the rows missing the value (default to None,
+        which means none)
+    criterion: Criterion
+        the impurity criterion (default to Gini); `criteria.Weighted`
+        if the rows are weighted, so their number is known
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        the candidate values, their information gain and whether the
+        missing values match them. Values whose question leaves fewer
+        than min_samples_leaf rows on one side are left out.
+    """
+    has_missing = missing is not None and criterion.n_rows(missing) > 0
+    totals = stats.sum(axis=0)
+    uniques, trues = true_sides(uniques, stats, numeric, has_missing)
+    falses = totals - trues
+    if has_missing:
+        totals = totals + missing
+        options = [(trues, falses + missing), (trues + missing, falses)]
+    else:
+        options = [(trues, falses)]
+
+    n_total = criterion.n_rows(totals)
+    n_samples = criterion.n_samples(totals)
+    gains = []
+    for option_trues, option_falses in options:
+        n_trues = criterion.n_rows(option_trues)
+        n_falses = n_total - n_trues
+        # Rows weighing nothing have no side to be kept on.
+        p = n_trues / n_total if n_total > 0 else n_trues
+        gain = (current_impurity - p * criterion.impurity(option_trues)
+                - (1 - p) * criterion.impurity(option_falses))
+        # Weighted rows may weigh less than 1, so an empty side is one
+        # weighing nothing, while min_samples_leaf counts the rows.
+        true_samples = criterion.n_samples(option_trues)
+        keep = ((n_trues > 0) & (n_falses > 0)
+                & (true_samples >= min_samples_leaf)
+                & (n_samples - true_samples >= min_samples_leaf))
+        gains.append(np.where(keep, gain, -np.inf))
+
+    # The missing values match only if it gains strictly more.
+    matched = gains[-1] > gains[0]
+    gains = np.maximum(gains[0], gains[-1])
+    keep = gains > -np.inf
+    return uniques[keep], gains[keep], matched[keep]
+
+
+def category_split(codes, stats, current_impurity, min_samples_leaf=1,
+                   missing=None, criterion=Gini, subsets=False,
+                   max_categories=None):
+    """Find the best question on a categorical column whose categories
+    may be grouped.
+
+    With max_categories, the rarest categories are pooled into a single
+    group, so a question asks whether the value is any of them. With
+    subsets, the groups are sorted by `criterion.target_statistic` and
+    the questions ask whether the value is in one of the groups of a
+    suffix of that order. With two classes or a regression target, the
+    best of these questions is the best of all the 2**k subsets of the
+    k groups (Breiman et al., 1984), and they are all scored in one
+    sweep of the sorted groups, like the values of a numeric column.
+
+    Parameters
+    ----------
+    codes: numpy.ndarray
+        the distinct category codes of the column
+    stats: numpy.ndarray
+        array of shape (len(codes), n_stats); stats[j] are the
+        statistics of the criterion of the rows of category codes[j]
+    current_impurity: float
+        impurity of the rows
+    min_samples_leaf: int
+        smallest number of rows on either side of a question, whatever
+        their weights (default to 1)
+    missing: numpy.ndarray
+        statistics of the rows missing the value (default to None,
+        which means none)
+    criterion: Criterion
+        the impurity criterion (default to Gini); see `grouped_gains`
+    subsets: bool
+        whether to search subsets of the groups rather than one group at
+        a time (default to False)
+    max_categories: int
+        largest number of groups; the rarest categories past it are
+        pooled into one (default to None, which means no pooling)
+
+    Returns
+    -------
+    (numpy.ndarray, float, bool)
+        the codes of the categories matching the best question, its
+        information gain, and whether the missing values match it; None
+        if no question splits the rows. The first best question wins
+        ties.
+    """
+    groups = [codes[j:j + 1] for j in range(len(codes))]
+    if max_categories is not None and len(codes) > max_categories:
+        by_size = np.argsort(-criterion.n_rows(stats), kind='stable')
+        kept = np.sort(by_size[:max_categories - 1])
+        rare = np.sort(by_size[max_categories - 1:])
+        groups = [groups[j] for j in kept] + [codes[rare]]
+        stats = np.concatenate([stats[kept],
+                                stats[rare].sum(axis=0, keepdims=True)])
+
+    order = np.arange(len(groups))
+    if subsets:
+        order = np.argsort(criterion.target_statistic(stats), kind='stable')
+        stats = stats[order]
+    # With subsets, candidate j is the suffix of groups from j on.
+    candidates, gains, matched = grouped_gains(
+        np.arange(len(groups)), stats, subsets, current_impurity,
+        min_samples_leaf, missing, criterion)
+    if len(gains) == 0:
+        return None
+
+    best = gains.argmax()
+    j = candidates[best]
+    if subsets:
+        matching = np.concatenate([groups[k] for k in order[j:]])
+    else:
+        matching = groups[j]
+    return np.sort(matching), float(gains[best]), bool(matched[best])
+
+
+def category_value(data, column, codes):
+    """The value of a question matching some categories of a column: the
+    category itself if there is one, otherwise a frozenset of them."""
+    if len(codes) == 1:
+        return data.decode(column, codes[0])
+    return frozenset(data.decode(column, code) for code in codes)
+
+
+def true_sides(uniques, stats, numeric, everything=False):
+    """Sum the statistics of the rows matching every question on a
+    column.
+
+    Parameters
+    ----------
+    uniques: numpy.ndarray
+        the distinct values of the column, in increasing order
+    stats: numpy.ndarray
+        array of shape (len(uniques), n_stats); stats[j] are the summed
+        statistics of the rows whose value is uniques[j]
+    numeric: bool
+        whether the column is numeric
+    everything: bool
+        whether to keep the question `>= uniques[0]` of a numeric
+        column, which every row with a value matches (default to False)
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+        the values of the questions and the summed statistics of their
+        true sides: a suffix sum for the `>=` questions of a numeric
+        column, the statistics themselves for the `==` questions of a
+        categorical column
+    """
+    if not numeric:
+        return uniques, stats
+    # Questions `>= uniques[j]` for j >= 1; j == 0 keeps every row with
+    # a value, so it only splits off the missing ones.
+    start = 0 if everything else 1
+    return uniques[start:], np.cumsum(stats[::-1], axis=0)[::-1][start:]
+
+
+def last_in_set_order(values, candidates):
+    """Return the candidate visited last when iterating set(values).
+
+    This is how a loop over the distinct values of a column that keeps
+    the last best question breaks ties.
+    """
+    candidates = set(candidates)
+    last = None
+    for val in set(values):
+        if val in candidates:
+            last = val
+
+    return last
+
+
+def column_mapper(n_jobs=None, n_rows=None):
+    """Return a map function scoring the columns of a node.
+
+    The columns are mapped by a pool of threads shared by all calls
+    with the same n_jobs. NumPy releases the GIL while sorting and
+    counting, so the threads score features at the same time on the
+    arrays of the dataset, without copying them.
+
+    Parameters
+    ----------
+    n_jobs: int
+        number of threads (default to None, which means 1). Negative
+        values count from the number of CPUs: -1 means all of them.
+    n_rows: int
+        number of rows of the node (default to None). Nodes of fewer
+        than PARALLEL_MIN_ROWS rows are scored serially.
+
+    Returns
+    -------
+    callable
+        a function with the signature of the builtin map
+    """
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = max(os.cpu_count() + 1 + n_jobs, 1)
+    if (n_jobs is None or n_jobs == 1
+            or (n_rows is not None and n_rows < PARALLEL_MIN_ROWS)):
+        return map
+    return _thread_pool(n_jobs).map
+
+
+@functools.lru_cache(maxsize=None)
+def _thread_pool(n_jobs):
+    return ThreadPoolExecutor(n_jobs)
+
+
+def pick_best(columns, scores):
+    """Pick the best of the questions found on every column.
+
+    Parameters
+    ----------
+    columns: iterable
+        the column numbers searched, in increasing order
+    scores: iterable
+        for every column, None if no question splits it, otherwise the
+        value of its best question, its information gain, and whether
+        the missing values match it
+
+    Returns
+    -------
+    (int, int or float or str, float, bool)
+        the column, the value, the information gain of the best question
+        and whether the missing values match it; the last column wins
+        ties
+    """
+    best_gain = 0
+    best_column, best_value, best_missing = None, None, False
+    for col, score in zip(columns, scores):
+        if score is not None and best_gain <= score[1]:
+            best_column, (best_value, best_gain, best_missing) = col, score
+
+    return best_column, best_value, best_gain, best_missing
+
+
+def best_split(data, min_samples_leaf=1, map_columns=map, columns=None,
+               criterion=Gini, targets=None, categorical_subsets=False,
+               max_categories=None):
+    """Find the best question to split a dataset.
+
+    Ties are broken like `decision_tree.find_best_split` does on a list
+    of instances: the last column wins, and within a column the value
+    visited last by a loop over the set of its values. Categorical
+    columns searched by `category_split` keep its first best question.
+    The statistics of weighted rows add up their weights.
+
+    Parameters
+    ----------
+    data: Dataset
+        the rows to be split
+    min_samples_leaf: int
+        smallest number of rows on either side of a question (default
+        to 1)
+    map_columns: callable
+        map function used to score the columns (default to map)
+    columns: list[int]
+        the columns searched, in increasing order (default to None,
+        which means all of them)
+    criterion: Criterion
+        the impurity criterion (default to Gini)
+    targets: numpy.ndarray
+        numeric target of every row of data.X, for a regression
+        criterion (default to None, which means the class codes)
+    categorical_subsets: bool
+        whether categorical questions ask for a subset of the categories
+        (default to False); see `category_split`
+    max_categories: int
+        largest number of groups of categories of a question; the
+        rarest ones are pooled (default to None, which means no pooling)
+
+    Returns
+    -------
+    (int, int or float or str or frozenset, float, bool)
+        the column and the value of the best question, its information
+        gain, and whether the missing values match it. Column and value
+        are None if no question splits the rows.
+    """
+    grouped = categorical_subsets or max_categories is not None
+    if targets is None:
+        # Number the classes in order of first appearance, so the Gini
+        # indices round like the ones of the list implementation.
+        labels = data.labels()
+        codes, first = np.unique(labels, return_index=True)
+        n_classes = len(codes)
+        rank = np.empty(len(data.classes), dtype=np.intp)
+        rank[codes[np.argsort(first)]] = np.arange(n_classes)
+        targets = rank[labels]
+    else:
+        targets, n_classes = targets[data.indices], 0
+    weights = data.row_weights()
+    criterion = weighted(criterion, weights)
+    current_impurity = float(criterion.impurity(criterion.statistics(
+        np.zeros(len(targets), dtype=np.intp), 1, targets, n_classes,
+        weights)[0]))
+
+    def score(col):
+        values = data.column(col)
+        if grouped and not data.is_numeric(col):
+            codes, stats, missing = value_statistics(values, targets,
+                                                     n_classes, criterion,
+                                                     weights)
+            best = category_split(codes, stats, current_impurity,
+                                  min_samples_leaf, missing, criterion,
+                                  categorical_subsets, max_categories)
+            if best is None:
+                return None
+            return (category_value(data, col, best[0]),) + best[1:]
+
+        candidates, gains, matched = column_gains(
+            values, targets, n_classes, data.is_numeric(col),
+            current_impurity, min_samples_leaf, criterion, weights)
+        if len(gains) == 0:
+            return None
+
+        gain = gains.max()
+        tied = gains == gain
+        if np.count_nonzero(tied) == 1:
+            best = gains.argmax()
+            return (data.decode(col, candidates[best]), float(gain),
+                    bool(matched[best]))
+        values = values[~np.isnan(values)]
+        value = last_in_set_order([data.decode(col, val) for val in values],
+                                  [data.decode(col, val)
+                                   for val in candidates[tied]])
+        best = np.flatnonzero(tied)[[data.decode(col, val)
+                                     for val in candidates[tied]
+                                     ].index(value)]
+        return value, float(gain), bool(matched[best])
+
+    if columns is None:
+        columns = range(data.n_features)
+    return pick_best(columns, map_columns(score, columns))
+
+
+def histogram(data, map_columns=map, criterion=Gini, targets=None):
+    """Sum the statistics of the criterion in every bin of every
+    feature.
+
+    Parameters
+    ----------
+    data: Dataset
+        a dataset returned by `Dataset.binned`
+    map_columns: callable
+        map function used to count the columns (default to map)
+    criterion: Criterion
+        the impurity criterion (default to Gini)
+    targets: numpy.ndarray
+        numeric target of every row of data.X, for a regression
+        criterion (default to None, which means the class codes)
+
+    Returns
+    -------
+    numpy.ndarray
+        array of shape (n_features, n_bins + 1, n_stats); entry [f, b]
+        holds the statistics of the rows in bin b of feature f, and
+        entry [f, -1] those of the rows missing feature f. With class
+        counts, entry [f, b, c] is the number of rows of class c, or
+        their total weight if the rows are weighted, in which case the
+        number of rows follows the statistics; see `criteria.Weighted`.
+    """
+    if targets is None:
+        targets, n_classes = data.labels(), len(data.classes)
+    else:
+        targets, n_classes = targets[data.indices], 0
+    weights = data.row_weights()
+    criterion = weighted(criterion, weights)
+    n_bins = max(len(values) for values in data.bin_values) + 1
+    hist = None
+
+    def count(col):
+        bins = data.bins[data.indices, col].astype(np.intp)
+        return criterion.statistics(bins, n_bins, targets, n_classes,
+                                    weights)
+
+    for col, stats in enumerate(map_columns(count, range(data.n_features))):
+        if hist is None:
+            hist = np.empty((data.n_features,) + stats.shape, stats.dtype)
+        hist[col] = stats
+
+    return hist
+
+
+def histogram_split(data, hist, min_samples_leaf=1, map_columns=map,
+                    columns=None, criterion=Gini, categorical_subsets=False,
+                    max_categories=None):
+    """Find the best question to split a binned dataset.
+
+    Only the bins are looked at: numeric questions are `>=` the lower
+    edge of a bin and categorical ones `==` a category. The rows missing
+    the value, counted in the last bin, are sent to the side where they
+    gain most. Ties go to the last column and, within a column, to the
+    lowest bin.
+
+    Parameters
+    ----------
+    data: Dataset
+        a dataset returned by `Dataset.binned`
+    hist: numpy.ndarray
+        the histogram of data, as returned by `histogram`
+    min_samples_leaf: int
+        smallest number of rows on either side of a question (default
+        to 1)
+    map_columns: callable
+        map function used to score the columns (default to map)
+    columns: list[int]
+        the columns searched, in increasing order (default to None,
+        which means all of them)
+    criterion: Criterion
+        the criterion the histogram was summed with (default to Gini)
+    categorical_subsets: bool
+        whether categorical questions ask for a subset of the categories
+        (default to False); see `category_split`
+    max_categories: int
+        largest number of groups of categories of a question; the
+        rarest ones are pooled (default to None, which means no pooling)
+
+    Returns
+    -------
+    (int, int or float or str or frozenset, float, bool)
+        the column and the value of the best question, its information
+        gain, and whether the missing values match it. Column and value
+        are None if no question splits the rows.
+    """
+    criterion = weighted(criterion, data.weights)
+    current_impurity = float(criterion.impurity(hist[0].sum(axis=0)))
+    grouped = categorical_subsets or max_categories is not None
+
+    def score(col):
+        bin_values = data.bin_values[col]
+        stats = hist[col, :len(bin_values)]
+        filled = criterion.n_rows(stats) > 0
+        if grouped and not data.is_numeric(col):
+            best = category_split(bin_values[filled], stats[filled],
+                                  current_impurity, min_samples_leaf,
+                                  hist[col, -1], criterion,
+                                  categorical_subsets, max_categories)
+            if best is None:
+                return None
+            return (category_value(data, col, best[0]),) + best[1:]
+
+        candidates, gains, matched = grouped_gains(
+            bin_values[filled], stats[filled], data.is_numeric(col),
+            current_impurity, min_samples_leaf, hist[col, -1], criterion)
+        if len(gains) == 0:
+            return None
+
+        best = gains.argmax()
+        return (data.decode(col, candidates[best]), float(gains[best]),
+                bool(matched[best]))
+
+    if columns is None:
+        columns = range(data.n_features)
+    return pick_best(columns, map_columns(score, columns))
+
+
+def gradient_histogram(data, grad, hess, map_columns=map):
+    """Sum the gradients, hessians and rows of every bin of every
+    feature.
+
+    Parameters
+    ----------
+    data: Dataset
+        a dataset returned by `Dataset.binned`
+    grad: numpy.ndarray
+        gradient of the loss at every row of data.X
+    hess: numpy.ndarray
+        hessian of the loss at every row of data.X
+    map_columns: callable
+        map function used to count the columns (default to map)
+
+    Returns
+    -------
+    numpy.ndarray
+        array of shape (n_features, n_bins + 1, 3); entry [f, b] holds
+        the sums of the gradients, of the hessians and the number of
+        rows in bin b of feature f, and entry [f, -1] those of the rows
+        missing feature f
+    """
+    grad, hess = grad[data.indices], hess[data.indices]
+    n_bins = max(len(values) for values in data.bin_values) + 1
+    hist = np.empty((data.n_features, n_bins, 3))
+
+    def count(col):
+        bins = data.bins[data.indices, col]
+        hist[col, :, 0] = np.bincount(bins, grad, minlength=n_bins)
+        hist[col, :, 1] = np.bincount(bins, hess, minlength=n_bins)
+        hist[col, :, 2] = np.bincount(bins, minlength=n_bins)
+
+    for _ in map_columns(count, range(data.n_features)):
+        pass
+
+    return hist
+
+
+def gradient_split(data, hist, l2_regularization=0, min_samples_leaf=1,
+                   map_columns=map, columns=None):
+    """Find the question reducing a second order approximation of the
+    loss the most.
+
+    The gain of a question is half of
+    G_true**2 / (H_true + l2) + G_false**2 / (H_false + l2)
+    - G**2 / (H + l2), where G and H are sums of gradients and hessians.
+    The rows missing the value are sent to the side where they gain
+    most. Ties go to the last column and, within a column, to the lowest
+    bin.
+
+    Parameters
+    ----------
+    data: Dataset
+        a dataset returned by `Dataset.binned`
+    hist: numpy.ndarray
+        the histogram of data, as returned by `gradient_histogram`
+    l2_regularization: float
+        L2 penalty on the leaf values (default to 0)
+    min_samples_leaf: int
+        smallest number of rows on either side of a question (default
+        to 1)
+    map_columns: callable
+        map function used to score the columns (default to map)
+    columns: list[int]
+        the columns searched, in increasing order (default to None,
+        which means all of them)
+
+    Returns
+    -------
+    (int, int or float or str, float, bool)
+        the column and the value of the best question, its gain, and
+        whether the missing values match it. Column and value are None
+        if no question reduces the loss.
+    """
+    totals = hist[0].sum(axis=0)
+
+    def objective(stats):
+        return stats[..., 0] ** 2 / (stats[..., 1] + l2_regularization)
+
+    def score(col):
+        bin_values = data.bin_values[col]
+        stats = hist[col, :len(bin_values)]
+        missing = hist[col, -1]
+        filled = stats[:, 2] > 0
+        candidates, trues = true_sides(bin_values[filled], stats[filled],
+                                       data.is_numeric(col), missing[2] > 0)
+        options = [trues]
+        if missing[2] > 0:
+            options.append(trues + missing)
+
+        min_rows = max(min_samples_leaf, 1)
+        gains = []
+        for option_trues in options:
+            option_falses = totals - option_trues
+            # Sides left empty are scored too, then dropped.
+            with np.errstate(divide='ignore', invalid='ignore'):
+                gain = (objective(option_trues) + objective(option_falses)
+                        - objective(totals)) / 2
+            keep = ((option_trues[:, 2] >= min_rows)
+                    & (option_falses[:, 2] >= min_rows))
+            gains.append(np.where(keep, gain, -np.inf))
+        matched = gains[-1] > gains[0]
+        gains = np.maximum(gains[0], gains[-1])
+        if not (gains > -np.inf).any():
+            return None
+
+        best = gains.argmax()
+        return (data.decode(col, candidates[best]), float(gains[best]),
+                bool(matched[best]))
+
+    if columns is None:
+        columns = range(data.n_features)
+    return pick_best(columns, map_columns(score, columns))
@@ -0,0 +1,45 @@
+import unittest
+
+from benchmark import compare
+from benchmark import dataset_rows
+from benchmark import run_suite
+from benchmark import synthetic_dataset
+from dataset import Dataset
+
+
+class TestSyntheticDataset(unittest.TestCase):
+    def test_cardinality(self):
+        data = synthetic_dataset(500, 4, n_classes=3, cardinality=5)
+        self.assertEqual(data.categories[0], None)
+        self.assertEqual(len(data.categories[1]), 5)
+        for col in range(4):
+            self.assertEqual(len(set(data.column(col))), 5)
+        self.assertEqual(sorted(set(data.labels())), [0, 1, 2])
+
+    def test_dataset_rows(self):
+        data = synthetic_dataset(50, 4, cardinality=3)
+        rows = dataset_rows(data)
+        self.assertEqual(len(rows), 50)
+        for row, code, label in zip(rows, data.column(1), data.labels()):
+            self.assertEqual(row[1], data.categories[1][int(code)])
+            self.assertEqual(row[-1], data.classes[label])
+        self.assertEqual(Dataset.from_rows(rows).n_features, 4)
+
+
+class TestSuite(unittest.TestCase):
+    def test_run_and_compare(self):
+        results = run_suite([200], [3], [None, 4], [2], repeat=1,
+                            max_depth=3)
+        functions = [record['function'] for record in results['results']]
+        self.assertEqual(len(functions), 10)
+        self.assertIn('majority_vote', functions)
+        for record in results['results']:
+            self.assertGreater(record['seconds'], 0)
+            self.assertGreaterEqual(record['peak_bytes'], 0)
+        ratios = compare(results, results)
+        self.assertEqual(len(ratios), 10)
+        self.assertTrue(all(seconds == 1 for _, seconds, _ in ratios))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+
+from boosting import GradientBoosting
+from dataset import Dataset
+from decision_tree import Question
+from decision_tree import partition
+from splitter import gradient_histogram
+
+
+class TestGradientBoosting(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.normal(size=(2000, 4))
+        self.targets = (np.where(self.X[:, 0] > 0, 2.0, -1.0) + self.X[:, 1]
+                        + rng.normal(scale=0.1, size=2000))
+        self.data = Dataset(self.X[:1500], np.zeros(1500, dtype=int), [0])
+
+    def test_squared_error(self):
+        model = GradientBoosting(n_rounds=50, learning_rate=0.3)
+        model.fit(self.data, self.targets[:1500])
+        losses = model.training_loss
+        self.assertTrue(all(a >= b for a, b in zip(losses, losses[1:])))
+        error = model.predict(self.X[1500:]) - self.targets[1500:]
+        self.assertLess(np.mean(error ** 2), 0.1)
+
+    def test_training_scores(self):
+        model = GradientBoosting(n_rounds=5).fit(self.data,
+                                                 self.targets[:1500])
+        scores = model.decision_function(self.X[:1500])
+        self.assertAlmostEqual(
+            np.mean((scores - self.targets[:1500]) ** 2) / 2,
+            model.training_loss[-1])
+
+    def test_log_loss(self):
+        labels = np.where(self.X[:, 0] + self.X[:, 1] > 0, 'pos', 'neg')
+        rows = np.column_stack([self.X, labels]).tolist()
+        rows = [[float(val) for val in row[:-1]] + row[-1:] for row in rows]
+        model = GradientBoosting('log_loss', n_rounds=30)
+        model.fit(rows[:1500])
+        self.assertEqual(sorted(model.classes), ['neg', 'pos'])
+        accuracy = np.mean(model.predict(rows[1500:]) == labels[1500:])
+        self.assertGreater(accuracy, 0.9)
+        np.testing.assert_allclose(model.predict_proba(rows[:5]).sum(axis=1),
+                                   1)
+
+    def test_early_stopping(self):
+        model = GradientBoosting(n_rounds=500, learning_rate=0.5,
+                                 max_depth=6, min_samples_leaf=1,
+                                 early_stopping_rounds=3)
+        model.fit(self.data, self.targets[:1500],
+                  validation=(self.X[1500:], self.targets[1500:]))
+        self.assertLess(len(model.validation_loss), 500)
+        self.assertEqual(len(model.trees), model.best_round)
+        self.assertEqual(min(model.validation_loss),
+                         model.validation_loss[model.best_round - 1])
+
+    def test_gradient_histogram(self):
+        binned = self.data.binned(16)
+        grad, hess = self.targets[:1500], np.ones(1500)
+        hist = gradient_histogram(binned, grad, hess)
+        np.testing.assert_allclose(hist[0].sum(axis=0),
+                                   [grad.sum(), 1500, 1500])
+        trues, falses = partition(binned, Question(0, 0.0))
+        np.testing.assert_allclose(
+            hist - gradient_histogram(trues, grad, hess),
+            gradient_histogram(falses, grad, hess), atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+import codegen
+from codegen import export_tree
+from codegen import load_source
+from codegen import to_source
+from compiled import compile_tree
+from dataset import Dataset
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import Question
+from decision_tree import build_regression_tree
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import majority_vote
+from testing import mixed_rows
+from testing import predictions
+
+
+class TestCodegen(unittest.TestCase):
+    def setUp(self):
+        self.rows = mixed_rows(missing=True)
+        self.tree = build_tree(self.rows, ['number', 'letter', 'integer'],
+                               max_depth=6)
+        self.test_rows = self.rows + [[0.5, 'unseen', 1, 'x'],
+                                      [None, None, None, 'x'],
+                                      [float('nan'), 'a', 2, 'x']]
+
+    def expected(self, tree):
+        return predictions(tree, self.test_rows)
+
+    def test_predict(self):
+        module = load_source(to_source(self.tree))
+        self.assertEqual([module.predict(row) for row in self.test_rows],
+                         self.expected(self.tree))
+
+    def test_predict_batch(self):
+        module = load_source(to_source(self.tree))
+        self.assertEqual(list(module.predict_batch(self.test_rows)),
+                         self.expected(self.tree))
+        data = Dataset.from_rows(self.rows)
+        module = load_source(to_source(self.tree, data))
+        self.assertEqual(list(module.predict_batch(data.X)),
+                         self.expected(self.tree)[:len(self.rows)])
+
+    def test_category_subsets(self):
+        tree = build_tree(self.rows, max_depth=6, categorical_subsets=True)
+        self.assertTrue(compile_tree(tree).subset.any())
+        module = load_source(to_source(tree))
+        self.assertEqual([module.predict(row) for row in self.test_rows],
+                         self.expected(tree))
+        self.assertEqual(list(module.predict_batch(self.test_rows)),
+                         self.expected(tree))
+
+    def test_regression(self):
+        rows = [[x / 10, x % 3, (x / 10) ** 2] for x in range(100)]
+        tree = build_regression_tree(rows, max_depth=4)
+        module = load_source(to_source(tree))
+        expected = [classify(row, tree).value for row in rows]
+        self.assertEqual([module.predict(row) for row in rows], expected)
+        np.testing.assert_array_equal(module.predict_batch(rows), expected)
+
+    def test_unused_categorical_column(self):
+        rows = [[row[1], row[0], row[-1]] for row in self.rows]
+        tree = Node(Question(1, 0.5), Leaf([['x']]), Leaf([['y']]))
+        module = load_source(to_source(tree))
+        self.assertEqual(list(module.predict_batch(rows)),
+                         predictions(tree, rows))
+
+    def test_missing_category(self):
+        tree = Node(Question(1, 'a', missing=True), Leaf([['x']]),
+                    Leaf([['y']]))
+        module = load_source(to_source(tree))
+        rows = [[0.5, float('nan'), 1], [0.5, None, 1], [0.5, 'b', 1]]
+        expected = predictions(tree, rows)
+        self.assertEqual(expected, ['x', 'x', 'y'])
+        self.assertEqual([module.predict(row) for row in rows], expected)
+        self.assertEqual(list(module.predict_batch(rows)), expected)
+        self.assertEqual(list(compile_tree(tree).predict_batch(rows)),
+                         expected)
+
+    def test_leaf(self):
+        module = load_source(to_source(Leaf([[1, 'a'], [2, 'a']])))
+        self.assertEqual(module.predict([3]), 'a')
+        self.assertEqual(list(module.predict_batch(np.zeros((2, 0)))),
+                         ['a', 'a'])
+
+    def test_deep_tree(self):
+        # A chain of questions x >= 99, x >= 98, ..., x >= 0.
+        rows = [[x, str(x)] for x in range(100)]
+        tree = Leaf([['', 'below']])
+        for x in range(100):
+            tree = Node(Question(0, x), Leaf([rows[x]]), tree)
+        source = to_source(tree)
+        self.assertIn('def _node_', source)
+        module = load_source(source)
+        self.assertEqual([module.predict(row) for row in rows],
+                         [row[-1] for row in rows])
+
+    def test_standalone_module(self):
+        f = tempfile.NamedTemporaryFile(suffix='.py', delete=False)
+        f.close()
+        self.addCleanup(os.remove, f.name)
+        export_tree(self.tree, f.name)
+        directory, name = os.path.split(f.name)
+        script = (f'import sys; sys.path = [{directory!r}] + [p for p in '
+                  f'sys.path if p != {os.path.dirname(codegen.__file__)!r} '
+                  "and p != '']; "
+                  f'import {name[:-3]} as tree; '
+                  "print(tree.predict([0.5, 'a', 1]), "
+                  "'decision_tree' in sys.modules)")
+        output = subprocess.run([sys.executable, '-c', script],
+                                cwd=tempfile.gettempdir(), check=True,
+                                stdout=subprocess.PIPE).stdout.decode()
+        label = majority_vote(classify([0.5, 'a', 1], self.tree))
+        self.assertEqual(output.split(), [label, 'False'])
+
+
+if __name__ == '__main__':
+    unittest.main()
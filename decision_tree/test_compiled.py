@@ -0,0 +1,105 @@
+import csv
+import os
+import unittest
+
+import numpy as np
+
+from compiled import compile_tree
+from dataset import Dataset
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import Question
+from decision_tree import build_tree
+from decision_tree import classify
+from testing import mixed_rows
+from testing import predictions
+
+
+class TestCompiledTree(unittest.TestCase):
+    def setUp(self):
+        self.rows = mixed_rows()
+        self.tree = build_tree(self.rows, max_depth=6)
+
+    def expected(self, rows):
+        return predictions(self.tree, rows)
+
+    def test_predict_rows(self):
+        compiled = compile_tree(self.tree)
+        self.assertEqual(list(compiled.predict_batch(self.rows)),
+                         self.expected(self.rows))
+
+    def test_predict_dataset_matrix(self):
+        data = Dataset.from_rows(self.rows)
+        compiled = compile_tree(self.tree, data)
+        self.assertEqual(list(compiled.predict_batch(data.X)),
+                         self.expected(self.rows))
+
+    def test_predict_proba(self):
+        compiled = compile_tree(self.tree)
+        proba = compiled.predict_proba(self.rows[:10])
+        np.testing.assert_allclose(proba.sum(axis=1), 1)
+        for row, probs in zip(self.rows, proba):
+            leaf = classify(row, self.tree)
+            total = sum(leaf.predictions.values())
+            for label, count in leaf.predictions.items():
+                code = compiled.classes.index(label)
+                self.assertAlmostEqual(probs[code], count / total)
+
+    def test_unknown_category(self):
+        compiled = compile_tree(self.tree)
+        rows = [[0.5, 'unseen', 1, None]]
+        self.assertEqual(list(compiled.predict_batch(rows)),
+                         self.expected(rows))
+
+    def test_category_missing_from_data(self):
+        data = Dataset.from_rows(self.rows)
+        categories = list(data.categories[1])
+        rows = [[0.5, 'e', 1, None], [0.5, 'unseen', 1, None],
+                [0.5, 'f', 1, None], [0.5, 'a', 1, None]]
+        for value in ('e', frozenset(['e', 'f'])):
+            tree = Node(Question(1, value), Leaf([['x']]), Leaf([['y']]))
+            compiled = compile_tree(tree, data)
+            expected = predictions(tree, rows)
+            with self.subTest(value=value):
+                self.assertEqual(list(compiled.predict_batch(rows)),
+                                 expected)
+                self.assertEqual(repr(compiled.to_node().question),
+                                 repr(tree.question))
+        self.assertEqual(list(data.categories[1]), categories)
+
+    def test_unused_categorical_column(self):
+        rows = [[row[1], row[0], row[-1]] for row in self.rows]
+        tree = Node(Question(1, 0.5), Leaf([['x']]), Leaf([['y']]))
+        compiled = compile_tree(tree)
+        self.assertEqual(compiled.categories[0], [])
+        self.assertEqual(list(compiled.predict_batch(rows)),
+                         predictions(tree, rows))
+
+    def test_category_subsets(self):
+        tree = build_tree(self.rows, max_depth=6, categorical_subsets=True)
+        compiled = compile_tree(tree)
+        rows = self.rows + [[0.5, 'unseen', 1, None], [0.5, None, 1, None]]
+        expected = predictions(tree, rows)
+        self.assertEqual(list(compiled.predict_batch(rows)), expected)
+        self.assertTrue(compiled.subset.any())
+        self.assertEqual(repr(compiled.to_node().question),
+                         repr(tree.question))
+
+    def test_leaf(self):
+        compiled = compile_tree(Leaf([['a', 'x'], ['b', 'y'], ['c', 'y']]))
+        self.assertEqual(len(compiled), 1)
+        self.assertEqual(list(compiled.predict_batch(np.zeros((2, 1)))),
+                         ['y', 'y'])
+
+    def test_iris(self):
+        path = os.path.join(os.path.dirname(__file__), 'iris.csv')
+        with open(path) as f:
+            rows = list(csv.reader(f, quoting=csv.QUOTE_NONNUMERIC))
+        tree = build_tree(rows)
+        compiled = compile_tree(tree)
+        self.assertEqual(list(compiled.predict_batch(rows)),
+                         predictions(tree, rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
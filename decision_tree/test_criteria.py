@@ -0,0 +1,152 @@
+import unittest
+
+import numpy as np
+
+from benchmark import synthetic_dataset
+from compiled import compile_tree
+from criteria import MSE
+from criteria import ClassificationCriterion
+from criteria import Entropy
+from criteria import Gini
+from criteria import entropy
+from criteria import get_criterion
+from dataset import Dataset
+from decision_tree import RegressionLeaf
+from decision_tree import build_regression_tree
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import find_best_split
+from testing import leaves
+
+
+class TestCriteria(unittest.TestCase):
+    def test_entropy(self):
+        counts = np.array([[2, 0], [1, 1], [1, 3], [0, 0]])
+        np.testing.assert_allclose(
+            entropy(counts), [0, 1, -(0.25 * np.log2(0.25)
+                                      + 0.75 * np.log2(0.75)), 0])
+
+    def test_mse_statistics(self):
+        groups = np.array([0, 1, 1, 0, 1])
+        targets = np.array([1.0, 2.0, 4.0, 3.0, 6.0])
+        stats = MSE.statistics(groups, 2, targets, 0)
+        np.testing.assert_allclose(stats, [[2, 4, 10], [3, 12, 56]])
+        np.testing.assert_allclose(MSE.impurity(stats),
+                                   [np.var([1, 3]), np.var([2, 4, 6])])
+
+    def test_weighted_statistics(self):
+        groups = np.array([0, 1, 1, 0, 1])
+        targets = np.array([1.0, 2.0, 4.0, 3.0, 6.0])
+        weights = np.array([2.0, 1.0, 0.0, 1.0, 3.0])
+        repeated = np.repeat(np.arange(5), weights.astype(int))
+        np.testing.assert_allclose(
+            MSE.statistics(groups, 2, targets, 0, weights),
+            MSE.statistics(groups[repeated], 2, targets[repeated], 0))
+        classes = np.array([0, 1, 1, 0, 0])
+        np.testing.assert_allclose(
+            Gini.statistics(groups, 2, classes, 2, weights),
+            Gini.statistics(groups[repeated], 2, classes[repeated], 2))
+
+    def test_light_weights(self):
+        counts = np.array([[0.3, 0.3], [3, 3], [0, 0]])
+        np.testing.assert_allclose(Gini.impurity(counts), [0.5, 0.5, 0])
+        np.testing.assert_allclose(entropy(counts), [1, 1, 0])
+        stats = np.array([[0.5, 1.0, 2.5], [0, 0, 0]])
+        np.testing.assert_allclose(MSE.impurity(stats), [1, 0])
+        np.testing.assert_allclose(MSE.target_statistic(stats), [2, 0])
+
+    def test_get_criterion(self):
+        self.assertIs(get_criterion('gini'), Gini)
+        self.assertIs(get_criterion('entropy'), Entropy)
+        self.assertIs(get_criterion(MSE), MSE)
+        custom = get_criterion(entropy)
+        self.assertIsInstance(custom, ClassificationCriterion)
+        self.assertIs(custom.impurity, entropy)
+        with self.assertRaises(KeyError):
+            get_criterion('unknown')
+
+
+class TestClassificationCriteria(unittest.TestCase):
+    def setUp(self):
+        self.data = synthetic_dataset(2000, 4, n_classes=3, seed=3)
+
+    def test_gini_by_name(self):
+        tree = compile_tree(build_tree(self.data, max_depth=4))
+        named = compile_tree(build_tree(self.data, max_depth=4,
+                                        criterion='gini'))
+        np.testing.assert_array_equal(tree.feature, named.feature)
+        np.testing.assert_array_equal(tree.threshold, named.threshold)
+
+    def test_entropy_gain(self):
+        rows = [[1, 'a'], [2, 'a'], [3, 'b'], [4, 'b'], [5, 'b']]
+        question, gain = find_best_split(rows, criterion='entropy')
+        self.assertEqual(question.value, 3)
+        self.assertAlmostEqual(gain, float(entropy(np.array([2, 3]))))
+
+    def test_custom_criterion(self):
+        def error_rate(counts):
+            n_total = np.maximum(counts.sum(axis=-1), 1)
+            return 1 - counts.max(axis=-1) / n_total
+
+        tree = build_tree(self.data, max_depth=3, criterion=error_rate)
+        predicted = compile_tree(tree, self.data).predict_batch(self.data.X)
+        classes = np.array(self.data.classes, dtype=object)
+        accuracy = np.mean(predicted == classes[self.data.y])
+        self.assertGreater(accuracy, 1 / 3)
+
+    def test_binned_entropy(self):
+        binned = self.data.binned(256)
+        exact = compile_tree(build_tree(self.data, max_depth=4,
+                                        criterion='entropy'))
+        tree = compile_tree(build_tree(binned, max_depth=4,
+                                       criterion='entropy'))
+        np.testing.assert_array_equal(exact.feature, tree.feature)
+
+
+class TestRegressionTree(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = np.column_stack([rng.uniform(-2, 2, size=1000),
+                             rng.randint(0, 3, size=1000)])
+        self.targets = np.where(X[:, 0] > 0.5, 3.0, -1.0) + X[:, 1]
+        self.data = Dataset(X, np.zeros(1000, dtype=np.intp), [0],
+                            [None, ['a', 'b', 'c']])
+
+    def test_brute_force_gain(self):
+        question, gain = find_best_split(self.data, criterion='mse',
+                                         targets=self.targets)
+        matches = self.data.match(question.column, question.value)
+        trues, falses = self.targets[matches], self.targets[~matches]
+        p = len(trues) / len(self.targets)
+        expected = (np.var(self.targets) - p * np.var(trues)
+                    - (1 - p) * np.var(falses))
+        self.assertAlmostEqual(gain, expected)
+        self.assertEqual(question.column, 0)
+
+    def test_fit(self):
+        tree = build_regression_tree(self.data, self.targets, max_depth=3)
+        for leaf in leaves(tree):
+            self.assertIsInstance(leaf, RegressionLeaf)
+        compiled = compile_tree(tree, self.data)
+        np.testing.assert_allclose(compiled.predict_value(self.data.X),
+                                   self.targets)
+
+    def test_pure_nodes_are_leaves(self):
+        tree = build_regression_tree(self.data, self.targets)
+        self.assertEqual(len(leaves(tree)), 6)
+
+    def test_binned(self):
+        tree = build_regression_tree(self.data.binned(32), self.targets)
+        compiled = compile_tree(tree, self.data)
+        errors = compiled.predict_value(self.data.X) - self.targets
+        self.assertLess(np.mean(errors ** 2), 0.05 * np.var(self.targets))
+
+    def test_rows(self):
+        rows = [[1, 'a', 1.0], [2, 'b', 1.5], [3, 'a', 5.0], [4, 'b', 5.5]]
+        tree = build_regression_tree(rows, max_depth=1)
+        self.assertEqual(classify([1, 'a'], tree).value, 1.25)
+        self.assertEqual(classify([4, 'a'], tree).value, 5.25)
+
+
+if __name__ == '__main__':
+    unittest.main()
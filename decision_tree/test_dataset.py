@@ -0,0 +1,173 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from dataset import Dataset
+from dataset import read_csv
+from decision_tree import Leaf
+from decision_tree import Node
+from decision_tree import Question
+from decision_tree import build_tree
+from decision_tree import class_counts
+from decision_tree import classify
+from decision_tree import find_best_split
+from decision_tree import gini
+from decision_tree import partition
+
+
+def same_tree(node, other):
+    """Whether two trees ask the same questions and predict the same."""
+    if isinstance(node, Leaf):
+        return (isinstance(other, Leaf)
+                and list(node.predictions.items())
+                == list(other.predictions.items()))
+    return (not isinstance(other, Leaf)
+            and node.question.column == other.question.column
+            and node.question.value == other.question.value
+            and same_tree(node.true_branch, other.true_branch)
+            and same_tree(node.false_branch, other.false_branch))
+
+
+def build_list_tree(rows):
+    """Grow a tree on the list of instances themselves."""
+    question, gain = find_best_split(rows)
+    if gain == 0:
+        return Leaf(rows)
+    trues, falses = partition(rows, question)
+    return Node(question, build_list_tree(trues), build_list_tree(falses))
+
+
+class TestFromRows(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            ['Green', 3, 'Apple'],
+            ['Yellow', 3, 'Apple'],
+            ['Red', 1, 'Grape'],
+            ['Red', 1, 'Grape'],
+            ['Yellow', 3, 'Lemon'],
+        ]
+        self.data = Dataset.from_rows(self.rows, ['color', 'diameter'])
+
+    def test_encoding(self):
+        self.assertEqual(self.data.categories, [['Green', 'Yellow', 'Red'],
+                                                None])
+        self.assertEqual(self.data.classes, ['Apple', 'Grape', 'Lemon'])
+        np.testing.assert_array_equal(self.data.X,
+                                      [[0, 3], [1, 3], [2, 1], [2, 1], [1, 3]])
+        np.testing.assert_array_equal(self.data.y, [0, 0, 1, 1, 2])
+
+    def test_mixed_column(self):
+        with self.assertRaises(ValueError):
+            Dataset.from_rows([['Red', 'Grape'], [1, 'Apple']])
+
+    def test_partition(self):
+        trues, falses = partition(self.data, Question(0, 'Red'))
+        np.testing.assert_array_equal(trues.indices, [2, 3])
+        np.testing.assert_array_equal(falses.indices, [0, 1, 4])
+        self.assertIs(trues.X, self.data.X)
+
+    def test_class_counts(self):
+        _, falses = partition(self.data, Question(0, 'Green'))
+        self.assertEqual(list(class_counts(falses).items()),
+                         [('Apple', 1), ('Grape', 2), ('Lemon', 1)])
+        self.assertEqual(gini(self.data), gini(self.rows))
+
+
+class TestDatasetTree(unittest.TestCase):
+    def test_same_tree_as_rows(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            rows = [[rng.randint(0, 4), rng.choice('abcd'),
+                     rng.choice([0.5, 1.5, 2.5, 7.25]), rng.choice('xyz')]
+                    for _ in range(40)]
+            self.assertTrue(same_tree(build_tree(rows),
+                                      build_list_tree(rows)))
+
+    def test_classify_dataset(self):
+        rng = random.Random(2)
+        rows = [[rng.random(), rng.choice('ab'), rng.choice('xy')]
+                for _ in range(100)]
+        tree = build_tree(rows)
+        leaves = classify(Dataset.from_rows(rows), tree)
+        self.assertEqual(leaves, [classify(row, tree) for row in rows])
+
+
+class TestReadCsv(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            ['Green', 3.0, 'Apple'],
+            ['Yellow', 3.0, 'Apple'],
+            ['Red', 1.0, 'Grape'],
+            ['Red', 1.5, 'Grape'],
+            ['Yellow', 3.0, 'Lemon'],
+        ]
+        f = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        with f:
+            f.write('color,diameter,label\n')
+            for row in self.rows:
+                f.write(','.join(map(str, row)) + '\n')
+        self.path = f.name
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_same_as_from_rows(self):
+        data = read_csv(self.path, has_header=True, chunk_rows=2)
+        expected = Dataset.from_rows(self.rows)
+        np.testing.assert_array_equal(data.X, expected.X)
+        np.testing.assert_array_equal(data.y, expected.y)
+        self.assertEqual(data.categories, expected.categories)
+        self.assertEqual(data.classes, expected.classes)
+        self.assertEqual(data.headers, ['color', 'diameter', 'label'])
+
+    def test_mixed_column(self):
+        with open(self.path, 'a') as f:
+            f.write('Red,big,Grape\n')
+        with self.assertRaises(ValueError):
+            read_csv(self.path, has_header=True, chunk_rows=3)
+
+    def test_blank_lines(self):
+        with open(self.path, 'a') as f:
+            f.write('\nRed,1.0,Grape\n\n')
+        data = read_csv(self.path, has_header=True, chunk_rows=2)
+        expected = Dataset.from_rows(self.rows + [['Red', 1.0, 'Grape']])
+        np.testing.assert_array_equal(data.X, expected.X)
+        np.testing.assert_array_equal(data.y, expected.y)
+
+    def test_ragged_row(self):
+        with open(self.path, 'a') as f:
+            f.write('Red,1.0\n')
+        with self.assertRaisesRegex(ValueError, 'line 7 '):
+            read_csv(self.path, has_header=True, chunk_rows=4)
+
+    def test_missing_values(self):
+        with open(self.path, 'a') as f:
+            f.write(',NA,Grape\n?,2.5,Apple\n')
+        data = read_csv(self.path, has_header=True, chunk_rows=2)
+        self.assertEqual(data.categories[0], ['Green', 'Yellow', 'Red'])
+        self.assertIsNone(data.categories[1])
+        np.testing.assert_array_equal(np.isnan(data.X[:, 0]),
+                                      [0, 0, 0, 0, 0, 1, 1])
+        np.testing.assert_array_equal(np.isnan(data.X[:, 1]),
+                                      [0, 0, 0, 0, 0, 1, 0])
+        binned = data.binned(4)
+        self.assertEqual(binned.bins[5, 0], 4)
+        self.assertEqual(binned.bins[5, 1], 4)
+
+    def test_train_test_split(self):
+        path = os.path.join(os.path.dirname(__file__), 'iris.csv')
+        train, test = read_csv(path, test_size=0.2, seed=0)
+        self.assertEqual(len(train) + len(test), 150)
+        self.assertGreater(len(test), 10)
+        self.assertEqual(sorted(np.concatenate([train.indices,
+                                                test.indices])),
+                         list(range(150)))
+        self.assertIs(train.X, test.X)
+        self.assertEqual(len(train.classes), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,27 @@
+import contextlib
+import io
+import random
 import unittest
 
+from compiled import compile_tree
+from dataset import Dataset
+from dataset import is_missing
 from decision_tree import is_numeric
 from decision_tree import Question
 from decision_tree import partition
 from decision_tree import class_counts
 from decision_tree import gini
 from decision_tree import info_gain
+from decision_tree import find_best_split
+from decision_tree import build_regression_tree
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import Node
 from decision_tree import Leaf
+from decision_tree import counts_info_gain
 from decision_tree import majority_vote
+from decision_tree import print_tree
+from decision_tree import missing_split_gains
 
 
 class TestIsNumeric(unittest.TestCase):
@@ -33,6 +47,14 @@ class TestQuestion(unittest.TestCase):
     def test_question(self):
         self.assertEqual(str(self.question), 'Is color == Green?')
 
+    def test_missing(self):
+        question = Question(1, 3, missing=True)
+        self.assertTrue(question.match(['Green', None, 'Apple']))
+        self.assertTrue(question.match(['Green', float('nan'), 'Apple']))
+        self.assertFalse(question.match(['Green', 1, 'Apple']))
+        self.assertFalse(self.question.match([None, 3, 'Apple']))
+        self.assertEqual(str(question), 'Is headers[1] >= 3 or missing?')
+
 
 class TestPartition(unittest.TestCase):
 
@@ -74,6 +96,12 @@ class TestClassCounts(unittest.TestCase):
         counts = class_counts(self.data)
         self.assertEqual(counts, {'Apple': 2, 'Grape': 2, 'Lemon': 1})
 
+    def test_sample_weight_length(self):
+        counts = class_counts(self.data, [1, 2, 1, 1, 0.5])
+        self.assertEqual(counts, {'Apple': 3, 'Grape': 2, 'Lemon': 0.5})
+        with self.assertRaises(ValueError):
+            class_counts(self.data, [1, 2, 1])
+
 
 class TestGini(unittest.TestCase):
 
@@ -99,6 +127,207 @@ class TestGini(unittest.TestCase):
                          0.37333333333333324)
 
 
+class TestFindBestSplit(unittest.TestCase):
+    def setUp(self):
+        self.data = [
+            ['Green', 3, 'Apple'],
+            ['Yellow', 3, 'Apple'],
+            ['Red', 1, 'Grape'],
+            ['Red', 1, 'Grape'],
+            ['Yellow', 3, 'Lemon'],
+        ]
+
+    @staticmethod
+    def exhaustive_split(rows):
+        """Reference search partitioning the rows for every candidate,
+        with the gains and ties of `find_best_split`."""
+        best_gain, best_value = 0, None
+        totals = class_counts(rows)
+        current_gini = gini(rows)
+        for col in range(len(rows[0]) - 1):
+            for val in set([row[col] for row in rows]):
+                trues, falses = partition(rows, Question(col, val))
+                if len(trues) == 0 or len(falses) == 0:
+                    continue
+                true_counts, false_counts = (
+                    {label: counts.get(label, 0) for label in totals}
+                    for counts in (class_counts(trues),
+                                   class_counts(falses)))
+                gain = counts_info_gain(true_counts, len(trues),
+                                        false_counts, len(falses),
+                                        current_gini)
+                if best_gain <= gain:
+                    best_value, best_gain = (col, val), gain
+        return best_value, best_gain
+
+    def exhaustive_tree(self, rows):
+        value, gain = self.exhaustive_split(rows)
+        if gain == 0:
+            return Leaf(rows)
+        question = Question(*value)
+        trues, falses = partition(rows, question)
+        return Node(question, self.exhaustive_tree(trues),
+                    self.exhaustive_tree(falses))
+
+    def test_find_best_split(self):
+        question, gain = find_best_split(self.data)
+        self.assertEqual((question.column, question.value), (1, 3))
+        self.assertAlmostEqual(gain, 0.37333333333333324)
+
+    def test_matches_exhaustive_search(self):
+        rng = random.Random(0)
+        for _ in range(20):
+            rows = [[rng.randint(0, 5), rng.choice('abc'),
+                     rng.choice([0.5, 1.5, 2.5]), rng.choice('xyz')]
+                    for _ in range(30)]
+            question, gain = find_best_split(rows)
+            expected_value, expected_gain = self.exhaustive_split(rows)
+            self.assertEqual((question.column, question.value),
+                             expected_value)
+            self.assertAlmostEqual(gain, expected_gain)
+
+    def test_same_tree_as_exhaustive_search(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            # Numeric values of a Dataset are floats.
+            rows = [[float(rng.randint(0, 5)), rng.choice('abc'),
+                     rng.choice([0.5, 1.5, 2.5]), rng.choice('xyz')]
+                    for _ in range(rng.randint(5, 30))]
+            self.assertEqual(tree_lines(build_tree(rows)),
+                             tree_lines(self.exhaustive_tree(rows)))
+
+    def test_no_split(self):
+        question, gain = find_best_split([['Red', 1, 'Grape'],
+                                          ['Red', 1, 'Grape']])
+        self.assertIsNone(question)
+        self.assertEqual(gain, 0)
+
+
+def tree_lines(node):
+    """The lines printed by `print_tree`."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        print_tree(node)
+    return output.getvalue().splitlines()
+
+
+def leaves(node, depth=0):
+    """List the (depth, leaf) pairs of a tree."""
+    if isinstance(node, Leaf):
+        return [(depth, node)]
+    return (leaves(node.true_branch, depth + 1)
+            + leaves(node.false_branch, depth + 1))
+
+
+class TestBuildTree(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = [[rng.random(), rng.random(), rng.choice('xyz')]
+                     for _ in range(300)]
+
+    def test_fits_training_data(self):
+        tree = build_tree(self.rows)
+        for row in self.rows:
+            self.assertEqual(majority_vote(classify(row, tree)), row[-1])
+
+    def test_max_depth(self):
+        tree = build_tree(self.rows, max_depth=3)
+        self.assertEqual(max(depth for depth, _ in leaves(tree)), 3)
+
+    def test_min_samples(self):
+        tree = build_tree(self.rows, min_samples_split=40,
+                          min_samples_leaf=10)
+        for _, leaf in leaves(tree):
+            self.assertGreaterEqual(sum(leaf.predictions.values()), 10)
+
+    def test_max_leaf_nodes(self):
+        tree = build_tree(self.rows, max_leaf_nodes=7)
+        self.assertEqual(len(leaves(tree)), 7)
+        self.assertIsInstance(build_tree(self.rows, max_leaf_nodes=1), Leaf)
+
+    def test_min_impurity_decrease(self):
+        full = leaves(build_tree(self.rows))
+        pruned = leaves(build_tree(self.rows, min_impurity_decrease=0.01))
+        self.assertLess(len(pruned), len(full))
+        self.assertIsInstance(build_tree(self.rows,
+                                         min_impurity_decrease=1), Leaf)
+
+    def test_deep_tree(self):
+        # Alternating classes along one feature need one split per row.
+        rows = [[i, i % 2] for i in range(1500)]
+        tree = build_tree(rows, min_samples_leaf=1)
+        self.assertIsInstance(tree, Node)
+        for row in rows[::100]:
+            self.assertEqual(majority_vote(classify(row, tree)), row[-1])
+
+
+class TestMissingValues(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = []
+        for _ in range(300):
+            x, color = rng.random(), rng.choice(['red', 'green', 'blue'])
+            label = 'yes' if x > 0.6 or color == 'red' else 'no'
+            if rng.random() < 0.3:
+                # Missing values mostly hide positive instances.
+                x = None if label == 'yes' or rng.random() < 0.2 else x
+            if rng.random() < 0.2:
+                color = float('nan')
+            self.rows.append([x, color, label])
+
+    def test_learns_direction(self):
+        question, gain = find_best_split(self.rows)
+        self.assertEqual(question.column, 0)
+        self.assertTrue(question.missing)
+        self.assertGreater(gain, 0)
+
+    def test_dataset_same_question(self):
+        expected, expected_gain = find_best_split(self.rows)
+        data = Dataset.from_rows(self.rows)
+        for rows in (data, data.binned(1000)):
+            question, gain = find_best_split(rows)
+            self.assertEqual(question.column, expected.column)
+            self.assertEqual(question.value, expected.value)
+            self.assertEqual(question.missing, expected.missing)
+            self.assertAlmostEqual(gain, expected_gain)
+
+    def test_classify(self):
+        tree = build_tree(self.rows)
+        expected = [majority_vote(classify(row, tree)) for row in self.rows]
+        data = Dataset.from_rows(self.rows)
+        self.assertEqual([majority_vote(leaf)
+                          for leaf in classify(data, tree)], expected)
+        self.assertEqual(list(compile_tree(tree).predict_batch(self.rows)),
+                         expected)
+
+    def test_split_gains(self):
+        current_gini = gini(self.rows)
+        for column in (0, 1):
+            gains, matched = missing_split_gains(self.rows, column,
+                                                 current_gini)
+            values = set(row[column] for row in self.rows
+                         if not is_missing(row[column]))
+            for val in values:
+                expected = {}
+                for missing in (False, True):
+                    trues, falses = partition(
+                        self.rows, Question(column, val, missing=missing))
+                    if trues and falses:
+                        expected[missing] = info_gain(trues, falses,
+                                                      current_gini)
+                with self.subTest(column=column, val=val):
+                    best = max(expected, key=expected.get)
+                    self.assertAlmostEqual(gains[val], expected[best])
+
+    def test_missing_only_split(self):
+        rows = [[None, 'a'], [None, 'a'], [1, 'b'], [2, 'b']]
+        question, gain = find_best_split(rows)
+        self.assertEqual((question.value, question.missing), (1, False))
+        tree = build_tree(rows)
+        self.assertEqual([majority_vote(classify(row, tree))
+                          for row in rows], ['a', 'a', 'b', 'b'])
+
+
 class TestMajorityVote(unittest.TestCase):
     def test_majority_vote(self):
         leaf = Leaf([
@@ -110,5 +339,146 @@ class TestMajorityVote(unittest.TestCase):
         self.assertEqual(majority_vote(leaf), 'Apple')
 
 
+def same_tree(test, tree, other, scale=1):
+    """Assert two trees ask the same questions and count the same, the
+    counts of tree being scale times those of other."""
+    if isinstance(tree, Leaf):
+        test.assertIsInstance(other, Leaf)
+        # Classes of rows weighing nothing are counted 0.
+        counts = {label: count for label, count in tree.predictions.items()
+                  if count}
+        test.assertEqual(counts.keys(), other.predictions.keys())
+        for label, count in counts.items():
+            test.assertAlmostEqual(count, scale * other.predictions[label])
+        return
+    test.assertEqual(repr(tree.question), repr(other.question))
+    same_tree(test, tree.true_branch, other.true_branch, scale)
+    same_tree(test, tree.false_branch, other.false_branch, scale)
+
+
+class TestWeights(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = [[rng.random(), rng.choice('abc'), rng.choice('xy')]
+                     for _ in range(60)]
+        self.weights = [rng.randint(1, 3) for _ in self.rows]
+        self.copies = [row for row, weight in zip(self.rows, self.weights)
+                       for _ in range(weight)]
+
+    def test_class_counts(self):
+        counts = class_counts(self.rows, self.weights)
+        self.assertEqual(counts, class_counts(self.copies))
+        data = Dataset.from_rows(self.rows)
+        self.assertEqual(class_counts(data, self.weights), counts)
+        self.assertEqual(class_counts(data.with_weights(self.weights)),
+                         counts)
+        doubled = class_counts(self.rows, class_weight={'x': 2})
+        plain = class_counts(self.rows)
+        self.assertEqual(doubled, {'x': 2 * plain['x'], 'y': plain['y']})
+
+    def test_gini(self):
+        self.assertAlmostEqual(gini(self.rows, self.weights),
+                               gini(self.copies))
+        trues = [row for row in self.rows if row[0] >= 0.5]
+        falses = [row for row in self.rows if row[0] < 0.5]
+        true_weight = [w for row, w in zip(self.rows, self.weights)
+                       if row[0] >= 0.5]
+        false_weight = [w for row, w in zip(self.rows, self.weights)
+                        if row[0] < 0.5]
+        current = gini(self.copies)
+        self.assertAlmostEqual(
+            info_gain(trues, falses, current, true_weight, false_weight),
+            info_gain([row for row in self.copies if row[0] >= 0.5],
+                      [row for row in self.copies if row[0] < 0.5],
+                      current))
+
+    def test_find_best_split(self):
+        question, gain = find_best_split(self.rows,
+                                         sample_weight=self.weights)
+        expected, expected_gain = find_best_split(self.copies)
+        self.assertEqual(repr(question), repr(expected))
+        self.assertAlmostEqual(gain, expected_gain)
+
+    def test_same_tree_as_copies(self):
+        tree = build_tree(self.rows, sample_weight=self.weights)
+        same_tree(self, tree, build_tree(self.copies))
+        # As many bins as values, so both are binned alike.
+        tree = build_tree(self.rows, max_bins=64,
+                          sample_weight=self.weights)
+        same_tree(self, tree, build_tree(self.copies, max_bins=64))
+
+    def test_min_samples_leaf_counts_rows(self):
+        heavy = [10] * len(self.rows)
+        for max_bins in (None, 64):
+            tree = build_tree(self.rows, max_bins=max_bins,
+                              min_samples_leaf=3, sample_weight=heavy)
+            same_tree(self, tree, build_tree(self.rows, max_bins=max_bins,
+                                             min_samples_leaf=3),
+                      scale=10)
+
+    def test_weight_scale(self):
+        for criterion in ('gini', 'entropy'):
+            tree = build_tree(self.rows, criterion=criterion,
+                              sample_weight=self.weights)
+            # Powers of 2 scale the statistics exactly, so even tied
+            # gains stay tied.
+            for scale in (2 ** -7, 0.5, 8):
+                scaled = [scale * weight for weight in self.weights]
+                same_tree(self, build_tree(self.rows, criterion=criterion,
+                                           sample_weight=scaled),
+                          tree, scale)
+
+    def test_zero_weight(self):
+        weights = [0 if row[1] == 'a' else 1 for row in self.rows]
+        kept = [row for row in self.rows if row[1] != 'a']
+        same_tree(self, build_tree(self.rows, sample_weight=weights),
+                  build_tree(kept))
+
+    def test_class_weight(self):
+        rng = random.Random(1)
+        rows = [[rng.random(), 'rare' if rng.random() < 0.05 else 'common']
+                for _ in range(2000)]
+        for row in rows:
+            if row[-1] == 'rare':
+                row[0] += 0.5
+        rare = [row for row in rows if row[-1] == 'rare']
+
+        def recall(tree):
+            return sum(majority_vote(classify(row, tree)) == 'rare'
+                       for row in rare) / len(rare)
+
+        tree = build_tree(rows, max_depth=2)
+        weighted = build_tree(rows, max_depth=2, class_weight={'rare': 20})
+        self.assertLess(recall(tree), 0.6)
+        self.assertEqual(recall(weighted), 1)
+
+    def test_balanced(self):
+        data = Dataset.from_rows(self.rows).with_weights(
+            class_weight='balanced')
+        counts = class_counts(data)
+        self.assertAlmostEqual(counts['x'], len(self.rows) / 2)
+        self.assertAlmostEqual(counts['y'], len(self.rows) / 2)
+
+    def test_leaf(self):
+        leaf = Leaf(self.rows, self.weights)
+        self.assertEqual(leaf.predictions, Leaf(self.copies).predictions)
+        leaf = Leaf([['a'], ['a'], ['b']], [1, 1, 3])
+        self.assertEqual(majority_vote(leaf), 'b')
+        self.assertEqual(majority_vote(leaf, {'a': 2}), 'a')
+
+    def test_regression(self):
+        rows = [[x, float(x % 4)] for x in range(8)]
+        weights = [1, 0, 0, 1, 1, 0, 0, 1]
+        tree = build_regression_tree(rows, max_depth=0, sample_weight=weights)
+        self.assertAlmostEqual(tree.value, 1.5)
+        tree = build_regression_tree(rows, max_depth=1, sample_weight=weights)
+        for leaf, side in ((tree.true_branch, True),
+                           (tree.false_branch, False)):
+            kept = [(row[-1], weight) for row, weight in zip(rows, weights)
+                    if tree.question.match(row) == side and weight]
+            self.assertAlmostEqual(leaf.value,
+                                   sum(y for y, _ in kept) / len(kept))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+import numpy as np
+
+from benchmark import synthetic_dataset
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import majority_vote
+from forest import RandomForest
+
+
+class TestRandomForest(unittest.TestCase):
+    def setUp(self):
+        self.train = synthetic_dataset(600, 6, n_classes=3, seed=0)
+
+    def test_predict_proba(self):
+        forest = RandomForest(n_trees=10, random_state=0).fit(self.train)
+        proba = forest.predict_proba(self.train.X)
+        self.assertEqual(proba.shape, (600, 3))
+        np.testing.assert_allclose(proba.sum(axis=1), 1)
+
+    def test_beats_single_tree(self):
+        rows = np.column_stack([self.train.X, self.train.y]).tolist()
+        train, test = rows[:400], rows[400:]
+        labels = [row[-1] for row in test]
+        tree = build_tree(train)
+        tree_accuracy = np.mean([majority_vote(classify(row, tree)) == label
+                                 for row, label in zip(test, labels)])
+        forest = RandomForest(n_trees=25, random_state=0).fit(train)
+        forest_accuracy = np.mean(forest.predict(test) == labels)
+        self.assertGreater(forest_accuracy, tree_accuracy)
+
+    def test_processes_match_serial(self):
+        serial = RandomForest(n_trees=6, max_depth=5, random_state=1)
+        parallel = RandomForest(n_trees=6, max_depth=5, n_jobs=2,
+                                random_state=1)
+        serial.fit(self.train)
+        parallel.fit(self.train)
+        for tree, other in zip(serial.compiled, parallel.compiled):
+            np.testing.assert_array_equal(tree.feature, other.feature)
+            np.testing.assert_array_equal(tree.threshold, other.threshold)
+        np.testing.assert_allclose(serial.predict_proba(self.train.X),
+                                   parallel.predict_proba(self.train.X))
+
+    def test_max_features(self):
+        tree = build_tree(self.train, max_depth=1, max_features=1,
+                          random_state=3)
+        other = build_tree(self.train, max_depth=1, max_features=1,
+                           random_state=4)
+        self.assertNotEqual(tree.question.column, other.question.column)
+
+
+if __name__ == '__main__':
+    unittest.main()
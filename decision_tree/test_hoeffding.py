@@ -0,0 +1,135 @@
+import random
+import unittest
+
+import numpy as np
+
+from compiled import compile_tree
+from decision_tree import Leaf
+from decision_tree import classify
+from hoeffding import GaussianObserver
+from hoeffding import HoeffdingLeaf
+from hoeffding import HoeffdingTree
+from hoeffding import hoeffding_bound
+from profiling import feature_importances
+from pruning import node_counts
+from testing import leaves
+
+
+def stream(n_rows, seed=0):
+    """Noisy instances of an xor of a numeric and a categorical feature."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n_rows):
+        x, letter = rng.random(), rng.choice('abcd')
+        label = 'yes' if (x > 0.6) != (letter in 'ab') else 'no'
+        if rng.random() < 0.05:
+            label = 'no' if label == 'yes' else 'yes'
+        if rng.random() < 0.05:
+            x = None
+        rows.append([x, letter, rng.random(), label])
+    return rows
+
+
+class TestHoeffdingTree(unittest.TestCase):
+    def setUp(self):
+        self.train = stream(20000)
+        self.test = stream(2000, seed=1)
+
+    def accuracy(self, model):
+        predictions = model.predict(self.test)
+        return np.mean([predicted == row[-1]
+                        for predicted, row in zip(predictions, self.test)])
+
+    def test_hoeffding_bound(self):
+        self.assertAlmostEqual(hoeffding_bound(1, 1e-7, 200) ** 2,
+                               np.log(1e7) / 400)
+        self.assertLess(hoeffding_bound(1, 1e-7, 2000),
+                        hoeffding_bound(1, 1e-7, 200))
+
+    def test_learns_the_stream(self):
+        model = HoeffdingTree().partial_fit(self.train)
+        self.assertEqual(model.n_seen, len(self.train))
+        self.assertGreater(self.accuracy(model), 0.9)
+        self.assertNotIsInstance(model.tree, Leaf)
+
+    def test_grace_period(self):
+        model = HoeffdingTree(grace_period=500).partial_fit(self.train[:499])
+        self.assertIsInstance(model.tree, HoeffdingLeaf)
+        self.assertEqual(sum(model.tree.predictions.values()), 499)
+
+    def test_micro_batches(self):
+        model = HoeffdingTree()
+        for start in range(0, len(self.train), 1000):
+            model.partial_fit(self.train[start:start + 1000])
+        single = HoeffdingTree()
+        for row in self.train:
+            single.learn_one(row)
+        self.assertEqual(model.predict(self.test), single.predict(self.test))
+
+    def test_split_counts(self):
+        model = HoeffdingTree()
+        for n_rows, row in enumerate(self.train, 1):
+            model.learn_one(row)
+            if not isinstance(model.tree, Leaf):
+                break
+        counts = [sum(leaf.predictions.values())
+                  for leaf in leaves(model.tree)]
+        # Numeric splits estimate the class counts of the children.
+        self.assertAlmostEqual(sum(counts), n_rows)
+        self.assertEqual(n_rows % model.grace_period, 0)
+
+    def test_bounded_leaves(self):
+        model = HoeffdingTree(grace_period=len(self.train))
+        model.partial_fit(self.train[:-1])
+        x, letter, noise = model.tree.values
+        for observer in (x, noise):
+            self.assertIsInstance(observer, GaussianObserver)
+            self.assertEqual(len(observer.n), len(model.classes))
+            self.assertAlmostEqual(observer.above(-np.inf, 2).sum()
+                                   + sum(observer.missing),
+                                   len(self.train) - 1)
+        self.assertEqual(sorted(letter), list('abcd'))
+
+    def test_gaussian_observer(self):
+        observer = GaussianObserver()
+        for val in (1.0, 2.0, 3.0):
+            observer.add(val, 1)
+        observer.add(None, 0)
+        np.testing.assert_array_equal(observer.above(1, 3), [0, 3, 0])
+        np.testing.assert_array_equal(observer.above(3.5, 3), [0, 0, 0])
+        # Half of a normal distribution lies above its mean.
+        np.testing.assert_allclose(observer.above(2, 3), [0, 1.5, 0])
+        self.assertEqual(observer.missing, [1])
+        np.testing.assert_allclose(observer.thresholds(3),
+                                   [1.5, 2, 2.5])
+
+    def test_max_depth(self):
+        model = HoeffdingTree(max_depth=1).partial_fit(self.train)
+        for leaf in leaves(model.tree):
+            self.assertLessEqual(leaf.depth, 1)
+
+    def test_compile(self):
+        model = HoeffdingTree(criterion='entropy').partial_fit(self.train)
+        compiled = compile_tree(model.tree)
+        self.assertEqual(list(compiled.predict_batch(self.test)),
+                         model.predict(self.test))
+        self.assertIs(classify(self.test[0], model.tree),
+                      model._leaf(self.test[0])[0])
+
+    def test_feature_importances(self):
+        model = HoeffdingTree().partial_fit(self.train[:10000])
+        self.assertEqual(feature_importances(model.tree, 3).argmin(), 2)
+        model.partial_fit(self.train[10000:])
+        # Nothing counted before the tree learned more is kept.
+        counts = node_counts(model.tree)[id(model.tree)]
+        self.assertAlmostEqual(sum(counts.values()),
+                               sum(sum(leaf.predictions.values())
+                                   for leaf in leaves(model.tree)))
+
+    def test_not_fitted(self):
+        with self.assertRaises(ValueError):
+            HoeffdingTree().predict(self.test)
+
+
+if __name__ == '__main__':
+    unittest.main()
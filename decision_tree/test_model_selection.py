@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+
+from benchmark import synthetic_dataset
+from model_selection import cross_validate
+from model_selection import grid_search
+from model_selection import k_folds
+from model_selection import parameter_grid
+
+
+class TestModelSelection(unittest.TestCase):
+    def setUp(self):
+        self.data = synthetic_dataset(600, 4, n_classes=2, seed=1)
+
+    def test_k_folds(self):
+        folds = k_folds(self.data, 4, seed=0)
+        self.assertEqual(len(folds), 4)
+        self.assertEqual([len(fold) for fold in folds], [150] * 4)
+        np.testing.assert_array_equal(np.sort(np.concatenate(folds)),
+                                      self.data.indices)
+        with self.assertRaises(ValueError):
+            k_folds(self.data, 1)
+
+    def test_parameter_grid(self):
+        grid = parameter_grid({'max_depth': [1, 2], 'max_bins': [None, 8]})
+        self.assertEqual(grid, [{'max_depth': 1, 'max_bins': None},
+                                {'max_depth': 1, 'max_bins': 8},
+                                {'max_depth': 2, 'max_bins': None},
+                                {'max_depth': 2, 'max_bins': 8}])
+
+    def test_cross_validate(self):
+        scores = cross_validate(self.data, n_folds=3, seed=0, max_depth=3)
+        self.assertEqual(len(scores['accuracy']), 3)
+        self.assertAlmostEqual(scores['mean_accuracy'],
+                               np.mean(scores['accuracy']))
+        self.assertGreater(scores['mean_accuracy'], 0.5)
+        self.assertTrue(np.all(scores['fit_time'] > 0))
+        self.assertTrue(np.all(scores['predict_time'] > 0))
+
+    def test_rows(self):
+        rows = [[x, 'low' if x < 50 else 'high'] for x in range(100)]
+        scores = cross_validate(rows, n_folds=5, seed=0)
+        self.assertGreater(scores['mean_accuracy'], 0.95)
+
+    def test_process_pool(self):
+        serial = cross_validate(self.data, n_folds=3, seed=0, max_depth=3)
+        parallel = cross_validate(self.data, n_folds=3, seed=0, max_depth=3,
+                                  n_jobs=2)
+        np.testing.assert_array_equal(serial['accuracy'],
+                                      parallel['accuracy'])
+
+    def test_grid_search(self):
+        best, results = grid_search(self.data, {'max_depth': [0, 3]},
+                                    n_folds=3, seed=0, n_jobs=2)
+        self.assertEqual([result['params'] for result in results],
+                         [{'max_depth': 0}, {'max_depth': 3}])
+        self.assertEqual(best, {'max_depth': 3})
+        scores = cross_validate(self.data, n_folds=3, seed=0, max_depth=3)
+        np.testing.assert_array_equal(results[1]['accuracy'],
+                                      scores['accuracy'])
+
+
+if __name__ == '__main__':
+    unittest.main()
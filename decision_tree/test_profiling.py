@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+
+from dataset import Dataset
+from decision_tree import Leaf
+from decision_tree import build_tree
+from profiling import TreeProfile
+from profiling import feature_importances
+
+
+def count_nodes(node):
+    if isinstance(node, Leaf):
+        return 1
+    return 1 + count_nodes(node.true_branch) + count_nodes(node.false_branch)
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        # Feature 0 decides the class, 1 helps a little, 2 is noise.
+        X = rng.normal(size=(1000, 3))
+        y = ((X[:, 0] + 0.3 * X[:, 1]) > 0).astype(int)
+        self.data = Dataset(X, y, ['no', 'yes'])
+
+    def test_nodes(self):
+        profile = TreeProfile()
+        tree = build_tree(self.data, max_depth=4, profile=profile)
+        self.assertEqual(len(profile.nodes), count_nodes(tree))
+        root = profile.nodes[0]
+        self.assertEqual(root['n_rows'], 1000)
+        self.assertEqual(root['column'], tree.question.column)
+        self.assertGreater(root['gain'], 0)
+        self.assertGreater(root['search_time'], 0)
+        self.assertGreater(root['partition_time'], 0)
+
+    def test_feature_costs(self):
+        profile = TreeProfile()
+        build_tree(self.data, max_depth=1, profile=profile)
+        costs = profile.feature_costs(3)
+        self.assertTrue(np.all(costs['search_time'] > 0))
+        # Only the root is searched, on its 1000 distinct values.
+        np.testing.assert_array_equal(costs['candidates'], [1000] * 3)
+        np.testing.assert_array_equal(costs['n_splits'], [1, 0, 0])
+
+    def test_binned(self):
+        profile = TreeProfile()
+        build_tree(self.data, max_depth=3, max_bins=16, profile=profile)
+        costs = profile.feature_costs(3)
+        self.assertTrue(np.all(costs['count_time'] > 0))
+        self.assertLessEqual(costs['candidates'][2],
+                             16 * len(profile.nodes))
+
+    def test_feature_importances(self):
+        profile = TreeProfile()
+        tree = build_tree(self.data, max_depth=5, profile=profile)
+        importances = feature_importances(tree, 3)
+        np.testing.assert_allclose(importances,
+                                   profile.feature_importances(3))
+        self.assertAlmostEqual(importances.sum(), 1)
+        self.assertEqual(importances.argmax(), 0)
+        self.assertGreater(importances[1], importances[2])
+
+    def test_leaf(self):
+        leaf = Leaf([[1, 'a']])
+        np.testing.assert_array_equal(feature_importances(leaf, 2), [0, 0])
+
+    def test_report(self):
+        profile = TreeProfile()
+        build_tree(self.data, max_depth=3, profile=profile)
+        lines = profile.report(['x', 'y', 'noise']).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0].split()[0], 'feature')
+        self.assertEqual(sorted(line.split()[0] for line in lines[1:]),
+                         ['noise', 'x', 'y'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import random
+import unittest
+
+import numpy as np
+
+from benchmark import synthetic_dataset
+from compiled import compile_tree
+from decision_tree import Leaf
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import majority_vote
+from pruning import cost_complexity_path
+from pruning import node_counts
+from pruning import prune_tree
+from pruning import select_alpha
+
+
+def n_leaves(tree):
+    return int(np.sum(compile_tree(tree).feature < 0))
+
+
+def accuracy(tree, rows):
+    return np.mean([majority_vote(classify(row, tree)) == row[-1]
+                    for row in rows])
+
+
+class TestPruning(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = [[rng.random(), rng.random(), rng.choice('ab')]
+                     for _ in range(400)]
+        for row in self.rows:
+            row[-1] = 'yes' if row[0] + row[1] > 1 else row[-1]
+        self.train, self.valid = self.rows[:300], self.rows[300:]
+        self.tree = build_tree(self.train)
+
+    def test_node_counts(self):
+        counts = node_counts(self.tree)[id(self.tree)]
+        self.assertEqual(sum(counts.values()), 300)
+        self.assertEqual(counts['yes'],
+                         sum(row[-1] == 'yes' for row in self.train))
+        # The tree is left unchanged.
+        self.assertFalse(hasattr(self.tree, 'predictions'))
+        prune_tree(self.tree, 0.01)
+        self.assertFalse(hasattr(self.tree, 'predictions'))
+
+    def test_path(self):
+        alphas, impurities, sizes, accuracies = cost_complexity_path(
+            self.tree)
+        self.assertEqual(alphas[0], 0)
+        self.assertTrue(np.all(np.diff(alphas) > 0))
+        self.assertTrue(np.all(np.diff(impurities) >= -1e-12))
+        self.assertEqual(sizes[0], n_leaves(self.tree))
+        self.assertEqual(sizes[-1], 1)
+        self.assertTrue(np.all(np.isnan(accuracies)))
+        for alpha, size in zip(alphas, sizes):
+            self.assertEqual(n_leaves(prune_tree(self.tree, alpha)), size)
+
+    def test_validation_accuracy(self):
+        alphas, _, _, accuracies = cost_complexity_path(self.tree,
+                                                        self.valid)
+        for alpha, expected in list(zip(alphas, accuracies))[::5]:
+            pruned = prune_tree(self.tree, alpha)
+            self.assertAlmostEqual(accuracy(pruned, self.valid), expected)
+
+    def test_select_alpha(self):
+        alpha = select_alpha(self.tree, self.valid)
+        pruned = prune_tree(self.tree, alpha)
+        self.assertLess(n_leaves(pruned), n_leaves(self.tree))
+        self.assertGreaterEqual(accuracy(pruned, self.valid),
+                                accuracy(self.tree, self.valid))
+
+    def test_tree_unchanged(self):
+        before = compile_tree(self.tree)
+        prune_tree(self.tree, 0.01)
+        after = compile_tree(self.tree)
+        np.testing.assert_array_equal(before.feature, after.feature)
+        self.assertIsInstance(prune_tree(self.tree, 1.0), Leaf)
+
+    def test_dataset_validation(self):
+        data = synthetic_dataset(1000, 4, n_classes=3)
+        train, valid = data.train_test_split(0.3, seed=0)
+        tree = build_tree(train)
+        rows = [[float(x) for x in data.X[i]] + [data.classes[data.y[i]]]
+                for i in valid.indices]
+        np.testing.assert_array_equal(
+            cost_complexity_path(tree, valid)[3],
+            cost_complexity_path(tree, rows)[3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from boosting import GradientBoosting
+from compiled import compile_tree
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import majority_vote
+from forest import RandomForest
+from serialize import load_tree
+from serialize import save_tree
+
+
+class TestSaveLoad(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = [[rng.random(), rng.choice('abcd'), rng.randint(0, 3),
+                      rng.choice('xyz')] for _ in range(300)]
+        self.headers = ['number', 'letter', 'integer']
+        self.tree = build_tree(self.rows, self.headers, max_depth=6)
+        f = tempfile.NamedTemporaryFile(suffix='.tree', delete=False)
+        f.close()
+        self.path = f.name
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def assertSameTree(self, loaded, compiled):
+        for name in ['feature', 'threshold', 'numeric', 'true_child',
+                     'false_child', 'counts', 'prediction', 'value',
+                     'missing', 'subset', 'set_node', 'set_code']:
+            np.testing.assert_array_equal(getattr(loaded, name),
+                                          getattr(compiled, name))
+        self.assertEqual(loaded.classes, compiled.classes)
+        self.assertEqual(loaded.categories, compiled.categories)
+        self.assertEqual(loaded.headers, compiled.headers)
+
+    def test_round_trip(self):
+        save_tree(self.tree, self.path)
+        for mmap in [True, False]:
+            loaded = load_tree(self.path, mmap=mmap)
+            self.assertSameTree(loaded, compile_tree(self.tree))
+            self.assertEqual(list(loaded.predict_batch(self.rows)),
+                             [majority_vote(classify(row, self.tree))
+                              for row in self.rows])
+
+    def test_memory_map(self):
+        save_tree(self.tree, self.path)
+        loaded = load_tree(self.path)
+        self.assertIsInstance(loaded.threshold, np.memmap)
+        self.assertFalse(loaded.threshold.flags.writeable)
+        self.assertEqual(loaded.threshold.ctypes.data % 8, 0)
+
+    def test_to_node(self):
+        save_tree(self.tree, self.path)
+        node = load_tree(self.path).to_node()
+        self.assertEqual(repr(node.question), repr(self.tree.question))
+        for row in self.rows:
+            self.assertEqual(majority_vote(classify(row, node)),
+                             majority_vote(classify(row, self.tree)))
+
+    def test_category_subsets(self):
+        tree = build_tree(self.rows, self.headers, max_depth=6,
+                          categorical_subsets=True)
+        compiled = compile_tree(tree)
+        self.assertTrue(compiled.subset.any())
+        save_tree(tree, self.path)
+        loaded = load_tree(self.path)
+        self.assertSameTree(loaded, compiled)
+        np.testing.assert_array_equal(loaded.predict_batch(self.rows),
+                                      compiled.predict_batch(self.rows))
+
+    def test_forest(self):
+        forest = RandomForest(n_trees=5, random_state=0).fit(self.rows)
+        save_tree(forest.compiled, self.path)
+        loaded = load_tree(self.path)
+        self.assertEqual(len(loaded), 5)
+        for tree, compiled in zip(loaded, forest.compiled):
+            self.assertSameTree(tree, compiled)
+
+    def test_regression(self):
+        rng = random.Random(0)
+        rows = [[x / 10, x / 10 + rng.random()] for x in range(100)]
+        model = GradientBoosting(n_rounds=3, min_samples_leaf=5).fit(
+            [row[:1] + [0] for row in rows], [row[1] for row in rows])
+        save_tree(model.compiled[0], self.path)
+        loaded = load_tree(self.path)
+        X = np.array([[x / 7] for x in range(70)])
+        np.testing.assert_array_equal(loaded.predict_value(X),
+                                      model.compiled[0].predict_value(X))
+        node = loaded.to_node()
+        for row in X[::10].tolist():
+            self.assertEqual(classify(row, node).value,
+                             classify(row, model.trees[0]).value)
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a tree file')
+        with self.assertRaises(ValueError):
+            load_tree(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
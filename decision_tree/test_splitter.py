@@ -0,0 +1,182 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from benchmark import synthetic_dataset
+from criteria import MSE
+from criteria import Gini
+from criteria import gini_impurity
+from dataset import Dataset
+from decision_tree import Leaf
+from decision_tree import Question
+from decision_tree import build_tree
+from decision_tree import classify
+from decision_tree import find_best_split
+from decision_tree import majority_vote
+from decision_tree import partition
+from splitter import PARALLEL_MIN_ROWS
+from splitter import category_split
+from splitter import histogram
+
+
+class TestGiniImpurity(unittest.TestCase):
+    def test_gini_impurity(self):
+        counts = np.array([[2, 0], [1, 1], [0, 0]])
+        np.testing.assert_array_equal(gini_impurity(counts), [0, 0.5, 0])
+
+
+class TestHistogram(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        X = np.column_stack([rng.normal(size=500),
+                             rng.randint(0, 4, size=500)])
+        y = (X[:, 0] + rng.normal(scale=0.5, size=500) > 0).astype(int)
+        self.data = Dataset(X, y, ['no', 'yes'], [None, list('abcd')])
+
+    def test_bins(self):
+        binned = self.data.binned(16)
+        self.assertLessEqual(len(binned.bin_values[0]), 16)
+        self.assertEqual(len(binned.bin_values[1]), 4)
+        for b, edge in enumerate(binned.bin_values[0]):
+            np.testing.assert_array_equal(binned.bins[:, 0] >= b,
+                                          binned.X[:, 0] >= edge)
+
+    def test_sibling_subtraction(self):
+        binned = self.data.binned(16)
+        trues, falses = partition(binned, Question(1, 'b'))
+        np.testing.assert_array_equal(histogram(binned) - histogram(trues),
+                                      histogram(falses))
+
+    def test_enough_bins_is_exact(self):
+        exact_question, exact_gain = find_best_split(self.data)
+        question, gain = find_best_split(self.data.binned(1000))
+        self.assertEqual(question.column, exact_question.column)
+        self.assertEqual(question.value, exact_question.value)
+        self.assertAlmostEqual(gain, exact_gain)
+
+    def test_build_tree(self):
+        exact = build_tree(self.data)
+        binned = build_tree(self.data, max_bins=1000)
+        self.assertEqual(
+            [majority_vote(leaf) for leaf in classify(self.data, binned)],
+            [majority_vote(leaf) for leaf in classify(self.data, exact)])
+
+
+def brute_force_subset_gain(stats, criterion):
+    """Best gain of all the subsets of the categories."""
+    totals = stats.sum(axis=0)
+    current = criterion.impurity(totals)
+    n_total = criterion.n_rows(totals)
+    best = 0
+    for size in range(1, len(stats)):
+        for subset in itertools.combinations(range(len(stats)), size):
+            trues = stats[list(subset)].sum(axis=0)
+            p = criterion.n_rows(trues) / n_total
+            best = max(best, current - p * criterion.impurity(trues)
+                       - (1 - p) * criterion.impurity(totals - trues))
+    return best
+
+
+class TestCategorySubsets(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.codes = np.arange(7)
+        self.rng = rng
+        X = rng.randint(0, 300, size=(3000, 1)).astype(float)
+        rates = rng.uniform(size=300)
+        y = (rng.uniform(size=3000) < rates[X[:, 0].astype(int)]).astype(int)
+        X[rng.uniform(size=3000) < 0.05] = np.nan
+        self.data = Dataset(X, y, ['no', 'yes'],
+                            [[f'sku{i}' for i in range(300)]])
+
+    def test_breiman_binary(self):
+        for _ in range(5):
+            stats = self.rng.randint(1, 20, size=(7, 2))
+            current = float(Gini.impurity(stats.sum(axis=0)))
+            codes, gain, _ = category_split(self.codes, stats, current,
+                                            subsets=True)
+            self.assertAlmostEqual(gain, brute_force_subset_gain(stats, Gini))
+
+    def test_breiman_regression(self):
+        for _ in range(5):
+            groups = self.rng.randint(0, 7, size=200)
+            targets = self.rng.normal(size=7)[groups] + self.rng.normal(
+                size=200)
+            stats = MSE.statistics(groups, 7, targets, 0)
+            current = float(MSE.impurity(stats.sum(axis=0)))
+            codes, gain, _ = category_split(self.codes, stats, current,
+                                            criterion=MSE, subsets=True)
+            self.assertAlmostEqual(gain, brute_force_subset_gain(stats, MSE))
+
+    def test_max_categories(self):
+        stats = np.array([[50, 0], [0, 40], [1, 0], [0, 1], [1, 1]])
+        current = float(Gini.impurity(stats.sum(axis=0)))
+        codes, _, _ = category_split(self.codes[:5], stats, current,
+                                     max_categories=3)
+        self.assertIn(list(codes), [[0], [1], [2, 3, 4]])
+        codes, _, _ = category_split(self.codes[:5], stats, current,
+                                     subsets=True, max_categories=3)
+        self.assertIn(list(codes), [[0], [1, 2, 3, 4], [0, 2, 3, 4], [1]])
+
+    def test_subset_question(self):
+        question, gain = find_best_split(self.data, categorical_subsets=True)
+        _, equality_gain = find_best_split(self.data)
+        self.assertIsInstance(question.value, frozenset)
+        self.assertGreater(gain, equality_gain)
+        matches = self.data.match(0, question.value, question.missing)
+        rows = self.data.X[:, 0]
+        for value, match in zip(rows[:50], matches[:50]):
+            row = [None if np.isnan(value) else f'sku{int(value)}']
+            self.assertEqual(question.match(row), match)
+
+    def test_histogram_subsets(self):
+        exact, exact_gain = find_best_split(self.data,
+                                            categorical_subsets=True)
+        question, gain = find_best_split(self.data.binned(16),
+                                         categorical_subsets=True)
+        self.assertEqual(question.value, exact.value)
+        self.assertAlmostEqual(gain, exact_gain)
+
+    def test_build_tree(self):
+        def accuracy(tree):
+            votes = [majority_vote(leaf) for leaf in classify(self.data, tree)]
+            return np.mean(np.array(votes) == np.array(self.data.classes)[
+                self.data.y])
+
+        equality = build_tree(self.data, max_depth=2)
+        subsets = build_tree(self.data, max_depth=2, categorical_subsets=True)
+        pooled = build_tree(self.data, max_depth=2, categorical_subsets=True,
+                            max_categories=50)
+        self.assertGreater(accuracy(subsets), accuracy(equality))
+        self.assertGreater(accuracy(pooled), accuracy(equality))
+
+
+def same_questions(node, other):
+    """Whether two trees ask the same questions."""
+    if isinstance(node, Leaf):
+        return isinstance(other, Leaf)
+    return (not isinstance(other, Leaf)
+            and node.question.column == other.question.column
+            and node.question.value == other.question.value
+            and same_questions(node.true_branch, other.true_branch)
+            and same_questions(node.false_branch, other.false_branch))
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.data = synthetic_dataset(2 * PARALLEL_MIN_ROWS, 6, n_classes=3)
+
+    def test_same_tree(self):
+        serial = build_tree(self.data, max_depth=4)
+        parallel = build_tree(self.data, max_depth=4, n_jobs=3)
+        self.assertTrue(same_questions(serial, parallel))
+
+    def test_same_binned_tree(self):
+        serial = build_tree(self.data, max_depth=4, max_bins=32)
+        parallel = build_tree(self.data, max_depth=4, max_bins=32, n_jobs=-1)
+        self.assertTrue(same_questions(serial, parallel))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Fixtures shared by the unit tests."""
+import random
+
+from decision_tree import classify
+from decision_tree import majority_vote
+
+
+def mixed_rows(n_rows=300, seed=0, missing=False):
+    """Random instances of a float, a letter and an integer feature,
+    labelled 'x', 'y' or 'z' at random.
+
+    Parameters
+    ----------
+    n_rows: int
+        number of instances (default to 300)
+    seed: int
+        seed of the random generator (default to 0)
+    missing: bool
+        whether every tenth instance misses one of its features (default
+        to False)
+
+    Returns
+    -------
+    list
+        the instances, their class names last
+    """
+    rng = random.Random(seed)
+    rows = [[rng.random(), rng.choice('abcd'), rng.randint(0, 3),
+             rng.choice('xyz')] for _ in range(n_rows)]
+    if missing:
+        for row in rows[::10]:
+            row[rng.randint(0, 2)] = None
+    return rows
+
+
+def leaves(node):
+    """List the leaves of a tree, from left to right."""
+    stack, found = [node], []
+    while stack:
+        node = stack.pop()
+        if hasattr(node, 'question'):
+            stack.extend([node.false_branch, node.true_branch])
+        else:
+            found.append(node)
+    return found
+
+
+def predictions(tree, rows):
+    """Class voted by the leaf of every instance of a tree."""
+    return [majority_vote(classify(row, tree)) for row in rows]
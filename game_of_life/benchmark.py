@@ -0,0 +1,113 @@
+"""Benchmarks of the engines of game of life.
+
+Run `python benchmark.py -h` for help.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from game_of_life import GameOfLife
+
+
+def time_engine(engine, N, generations, grid, repeat=3, wrap=True):
+    """Seconds per generation of an engine, and the grid it reaches.
+
+    Parameters
+    ----------
+    engine : str
+        Name of the engine, one of GameOfLife.ENGINES.
+    N : int
+        Size of the grid.
+    generations : int
+        Number of generations run per timing.
+    grid : numpy.ndarray
+        The starting grid.
+    repeat : int, optional
+        Number of timings, the best of which is kept (default is 3).
+    wrap : bool, optional
+        Whether the grid is a torus, or the square at the origin of the
+        unbounded plane (default is True).
+
+    Returns
+    -------
+    (float, numpy.ndarray)
+        The seconds per generation and the last grid.
+    """
+    gof = GameOfLife(N, engine, wrap)
+    times = []
+    for _ in range(repeat):
+        gof._grid = grid.copy()
+        # Start the worker processes of the tiled engine untimed.
+        gof.advance(0)
+        start = time.perf_counter()
+        gof.advance(generations)
+        times.append(time.perf_counter() - start)
+    return min(times) / generations, gof._grid
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        prog='python benchmark.py',
+        description='Time a generation of every engine of game of life.'
+    )
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 300, 1000],
+                        help='Grid sizes (default is 100 300 1000).')
+    parser.add_argument('--engines', nargs='+', default=GameOfLife.ENGINES,
+                        choices=GameOfLife.ENGINES,
+                        help='Engines timed (default is all of them).')
+    parser.add_argument('--pattern', choices=('random', 'glider'),
+                        default='random',
+                        help='Starting grid: 20%% of the cells alive at '
+                             'random, or one glider in empty space '
+                             '(default is random).')
+    parser.add_argument('--unbounded', action='store_true',
+                        help='Run the engines supporting it on the '
+                             'unbounded plane instead of a torus.')
+    parser.add_argument('--generations', type=int, default=3,
+                        help='Generations per timing (default is 3).')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timings per engine, the best of which is '
+                             'kept (default is 3).')
+    parser.add_argument('--max-loop-size', type=int, default=300,
+                        help='Largest grid timed with the loop engine '
+                             '(default is 300).')
+    args = parser.parse_args()
+    if args.unbounded:
+        engines = [engine for engine in args.engines
+                   if engine in GameOfLife.UNBOUNDED_ENGINES]
+    else:
+        engines = [engine for engine in args.engines
+                   if engine not in GameOfLife.PLANE_ENGINES]
+
+    rng = np.random.RandomState(0)
+    print(f'{"N":>6}  {"engine":>8}  {"ms/gen":>10}  {"speedup":>8}')
+    for N in args.sizes:
+        if args.pattern == 'random':
+            grid = (rng.random_sample((N, N)) < 0.2).astype(int)
+        else:
+            gof = GameOfLife(N)
+            gof.set_grid('glider')
+            grid = gof._grid
+        baseline = reference = None
+        # The loop goes first, as the baseline of the speedups.
+        for engine in sorted(engines, key=lambda name: name != 'loop'):
+            if engine == 'loop' and N > args.max_loop_size:
+                continue
+            seconds, final = time_engine(engine, N, args.generations, grid,
+                                         args.repeat, not args.unbounded)
+            if reference is None:
+                reference = final
+            elif not np.array_equal(final, reference):
+                raise AssertionError(f'{engine} differs on a {N}x{N} grid')
+            if engine == 'loop':
+                baseline = seconds
+            speedup = '' if baseline is None else f'{baseline / seconds:.0f}x'
+            print(f'{N:>6}  {engine:>8}  {seconds * 1000:>10.4f}  '
+                  f'{speedup:>8}')
+
+
+if __name__ == '__main__':
+    main()
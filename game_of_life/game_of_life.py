@@ -4,10 +4,71 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 
+from hashlife import HashLife
+from packed import PackedGrid
+from sparse import SparseWorld
+from tiled import TiledWorld
+
+
+def count_neighbours(grid):
+    """Count the live neighbours of every cell of a toroidal grid.
+
+    The grid is shifted by one cell along its rows, the three copies
+    are summed, and the sum is shifted again along its columns, so the
+    eight neighbours are added in four rolls of the whole array. Rolls
+    wrap around the edges, like the modulo indexing of the loop.
+
+    Parameters
+    ----------
+    grid : numpy.ndarray
+        2D array of 0 (dead) and 1 (alive) cells.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the same shape holding the number of live neighbours
+        of every cell.
+    """
+    rows = np.roll(grid, 1, axis=0) + grid + np.roll(grid, -1, axis=0)
+    return np.roll(rows, 1, axis=1) + rows + np.roll(rows, -1, axis=1) - grid
+
+
+def step(grid):
+    """Compute the next generation of a toroidal grid.
+
+    Parameters
+    ----------
+    grid : numpy.ndarray
+        2D array of 0 (dead) and 1 (alive) cells.
+
+    Returns
+    -------
+    numpy.ndarray
+        The next generation, of the same shape and dtype.
+    """
+    total = count_neighbours(grid)
+    alive = (total == 3) | ((grid == GameOfLife.ON) & (total == 2))
+    return alive.astype(grid.dtype)
+
 
 class GameOfLife:
     """A class used to simulate Conway's game of life.
 
+    The grid wraps around its edges. Every generation is computed by an
+    engine: 'numpy' updates the whole grid at once with array
+    operations, and 'loop' visits the cells one by one in Python. The
+    'packed' engine stores 64 cells per word (see `packed`), so grids
+    of billions of cells fit in memory; its grid is only unpacked into
+    an array when read. The 'sparse' engine only stores and updates
+    the tiles around live cells that changed (see `sparse`), so its
+    cost follows the activity of the world; it also runs on the
+    unbounded plane, of which the grid shows the N x N square at the
+    origin. The 'hashlife' engine only runs on the unbounded plane, and
+    advances patterns by millions of generations at once (see
+    `hashlife`). The 'tiled' engine cuts the grid into tiles held in
+    shared memory and steps each of them in a worker process of its own
+    (see `tiled`).
+
     Methods
     -------
     set_grid(style='random')
@@ -16,6 +77,10 @@ class GameOfLife:
         Add a glider with top-left at position pos.
     update_grid()
         Update the grid once.
+    advance(generations)
+        Update the grid by some generations.
+    population()
+        Number of live cells.
     show_grid()
         Show the current status of all cells.
     show(filename=None, interval=100)
@@ -24,19 +89,61 @@ class GameOfLife:
     ON = 1
     OFF = 0
     VALUES = (ON, OFF)
+    ENGINES = ('numpy', 'loop', 'packed', 'sparse', 'hashlife', 'tiled')
+    # Engines storing the grid in a representation of their own.
+    WORLDS = {'packed': PackedGrid, 'sparse': SparseWorld,
+              'hashlife': HashLife, 'tiled': TiledWorld}
+    # Engines running on the unbounded plane, and those running on it
+    # only.
+    UNBOUNDED_ENGINES = ('sparse', 'hashlife')
+    PLANE_ENGINES = ('hashlife',)
 
-    def __init__(self, N=100):
+    def __init__(self, N=100, engine='numpy', wrap=True):
         """Initialize game of life.
 
         Parameters
         ----------
         N : int, optional
             Size of the grid (default is 100).
+        engine : str, optional
+            How generations are computed, one of ENGINES (default is
+            'numpy'). All of them give the same grids.
+        wrap : bool, optional
+            Whether the grid wraps around its edges (default is True).
+            Otherwise the world is the unbounded plane, which only the
+            engines in UNBOUNDED_ENGINES support; those in
+            PLANE_ENGINES only run on it.
         """
+        if engine not in type(self).ENGINES:
+            raise ValueError(f'unknown engine {engine!r}, expected one of '
+                             f'{type(self).ENGINES}')
+        if not wrap and engine not in type(self).UNBOUNDED_ENGINES:
+            raise ValueError(f'the {engine} engine only runs on a torus')
+        if wrap and engine in type(self).PLANE_ENGINES:
+            raise ValueError(f'the {engine} engine only runs on the '
+                             'unbounded plane')
         self._N = N
+        self._engine = engine
+        self._wrap = wrap
+        self._world = None
 
         self.set_grid()
 
+    @property
+    def _grid(self):
+        """The cells, as an int array of 0 and 1."""
+        if self._world is None:
+            return self._cells
+        return self._world.to_grid()
+
+    @_grid.setter
+    def _grid(self, grid):
+        world = type(self).WORLDS.get(self._engine)
+        if world is None:
+            self._cells = grid
+        else:
+            self._world = world.from_grid(np.asarray(grid), self._wrap)
+
     def set_grid(self, style='random'):
         """Set up the grid.
 
@@ -45,10 +152,17 @@ class GameOfLife:
         style : {'random', 'glider'}, optional
             Style of the grid (default is 'random').
         """
-        if style == 'random':
+        world = type(self).WORLDS.get(self._engine)
+        if world is not None:
+            if style == 'random':
+                self._world = world.random(self._N, 0.2, wrap=self._wrap)
+            else:
+                self._world = world.zeros(self._N, self._wrap)
+                if style == 'glider':
+                    self.add_glider((1, 1))
+        elif style == 'random':
             self._grid = np.random.choice(
-                type(self).VALUES, (self._N, self._N), (0.2, 0.8)
-            ).reshape((self._N, self._N))
+                type(self).VALUES, (self._N, self._N), p=(0.2, 0.8))
         elif style == 'glider':
             self._grid = np.zeros((self._N, self._N), dtype=int)
             self.add_glider((1, 1))
@@ -65,12 +179,45 @@ class GameOfLife:
             placed (default is (0, 0)).
         """
         row, col = pos
-        self._grid[row:row+3, col:col+3] = np.array([[0, 0, 1],
-                                                     [1, 0, 1],
-                                                     [0, 1, 1]])
+        glider = np.array([[0, 0, 1],
+                           [1, 0, 1],
+                           [0, 1, 1]])
+        if self._world is None:
+            self._grid[row:row+3, col:col+3] = glider
+        else:
+            self._world.set_block(row, col, glider)
 
     def update_grid(self):
         """Update the grid once."""
+        if self._world is not None:
+            self._world.step()
+        elif self._engine == 'numpy':
+            self._grid = step(self._grid)
+        else:
+            self._update_grid_loop()
+
+    def advance(self, generations):
+        """Update the grid by some generations.
+
+        Parameters
+        ----------
+        generations : int
+            Number of generations. The hashlife engine runs them in
+            about as many steps as their number has bits.
+        """
+        if self._world is not None:
+            self._world.step(generations)
+        else:
+            for _ in range(generations):
+                self.update_grid()
+
+    def population(self):
+        """Number of live cells."""
+        if self._world is None:
+            return int(np.count_nonzero(self._grid))
+        return self._world.population()
+
+    def _update_grid_loop(self):
         old_grid = self._grid.copy()
         N = self._N
         for i in range(N):
@@ -149,6 +296,17 @@ def main():
     )
     parser.add_argument('--glider', action='store_true', required=False,
                         help='Initialize the grid to a glider.')
+    parser.add_argument(
+        '--engine',
+        dest='engine',
+        choices=GameOfLife.ENGINES,
+        default='numpy',
+        required=False,
+        help='How generations are computed (default is numpy).'
+    )
+    parser.add_argument('--unbounded', action='store_true', required=False,
+                        help='Run on the unbounded plane instead of a torus '
+                             '(sparse and hashlife engines only).')
     parser.add_argument(
         '--interval',
         dest='interval',
@@ -167,7 +325,7 @@ def main():
     )
     args = parser.parse_args()
 
-    gof = GameOfLife(args.N)
+    gof = GameOfLife(args.N, args.engine, not args.unbounded)
     if args.glider:
         gof.set_grid('glider')
     gof.show(args.filename)
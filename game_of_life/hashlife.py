@@ -0,0 +1,457 @@
+"""HashLife: game of life on the unbounded plane, by memoized quadtrees.
+
+The plane is a quadtree: a node of level k is a square of 2^k x 2^k
+cells made of four nodes of level k - 1, and a node of level 0 is a
+cell. Nodes are canonical: all the squares holding the same cells are
+one node, found in a table keyed by the four quarters. The centre of a
+node of level k, advanced by up to 2^(k-2) generations, only depends on
+the node, so it is computed once from the centres of nine overlapping
+nodes of level k - 1 and memoized. Regular patterns then repeat the
+same few nodes in space and in time, and advancing them by 2^30
+generations takes as long as a few hundred steps.
+
+The table and the memo only grow, so once the table holds more than
+max_nodes nodes, both are emptied of everything the root does not use.
+"""
+import numpy as np
+
+# Nodes of the table above which the cache is collected.
+MAX_NODES = 1 << 20
+
+# Largest level whose cells are kept as an array by its nodes.
+ARRAY_LEVEL = 3
+
+
+class Node:
+    """A square of 2^level x 2^level cells of the plane.
+
+    Nodes are made by `HashLife.join`, which returns the one node
+    holding given quarters; never build them directly.
+
+    Attributes
+    ----------
+    nw, ne, sw, se : Node
+        The north-west, north-east, south-west and south-east quarters,
+        None for a cell.
+    level : int
+        Level of the node.
+    population : int
+        Number of live cells.
+    """
+
+    __slots__ = ('nw', 'ne', 'sw', 'se', 'level', 'population', '_cells')
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+        self._cells = None
+
+    def cells(self):
+        """The cells of a node of level ARRAY_LEVEL or less, as a uint8
+        array."""
+        if self._cells is None:
+            if self.level == 0:
+                self._cells = np.array([[self.population]], dtype=np.uint8)
+            else:
+                self._cells = np.block([[self.nw.cells(), self.ne.cells()],
+                                        [self.sw.cells(), self.se.cells()]])
+        return self._cells
+
+
+class HashLife:
+    """A world of game of life on the unbounded plane, run by HashLife.
+
+    Parameters
+    ----------
+    size : int, optional
+        Size of the square at the origin read by `to_grid` (default is
+        0).
+    max_nodes : int, optional
+        Number of nodes in the table above which the nodes and results
+        the root does not use are dropped (default is MAX_NODES).
+
+    Attributes
+    ----------
+    root : Node
+        The quadtree holding every live cell.
+    top, left : int
+        Row and column of the top-left cell of the root.
+    generation : int
+        Number of generations run.
+
+    Methods
+    -------
+    from_grid(grid, wrap=False)
+        World holding a grid of 0 and 1 at its origin.
+    zeros(N, wrap=False)
+        World of dead cells.
+    random(N, density=0.2, seed=None, wrap=False)
+        World whose N x N square at the origin is alive at random.
+    join(nw, ne, sw, se)
+        The node made of four quarters.
+    empty(level)
+        The node of dead cells of a level.
+    to_grid(top=0, left=0, height=None, width=None)
+        Cells of a window of the plane as an array of 0 and 1.
+    set_block(row, col, block)
+        Overwrite a block of cells.
+    population(top=None, left=None, height=None, width=None)
+        Number of live cells, in all the plane or in a window.
+    advance(generations)
+        Advance the world by any number of generations.
+    step(generations=1)
+        Same as advance.
+    collect()
+        Drop the nodes and results the root does not use.
+    """
+
+    def __init__(self, size=0, max_nodes=MAX_NODES):
+        self.size = size
+        self.max_nodes = max_nodes
+        self._table = {}
+        self._results = {}
+        self._threshold = max_nodes
+        self._cells = [Node(None, None, None, None, 0, 0),
+                       Node(None, None, None, None, 0, 1)]
+        self._empty = [self._cells[0]]
+        # The 16 nodes of 2 x 2 cells, bit 0 being the north-west cell,
+        # then north-east, south-west and south-east.
+        self._level1 = [self.join(*(self._cells[(code >> bit) & 1]
+                                    for bit in range(4)))
+                        for code in range(16)]
+        self.root = self.empty(ARRAY_LEVEL)
+        self.top = self.left = 0
+        self.generation = 0
+
+    @classmethod
+    def from_grid(cls, grid, wrap=False):
+        """World holding a grid of 0 and 1 at its origin.
+
+        The quadtree is built level by level from the whole grid:
+        every distinct group of four quarters is joined once, so large
+        grids load in a few vectorized passes.
+
+        Parameters
+        ----------
+        grid : numpy.ndarray
+            Square 2D array of 0 and 1 cells.
+        wrap : bool, optional
+            Must be False: HashLife runs on the unbounded plane
+            (default is False).
+        """
+        world = cls.zeros(grid.shape[0], wrap)
+        world.root = world._build(np.asarray(grid))
+        return world
+
+    @classmethod
+    def zeros(cls, N, wrap=False):
+        """World of dead cells, whose grid is its N x N square at the
+        origin."""
+        if wrap:
+            raise ValueError('HashLife only runs on the unbounded plane')
+        return cls(N)
+
+    @classmethod
+    def random(cls, N, density=0.2, seed=None, wrap=False):
+        """World whose N x N square at the origin is alive at random
+        with probability density."""
+        rng = np.random.RandomState(seed)
+        grid = rng.random_sample((N, N)) < density
+        return cls.from_grid(grid, wrap)
+
+    def join(self, nw, ne, sw, se):
+        """The node made of four quarters of the same level."""
+        key = (nw, ne, sw, se)
+        node = self._table.get(key)
+        if node is None:
+            node = Node(nw, ne, sw, se, nw.level + 1,
+                        nw.population + ne.population + sw.population
+                        + se.population)
+            self._table[key] = node
+            if len(self._table) > self._threshold:
+                self.collect()
+        return node
+
+    def empty(self, level):
+        """The node of dead cells of a level."""
+        while len(self._empty) <= level:
+            below = self._empty[-1]
+            self._empty.append(self.join(below, below, below, below))
+        return self._empty[level]
+
+    def collect(self):
+        """Drop the nodes and results the root does not use.
+
+        Nodes still used elsewhere keep working, but may no longer be
+        the one node of their cells, which only costs memoized results.
+        """
+        self._results = {}
+        table = {}
+        stack = [self.root] + self._empty + self._level1
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in table:
+                table[key] = node
+                stack.extend(key)
+        self._table = table
+        # Keep from collecting again and again a root of many nodes.
+        self._threshold = max(self.max_nodes, 2 * len(table))
+
+    def _build(self, grid):
+        """Quadtree of a grid, with its top-left cell at the origin."""
+        level = ARRAY_LEVEL
+        while (1 << level) < max(grid.shape):
+            level += 1
+        cells = np.zeros((1 << level, 1 << level), dtype=np.intp)
+        cells[:grid.shape[0], :grid.shape[1]] = grid != 0
+
+        indices = (cells[0::2, 0::2] + 2 * cells[0::2, 1::2]
+                   + 4 * cells[1::2, 0::2] + 8 * cells[1::2, 1::2])
+        nodes = self._level1
+        while indices.shape[0] > 1:
+            quarters = np.stack([indices[0::2, 0::2], indices[0::2, 1::2],
+                                 indices[1::2, 0::2], indices[1::2, 1::2]],
+                                axis=-1)
+            unique, inverse = np.unique(quarters.reshape(-1, 4), axis=0,
+                                        return_inverse=True)
+            nodes = [self.join(nodes[nw], nodes[ne], nodes[sw], nodes[se])
+                     for nw, ne, sw, se in unique]
+            indices = inverse.reshape(quarters.shape[:2])
+        self.top = self.left = 0
+        return nodes[indices[0, 0]]
+
+    def _expand(self):
+        """Double the root, keeping it at the centre."""
+        root = self.root
+        border = self.empty(root.level - 1)
+        self.top -= 1 << (root.level - 1)
+        self.left -= 1 << (root.level - 1)
+        self.root = self.join(
+            self.join(border, border, border, root.nw),
+            self.join(border, border, root.ne, border),
+            self.join(border, root.sw, border, border),
+            self.join(root.se, border, border, border))
+
+    def _covers(self, row, col, height, width):
+        size = 1 << self.root.level
+        return (self.top <= row and row + height <= self.top + size
+                and self.left <= col and col + width <= self.left + size)
+
+    def to_grid(self, top=0, left=0, height=None, width=None):
+        """Cells of a window of the plane as an int array of 0 and 1.
+
+        Only the nodes overlapping the window and holding live cells
+        are visited.
+
+        Parameters
+        ----------
+        top : int, optional
+            Row of the top-left cell of the window (default is 0).
+        left : int, optional
+            Column of the top-left cell of the window (default is 0).
+        height : int, optional
+            Number of rows of the window (default is None, which means
+            size).
+        width : int, optional
+            Number of columns of the window (default is None, which
+            means size).
+        """
+        height = self.size if height is None else height
+        width = self.size if width is None else width
+        grid = np.zeros((height, width), dtype=int)
+        stack = [(self.root, self.top - top, self.left - left)]
+        while stack:
+            node, row, col = stack.pop()
+            size = 1 << node.level
+            if (node.population == 0 or row >= height or col >= width
+                    or row + size <= 0 or col + size <= 0):
+                continue
+            if node.level <= ARRAY_LEVEL:
+                rows = slice(max(row, 0), min(row + size, height))
+                cols = slice(max(col, 0), min(col + size, width))
+                grid[rows, cols] = node.cells()[
+                    rows.start - row:rows.stop - row,
+                    cols.start - col:cols.stop - col]
+                continue
+            half = size // 2
+            stack.extend([(node.nw, row, col), (node.ne, row, col + half),
+                          (node.sw, row + half, col),
+                          (node.se, row + half, col + half)])
+        return grid
+
+    def set_block(self, row, col, block):
+        """Overwrite a block of cells.
+
+        Parameters
+        ----------
+        row : int
+            Row of the top-left cell of the block.
+        col : int
+            Column of the top-left cell of the block.
+        block : numpy.ndarray
+            2D array of 0 and 1.
+        """
+        block = np.asarray(block)
+        while not self._covers(row, col, *block.shape):
+            self._expand()
+        for i, j in np.ndindex(*block.shape):
+            self.root = self._set(self.root, row + i - self.top,
+                                  col + j - self.left, int(block[i, j] != 0))
+
+    def _set(self, node, row, col, value):
+        """Copy of a node with one cell, relative to it, set."""
+        if node.level == 0:
+            return self._cells[value]
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if row < half:
+            if col < half:
+                nw = self._set(nw, row, col, value)
+            else:
+                ne = self._set(ne, row, col - half, value)
+        elif col < half:
+            sw = self._set(sw, row - half, col, value)
+        else:
+            se = self._set(se, row - half, col - half, value)
+        return self.join(nw, ne, sw, se)
+
+    def population(self, top=None, left=None, height=None, width=None):
+        """Number of live cells, in all the plane or in a window.
+
+        The population of every node is stored in it, so only the nodes
+        crossing the border of the window are visited.
+
+        Parameters
+        ----------
+        top, left : int, optional
+            Row and column of the top-left cell of the window (default
+            is None, which means the whole plane).
+        height, width : int, optional
+            Size of the window.
+        """
+        if top is None:
+            return self.root.population
+        total = 0
+        stack = [(self.root, self.top - top, self.left - left)]
+        while stack:
+            node, row, col = stack.pop()
+            size = 1 << node.level
+            if (node.population == 0 or row >= height or col >= width
+                    or row + size <= 0 or col + size <= 0):
+                continue
+            if (row >= 0 and col >= 0 and row + size <= height
+                    and col + size <= width):
+                total += node.population
+                continue
+            half = size // 2
+            stack.extend([(node.nw, row, col), (node.ne, row, col + half),
+                          (node.sw, row + half, col),
+                          (node.se, row + half, col + half)])
+        return total
+
+    def advance(self, generations):
+        """Advance the world by any number of generations.
+
+        The generations are run as powers of two, one per bit of
+        generations, each by a single memoized step of a root large
+        enough for the pattern to stay inside.
+
+        Parameters
+        ----------
+        generations : int
+            Number of generations.
+
+        Raises
+        ------
+        ValueError
+            If generations is negative, as the world cannot run
+            backwards.
+        """
+        if generations < 0:
+            raise ValueError(f'cannot advance by {generations} generations')
+        j = 0
+        while generations >> j:
+            if (generations >> j) & 1:
+                self._advance_power(j)
+            j += 1
+        self.generation += generations
+
+    def step(self, generations=1):
+        """Advance the world by some generations (default is 1)."""
+        self.advance(generations)
+
+    def _advance_power(self, j):
+        """Advance the world by 2^j generations."""
+        # Cells move at most one cell per generation, so the pattern
+        # must fit in the inner quarter of a root of level j + 3 or more
+        # to stay within the half the step returns.
+        while (self.root.level < j + 3 or self.root.population
+               != self._centre(self._centre(self.root)).population):
+            self._expand()
+        level = self.root.level
+        self.root = self._successor(self.root, j)
+        self.top += 1 << (level - 2)
+        self.left += 1 << (level - 2)
+
+    def _centre(self, node):
+        """The centre of a node, of a level less."""
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _centre_horizontal(self, west, east):
+        return self.join(west.ne, east.nw, west.se, east.sw)
+
+    def _centre_vertical(self, north, south):
+        return self.join(north.sw, north.se, south.nw, south.ne)
+
+    def _successor(self, node, j):
+        """Centre of a node, of a level less, 2^j generations later.
+
+        j is at most the level of the node minus 2.
+        """
+        if node.population == 0:
+            return self.empty(node.level - 1)
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self._base(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            nine = [nw, self._centre_horizontal(nw, ne), ne,
+                    self._centre_vertical(nw, sw), self._centre(node),
+                    self._centre_vertical(ne, se),
+                    sw, self._centre_horizontal(sw, se), se]
+            if j == node.level - 2:
+                # Half of the generations on the nine nodes, the other
+                # half on the four nodes they make up.
+                nine = [self._successor(sub, j - 1) for sub in nine]
+                j -= 1
+            else:
+                nine = [self._centre(sub) for sub in nine]
+            four = [self.join(nine[0], nine[1], nine[3], nine[4]),
+                    self.join(nine[1], nine[2], nine[4], nine[5]),
+                    self.join(nine[3], nine[4], nine[6], nine[7]),
+                    self.join(nine[4], nine[5], nine[7], nine[8])]
+            result = self.join(*[self._successor(sub, j) for sub in four])
+        self._results[key] = result
+        return result
+
+    def _base(self, node):
+        """Centre of a node of level 2 one generation later."""
+        cells = node.cells().astype(int)
+        total = (cells[:-2, :-2] + cells[:-2, 1:-1] + cells[:-2, 2:]
+                 + cells[1:-1, :-2] + cells[1:-1, 2:]
+                 + cells[2:, :-2] + cells[2:, 1:-1] + cells[2:, 2:])
+        alive = (total == 3) | ((cells[1:-1, 1:-1] == 1) & (total == 2))
+        code = (int(alive[0, 0]) + 2 * int(alive[0, 1])
+                + 4 * int(alive[1, 0]) + 8 * int(alive[1, 1]))
+        return self._level1[code]
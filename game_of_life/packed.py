@@ -0,0 +1,253 @@
+"""Bit-packed grids of game of life.
+
+Every row of the grid is stored as 64-bit words, bit j of word k
+holding the cell at column 64 * k + j, so a cell takes one bit instead
+of the eight bytes of an int array. A generation is computed on the
+words with bitwise operations: the live cells of each row and of its
+two horizontal shifts are added into a 2-bit sum per cell, and the sums
+of the rows above, at and below every cell are added into its count of
+live cells in the 3x3 block around it. A cell lives on if that count is
+3, or 4 and the cell is alive.
+
+The grid wraps around its edges, like `game_of_life.step`. The rows are
+stepped by blocks, so the temporary arrays stay small next to the grid.
+"""
+import numpy as np
+
+WORD_BITS = 64
+
+# Number of words of the blocks of rows stepped at once.
+BLOCK_WORDS = 1 << 18
+
+_ONE = np.uint64(1)
+_TOP = np.uint64(WORD_BITS - 1)
+
+# Number of bits set in every byte.
+_BYTE_COUNTS = np.array([bin(byte).count('1') for byte in range(256)],
+                        dtype=np.uint8)
+
+
+def pack(grid):
+    """Pack a grid of 0 and 1 into 64-bit words.
+
+    Parameters
+    ----------
+    grid : numpy.ndarray
+        2D array of 0 (dead) and 1 (alive) cells.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint64 array of shape (n_rows, ceil(n_cols / 64)). The bits
+        past the last column are 0.
+    """
+    n_rows, n_cols = grid.shape
+    n_words = -(-n_cols // WORD_BITS)
+    padded = np.zeros((n_rows, n_words * WORD_BITS), dtype=np.uint8)
+    padded[:, :n_cols] = grid != 0
+    packed = np.packbits(padded, axis=1, bitorder='little')
+    return packed.view('<u8').astype(np.uint64)
+
+
+def unpack(words, n_cols):
+    """Unpack 64-bit words into a grid of 0 and 1.
+
+    Parameters
+    ----------
+    words : numpy.ndarray
+        uint64 array returned by `pack`.
+    n_cols : int
+        Number of columns of the grid.
+
+    Returns
+    -------
+    numpy.ndarray
+        int array of shape (n_rows, n_cols).
+    """
+    packed = words.astype('<u8').view(np.uint8)
+    bits = np.unpackbits(packed, axis=1, count=n_cols, bitorder='little')
+    return bits.astype(int)
+
+
+def _check_wrap(wrap):
+    if not wrap:
+        raise ValueError('packed grids always wrap around their edges')
+
+
+class PackedGrid:
+    """A square grid of game of life stored as bits.
+
+    Attributes
+    ----------
+    N : int
+        Size of the grid.
+    words : numpy.ndarray
+        uint64 array of shape (N, ceil(N / 64)) holding the cells; see
+        `pack`.
+
+    Methods
+    -------
+    from_grid(grid, wrap=True)
+        Pack a grid of 0 and 1.
+    zeros(N, wrap=True)
+        Grid of dead cells.
+    random(N, density=0.2, seed=None, wrap=True)
+        Grid of cells alive at random.
+    to_grid()
+        Unpack the grid into an array of 0 and 1.
+    set_block(row, col, block)
+        Overwrite a block of cells.
+    population()
+        Number of live cells.
+    step(generations=1)
+        Advance the grid by some generations.
+    """
+
+    def __init__(self, words, N):
+        self.words = words
+        self.N = N
+        n_tail = N % WORD_BITS
+        # Bits of the last word of a row that hold cells.
+        self._tail_mask = np.uint64((1 << n_tail) - 1 if n_tail
+                                    else (1 << WORD_BITS) - 1)
+
+    @classmethod
+    def from_grid(cls, grid, wrap=True):
+        """Pack a square grid of 0 and 1."""
+        _check_wrap(wrap)
+        return cls(pack(grid), grid.shape[0])
+
+    @classmethod
+    def zeros(cls, N, wrap=True):
+        """Grid of dead cells."""
+        _check_wrap(wrap)
+        return cls(np.zeros((N, -(-N // WORD_BITS)), dtype=np.uint64), N)
+
+    @classmethod
+    def random(cls, N, density=0.2, seed=None, wrap=True):
+        """Grid of cells alive at random.
+
+        The cells are drawn by blocks of rows, so no array of the size
+        of the unpacked grid is ever made.
+
+        Parameters
+        ----------
+        N : int
+            Size of the grid.
+        density : float, optional
+            Probability of a cell to be alive (default is 0.2).
+        seed : int, optional
+            Seed of the random generator (default is None).
+        wrap : bool, optional
+            Whether the grid wraps around its edges, which packed grids
+            always do (default is True).
+        """
+        grid = cls.zeros(N, wrap)
+        rng = np.random.RandomState(seed)
+        n_rows = max(1, BLOCK_WORDS // grid.words.shape[1])
+        for start in range(0, N, n_rows):
+            stop = min(start + n_rows, N)
+            grid.words[start:stop] = pack(
+                rng.random_sample((stop - start, N)) < density)
+        return grid
+
+    def to_grid(self):
+        """Unpack the grid into an int array of 0 and 1."""
+        return unpack(self.words, self.N)
+
+    def set_block(self, row, col, block):
+        """Overwrite a block of cells.
+
+        Parameters
+        ----------
+        row : int
+            Row of the top-left cell of the block.
+        col : int
+            Column of the top-left cell of the block.
+        block : numpy.ndarray
+            2D array of 0 and 1; it must fit in the grid.
+        """
+        n_rows, n_cols = np.shape(block)
+        first, last = col // WORD_BITS, (col + n_cols - 1) // WORD_BITS
+        words = self.words[row:row + n_rows, first:last + 1]
+        cells = unpack(words, words.shape[1] * WORD_BITS)
+        offset = col - first * WORD_BITS
+        cells[:, offset:offset + n_cols] = block
+        words[...] = pack(cells)
+
+    def population(self):
+        """Number of live cells.
+
+        The bits are counted a byte at a time from a table, by blocks
+        of rows, so no array of one byte per cell is made.
+        """
+        n_rows = max(1, BLOCK_WORDS // self.words.shape[1])
+        total = 0
+        for start in range(0, self.N, n_rows):
+            block = self.words[start:start + n_rows].view(np.uint8)
+            total += int(_BYTE_COUNTS[block].sum(dtype=np.int64))
+        return total
+
+    def step(self, generations=1):
+        """Advance the grid by some generations.
+
+        Parameters
+        ----------
+        generations : int, optional
+            Number of generations (default is 1).
+        """
+        N = self.N
+        n_rows = max(1, BLOCK_WORDS // self.words.shape[1])
+        out = np.empty_like(self.words)
+        for _ in range(generations):
+            for start in range(0, N, n_rows):
+                stop = min(start + n_rows, N)
+                # The block with one row more on each side, wrapped.
+                rows = np.arange(start - 1, stop + 1) % N
+                out[start:stop] = self._next_rows(self.words[rows])
+            self.words, out = out, self.words
+
+    def _shift_right(self, words):
+        """Words whose cell j is cell j - 1 of each row, wrapped."""
+        N = self.N
+        shifted = words << _ONE
+        shifted[:, 1:] |= words[:, :-1] >> _TOP
+        last = np.uint64((N - 1) % WORD_BITS)
+        shifted[:, 0] |= (words[:, (N - 1) // WORD_BITS] >> last) & _ONE
+        shifted[:, -1] &= self._tail_mask
+        return shifted
+
+    def _shift_left(self, words):
+        """Words whose cell j is cell j + 1 of each row, wrapped."""
+        N = self.N
+        shifted = words >> _ONE
+        shifted[:, :-1] |= words[:, 1:] << _TOP
+        last = np.uint64((N - 1) % WORD_BITS)
+        shifted[:, (N - 1) // WORD_BITS] |= (words[:, 0] & _ONE) << last
+        return shifted
+
+    def _next_rows(self, words):
+        """Next generation of the inner rows of a block of rows."""
+        # 2-bit sum of every cell and its left and right neighbours.
+        left, right = self._shift_left(words), self._shift_right(words)
+        low = left ^ words ^ right
+        high = (left & words) | (right & (left ^ words))
+        del left, right
+
+        # Add the sums of the rows above, at and below: the ones, then
+        # the four bits of weight 2, into the count of the 3x3 block.
+        up_low, mid_low, down_low = low[:-2], low[1:-1], low[2:]
+        ones = up_low ^ mid_low ^ down_low
+        carry = ((up_low & mid_low) | (down_low & (up_low ^ mid_low)))
+        del low, up_low, mid_low, down_low
+        up, mid, down = high[:-2], high[1:-1], high[2:]
+        pair_low, pair_high = up ^ mid, up & mid
+        other_low, other_high = down ^ carry, down & carry
+        twos = pair_low ^ other_low
+        fours = pair_high ^ other_high ^ (pair_low & other_low)
+        eights = pair_high & other_high
+
+        # The count is 3, or 4 with the cell alive.
+        alive = words[1:-1]
+        return ~eights & ((ones & twos & ~fours)
+                          | (alive & ~ones & ~twos & fours))
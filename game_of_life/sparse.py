@@ -0,0 +1,303 @@
+"""Sparse worlds of game of life, stored as tiles of live cells.
+
+The plane is cut into square tiles, and only the tiles holding a live
+cell are stored, in a dict keyed by their (row, column) position. A
+tile can only change if it, or one of its eight neighbours, changed in
+the previous generation, so every generation only recomputes the tiles
+that changed and the tiles around them. Still lifes and empty space
+then cost nothing, and a generation costs in proportion to the activity
+of the world rather than to its area.
+
+A world is either a torus of N x N cells, like `game_of_life.step`, or
+the unbounded plane, where patterns move away for ever.
+"""
+import numpy as np
+
+TILE_SIZE = 64
+
+
+def step_bordered(cells):
+    """Next generation of a block of cells, given with a border of the
+    cells around it.
+
+    Parameters
+    ----------
+    cells : numpy.ndarray
+        uint8 array of shape (height + 2, width + 2) of 0 and 1 cells.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint8 array of shape (height, width), the next generation of
+        the cells inside the border.
+    """
+    total = (cells[:-2, :-2] + cells[:-2, 1:-1] + cells[:-2, 2:]
+             + cells[1:-1, :-2] + cells[1:-1, 2:]
+             + cells[2:, :-2] + cells[2:, 1:-1] + cells[2:, 2:])
+    alive = cells[1:-1, 1:-1]
+    return ((total == 3) | ((alive == 1) & (total == 2))).astype(np.uint8)
+
+
+class SparseWorld:
+    """A world of game of life storing its live tiles only.
+
+    Parameters
+    ----------
+    N : int, optional
+        Size of the toroidal world, or None for the unbounded plane
+        (default is None).
+    tile_size : int, optional
+        Size of the square tiles (default is 64). The last row and
+        column of tiles of a torus whose size is not a multiple of it
+        are smaller.
+    size : int, optional
+        Size of the square at the origin read by `to_grid` (default is
+        None, which means N).
+
+    Attributes
+    ----------
+    tiles : dict
+        (tile row, tile column) mapped to the uint8 array of the cells
+        of the tile, for the tiles holding a live cell.
+    active : set
+        Tiles that changed in the last generation or since; the next
+        generation only looks at them and their neighbours.
+    generation : int
+        Number of generations run.
+
+    Methods
+    -------
+    from_grid(grid, wrap=True)
+        World holding a grid of 0 and 1.
+    zeros(N, wrap=True)
+        World of dead cells.
+    random(N, density=0.2, seed=None, wrap=True)
+        World of cells alive at random.
+    to_grid(top=0, left=0, height=None, width=None)
+        Cells of a window of the world as an array of 0 and 1.
+    set_block(row, col, block)
+        Overwrite a block of cells.
+    population()
+        Number of live cells.
+    step(generations=1)
+        Advance the world by some generations.
+    """
+
+    def __init__(self, N=None, tile_size=TILE_SIZE, size=None):
+        self.N = N
+        self.tile_size = tile_size
+        self.size = N if size is None else size
+        self.tiles = {}
+        self.active = set()
+        self.generation = 0
+        if N is None:
+            self._n_tiles = None
+        else:
+            self._n_tiles = -(-N // tile_size)
+
+    @classmethod
+    def from_grid(cls, grid, wrap=True):
+        """World holding a grid of 0 and 1.
+
+        Parameters
+        ----------
+        grid : numpy.ndarray
+            Square 2D array of 0 and 1 cells.
+        wrap : bool, optional
+            Whether the world is the torus of the grid, or the unbounded
+            plane with the grid at its origin (default is True).
+        """
+        world = cls.zeros(grid.shape[0], wrap)
+        world.set_block(0, 0, grid)
+        return world
+
+    @classmethod
+    def zeros(cls, N, wrap=True):
+        """World of dead cells, the torus of size N if wrap is True,
+        otherwise the plane read at its N x N square at the origin."""
+        return cls(N if wrap else None, size=N)
+
+    @classmethod
+    def random(cls, N, density=0.2, seed=None, wrap=True):
+        """World whose cells of the N x N square at the origin are alive
+        at random with probability density."""
+        world = cls.zeros(N, wrap)
+        rng = np.random.RandomState(seed)
+        size = world.tile_size
+        for row in range(0, N, size):
+            for col in range(0, N, size):
+                shape = (min(size, N - row), min(size, N - col))
+                world.set_block(row, col, rng.random_sample(shape) < density)
+        return world
+
+    def _tile_shape(self, key):
+        size = self.tile_size
+        if self.N is None:
+            return size, size
+        return (min(size, self.N - key[0] * size),
+                min(size, self.N - key[1] * size))
+
+    def _wrap(self, index):
+        """Wrap a row or column number around the torus."""
+        return index if self.N is None else index % self.N
+
+    def _wrap_tile(self, index):
+        """Wrap a tile row or column around the torus."""
+        return index if self._n_tiles is None else index % self._n_tiles
+
+    def to_grid(self, top=0, left=0, height=None, width=None):
+        """Cells of a window of the world as an int array of 0 and 1.
+
+        Parameters
+        ----------
+        top : int, optional
+            Row of the top-left cell of the window (default is 0).
+        left : int, optional
+            Column of the top-left cell of the window (default is 0).
+        height : int, optional
+            Number of rows of the window (default is None, which means
+            size).
+        width : int, optional
+            Number of columns of the window (default is None, which
+            means size).
+        """
+        height = self.size if height is None else height
+        width = self.size if width is None else width
+        grid = np.zeros((height, width), dtype=int)
+        size = self.tile_size
+        for (tile_row, tile_col), tile in self.tiles.items():
+            row, col = tile_row * size - top, tile_col * size - left
+            rows = slice(max(row, 0), min(row + tile.shape[0], height))
+            cols = slice(max(col, 0), min(col + tile.shape[1], width))
+            if rows.start < rows.stop and cols.start < cols.stop:
+                grid[rows, cols] = tile[rows.start - row:rows.stop - row,
+                                        cols.start - col:cols.stop - col]
+        return grid
+
+    def set_block(self, row, col, block):
+        """Overwrite a block of cells.
+
+        Parameters
+        ----------
+        row : int
+            Row of the top-left cell of the block.
+        col : int
+            Column of the top-left cell of the block.
+        block : numpy.ndarray
+            2D array of 0 and 1; on a torus, it must fit in the grid.
+        """
+        block = np.asarray(block)
+        size = self.tile_size
+        n_rows, n_cols = block.shape
+        for tile_row in range(row // size, (row + n_rows - 1) // size + 1):
+            for tile_col in range(col // size,
+                                  (col + n_cols - 1) // size + 1):
+                key = (tile_row, tile_col)
+                old = self.tiles.get(key)
+                if old is None:
+                    tile = np.zeros(self._tile_shape(key), dtype=np.uint8)
+                else:
+                    tile = old.copy()
+                top, left = tile_row * size, tile_col * size
+                rows = slice(max(row, top), min(row + n_rows,
+                                                top + tile.shape[0]))
+                cols = slice(max(col, left), min(col + n_cols,
+                                                 left + tile.shape[1]))
+                tile[rows.start - top:rows.stop - top,
+                     cols.start - left:cols.stop - left] = block[
+                    rows.start - row:rows.stop - row,
+                    cols.start - col:cols.stop - col] != 0
+                if self._changed(old, tile):
+                    self._store(key, tile)
+                    self.active.add(key)
+
+    @staticmethod
+    def _changed(old, tile):
+        """Whether a tile differs from its old cells, None if empty."""
+        if old is None:
+            return bool(tile.any())
+        return not np.array_equal(old, tile)
+
+    def _store(self, key, tile):
+        if tile.any():
+            self.tiles[key] = tile
+        else:
+            self.tiles.pop(key, None)
+
+    def population(self):
+        """Number of live cells."""
+        return sum(int(np.count_nonzero(tile))
+                   for tile in self.tiles.values())
+
+    def step(self, generations=1):
+        """Advance the world by some generations.
+
+        Parameters
+        ----------
+        generations : int, optional
+            Number of generations (default is 1).
+        """
+        for _ in range(generations):
+            candidates = set()
+            for tile_row, tile_col in self.active:
+                for d_row in (-1, 0, 1):
+                    for d_col in (-1, 0, 1):
+                        candidates.add((self._wrap_tile(tile_row + d_row),
+                                        self._wrap_tile(tile_col + d_col)))
+
+            # Compute every tile from the old generation before storing
+            # any of them.
+            changed = []
+            for key in candidates:
+                old = self.tiles.get(key)
+                new = self._next_tile(key, old)
+                if self._changed(old, new):
+                    changed.append((key, new))
+
+            for key, tile in changed:
+                self._store(key, tile)
+            self.active = {key for key, _ in changed}
+            self.generation += 1
+
+    def _row(self, row, tile_col, width):
+        """Cells of a row in a column of tiles."""
+        size = self.tile_size
+        tile = self.tiles.get((row // size, tile_col))
+        if tile is None:
+            return np.zeros(width, dtype=np.uint8)
+        return tile[row % size]
+
+    def _column(self, tile_row, col, height):
+        """Cells of a column in a row of tiles."""
+        size = self.tile_size
+        tile = self.tiles.get((tile_row, col // size))
+        if tile is None:
+            return np.zeros(height, dtype=np.uint8)
+        return tile[:, col % size]
+
+    def _cell(self, row, col):
+        size = self.tile_size
+        tile = self.tiles.get((row // size, col // size))
+        return 0 if tile is None else tile[row % size, col % size]
+
+    def _next_tile(self, key, tile):
+        """Next generation of a tile, from the cells around it."""
+        height, width = self._tile_shape(key)
+        tile_row, tile_col = key
+        top, left = tile_row * self.tile_size, tile_col * self.tile_size
+        above, below = self._wrap(top - 1), self._wrap(top + height)
+        before, after = self._wrap(left - 1), self._wrap(left + width)
+
+        # The tile with a border of the cells around it.
+        cells = np.zeros((height + 2, width + 2), dtype=np.uint8)
+        if tile is not None:
+            cells[1:-1, 1:-1] = tile
+        cells[0, 1:-1] = self._row(above, tile_col, width)
+        cells[-1, 1:-1] = self._row(below, tile_col, width)
+        cells[1:-1, 0] = self._column(tile_row, before, height)
+        cells[1:-1, -1] = self._column(tile_row, after, height)
+        cells[0, 0] = self._cell(above, before)
+        cells[0, -1] = self._cell(above, after)
+        cells[-1, 0] = self._cell(below, before)
+        cells[-1, -1] = self._cell(below, after)
+        return step_bordered(cells)
@@ -0,0 +1,168 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from game_of_life import GameOfLife
+from game_of_life import step
+from hashlife import HashLife
+from packed import PackedGrid
+from sparse import SparseWorld
+from tiled import TiledWorld
+
+
+def random_grid(N, seed=0, density=0.3):
+    rng = np.random.RandomState(seed)
+    return (rng.random_sample((N, N)) < density).astype(int)
+
+
+def steps(grid, generations):
+    for _ in range(generations):
+        grid = step(grid)
+    return grid
+
+
+class TestTorusEngines(unittest.TestCase):
+    # Sizes which are not multiples of the 64 cells of a word or a tile.
+    SIZES = (65, 130)
+
+    def test_engines(self):
+        for N in self.SIZES:
+            grid = random_grid(N, N)
+            expected = steps(grid, 5)
+            for engine in GameOfLife.ENGINES:
+                if engine in GameOfLife.PLANE_ENGINES:
+                    continue
+                with self.subTest(N=N, engine=engine):
+                    gof = GameOfLife(N, engine)
+                    gof._grid = grid.copy()
+                    gof.update_grid()
+                    np.testing.assert_array_equal(gof._grid, step(grid))
+                    gof.advance(4)
+                    np.testing.assert_array_equal(gof._grid, expected)
+                    self.assertEqual(gof.population(), expected.sum())
+
+    def test_glider_crosses_edges(self):
+        N = 65
+        gof = GameOfLife(N)
+        gof.set_grid('glider')
+        grid = gof._grid
+        # A glider moves one cell diagonally every 4 generations, so it
+        # crosses both edges and comes back in 4 * N generations.
+        for world in (PackedGrid, SparseWorld, TiledWorld):
+            with self.subTest(world=world.__name__):
+                gof = world.from_grid(grid)
+                gof.step(4 * N)
+                np.testing.assert_array_equal(gof.to_grid(), grid)
+
+    def test_wrap(self):
+        for world in (PackedGrid, TiledWorld):
+            with self.assertRaises(ValueError):
+                world.zeros(10, wrap=False)
+        with self.assertRaises(ValueError):
+            HashLife.zeros(10, wrap=True)
+        with self.assertRaises(ValueError):
+            GameOfLife(10, 'numpy', wrap=False)
+
+    def test_packed(self):
+        for N in (1, 63, 64) + self.SIZES:
+            grid = random_grid(N, N)
+            world = PackedGrid.from_grid(grid)
+            np.testing.assert_array_equal(world.to_grid(), grid)
+            self.assertEqual(world.population(), grid.sum())
+            world.set_block(N // 2, N // 3, np.ones((N // 2, N // 3)))
+            grid[N // 2:N // 2 * 2, N // 3:N // 3 * 2] = 1
+            np.testing.assert_array_equal(world.to_grid(), grid)
+
+
+class TestTiledWorld(unittest.TestCase):
+    def test_layouts(self):
+        for N in (65, 130):
+            grid = random_grid(N, N)
+            expected = steps(grid, 7)
+            for tiles in ((2, 1), (2, 2), (1, 3)):
+                with self.subTest(N=N, tiles=tiles):
+                    world = TiledWorld(N, tiles)
+                    world.set_block(0, 0, grid)
+                    try:
+                        world.step(3)
+                        world.step(4)
+                        np.testing.assert_array_equal(world.to_grid(),
+                                                      expected)
+                    finally:
+                        world.close()
+
+    def test_restart(self):
+        grid = random_grid(20)
+        world = TiledWorld(20, (2, 2))
+        world.set_block(0, 0, grid)
+        world.step(2)
+        world.close()
+        world.step(3)
+        world.close()
+        np.testing.assert_array_equal(world.to_grid(), steps(grid, 5))
+
+    def test_dead_worker(self):
+        grid = random_grid(20)
+        world = TiledWorld(20, (2, 1), timeout=1)
+        world.set_block(0, 0, grid)
+        world.step(2)
+        process = world._processes[0]
+        process.kill()
+        process.join()
+        with self.assertRaises(RuntimeError):
+            world.step(3)
+        # The grid keeps the last generation of all the tiles, and the
+        # workers restart on the next step.
+        np.testing.assert_array_equal(world.to_grid(), steps(grid, 2))
+        world.step(1)
+        world.close()
+        np.testing.assert_array_equal(world.to_grid(), steps(grid, 3))
+
+    def test_too_many_tiles(self):
+        with self.assertRaises(ValueError):
+            TiledWorld(3, (4, 1))
+
+
+class TestPlane(unittest.TestCase):
+    def setUp(self):
+        self.grid = random_grid(32, 1, 0.4)
+        # A window large enough for whatever leaves the soup.
+        self.window = (-200, -200, 432, 432)
+
+    def test_sparse_against_hashlife(self):
+        sparse = SparseWorld.from_grid(self.grid, wrap=False)
+        hashlife = HashLife.from_grid(self.grid)
+        for generations in (1, 7, 64, 200):
+            sparse.step(generations)
+            hashlife.advance(generations)
+            np.testing.assert_array_equal(sparse.to_grid(*self.window),
+                                          hashlife.to_grid(*self.window))
+            self.assertEqual(sparse.population(), hashlife.population())
+            self.assertEqual(hashlife.population(*self.window),
+                             hashlife.population())
+
+    def test_hashlife_collect(self):
+        expected = HashLife.from_grid(self.grid)
+        expected.advance(100)
+        world = HashLife(32, max_nodes=2048)
+        world.set_block(0, 0, self.grid)
+        with mock.patch.object(world, 'collect',
+                               wraps=world.collect) as collect:
+            world.advance(100)
+        self.assertGreater(collect.call_count, 0)
+        np.testing.assert_array_equal(world.to_grid(*self.window),
+                                      expected.to_grid(*self.window))
+        self.assertEqual(world.population(), expected.population())
+
+    def test_negative_generations(self):
+        world = HashLife.from_grid(random_grid(8))
+        with self.assertRaises(ValueError):
+            world.advance(-1)
+        with self.assertRaises(ValueError):
+            world.step(-3)
+        self.assertEqual(world.generation, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
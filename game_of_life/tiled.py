@@ -0,0 +1,301 @@
+"""Toroidal grids of game of life stepped by worker processes.
+
+The grid is held twice in shared memory, as the current generation and
+the next one, and cut into tiles: horizontal strips by default, or a 2D
+layout of rows and columns of tiles. Every tile is stepped by a worker
+process of its own, which reads its tile with a halo of one cell from
+the current grid, halo cells being read straight from the tiles of its
+neighbours, and writes the next generation of the tile into the other
+grid. The main process hands every generation to the workers through
+pipes and waits for all of them to be done before the next one, so no
+tile is read before all of them are written, and the two grids then
+swap roles. A worker that dies closes its pipe, and one that hangs
+misses a timeout, so either fails the step instead of blocking it for
+ever.
+
+The grid wraps around its edges, like `game_of_life.step`, and every
+generation is the same whatever the tiles.
+"""
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+import weakref
+
+import numpy as np
+
+from sparse import step_bordered
+
+# Number of rows of the blocks of random cells drawn at once.
+BLOCK_ROWS = 1024
+
+# Seconds a generation may take before the workers are deemed dead.
+TIMEOUT = 60.0
+
+
+def _edges(N, n_tiles):
+    """Boundaries of n_tiles nearly equal slices of range(N)."""
+    return [N * i // n_tiles for i in range(n_tiles + 1)]
+
+
+def _halo(N, start, stop):
+    """Rows or columns start - 1 to stop of a torus of size N."""
+    return np.arange(start - 1, stop + 1) % N
+
+
+def _step_tile(grids, current, N, bounds):
+    """Write the next generation of a tile into the other grid."""
+    top, bottom, left, right = bounds
+    cells = grids[current][np.ix_(_halo(N, top, bottom),
+                                  _halo(N, left, right))]
+    grids[1 - current][top:bottom, left:right] = step_bordered(cells)
+
+
+def _worker(buffers, N, bounds, connection):
+    """Step a tile whenever the main process asks for a generation.
+
+    The worker receives the index of the grid holding the current
+    generation, and answers once the tile is stepped. It returns when
+    the main process closes its end of the pipe.
+
+    Parameters
+    ----------
+    buffers : tuple of multiprocessing.RawArray
+        The two shared grids.
+    N : int
+        Size of the grid.
+    bounds : tuple of int
+        (top, bottom, left, right) rows and columns of the tile.
+    connection : multiprocessing.connection.Connection
+        The worker's end of its pipe to the main process.
+    """
+    grids = [np.frombuffer(buffer, dtype=np.uint8).reshape(N, N)
+             for buffer in buffers]
+    while True:
+        try:
+            current = connection.recv()
+        except EOFError:
+            return
+        _step_tile(grids, current, N, bounds)
+        connection.send(None)
+
+
+def _stop(processes, connections):
+    for connection in connections:
+        connection.close()
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+def _check_wrap(wrap):
+    if not wrap:
+        raise ValueError('tiled grids always wrap around their edges')
+
+
+class TiledWorld:
+    """A square toroidal grid of game of life stepped by processes.
+
+    Parameters
+    ----------
+    N : int
+        Size of the grid.
+    tiles : tuple of int, optional
+        Number of rows and columns of tiles, one worker process per
+        tile (default is None, which means one strip of rows per CPU,
+        or per row if there are fewer rows). A single tile is stepped
+        in the main process.
+    timeout : float, optional
+        Seconds a generation may take before the worker processes are
+        deemed dead (default is TIMEOUT).
+
+    Attributes
+    ----------
+    N : int
+        Size of the grid.
+    tiles : tuple of int
+        Number of rows and columns of tiles.
+    cells : numpy.ndarray
+        uint8 array of shape (N, N) of the current generation, in
+        shared memory.
+
+    Methods
+    -------
+    from_grid(grid, wrap=True)
+        Grid holding an array of 0 and 1.
+    zeros(N, wrap=True)
+        Grid of dead cells.
+    random(N, density=0.2, seed=None, wrap=True)
+        Grid of cells alive at random.
+    to_grid()
+        The cells as an array of 0 and 1.
+    set_block(row, col, block)
+        Overwrite a block of cells.
+    population()
+        Number of live cells.
+    step(generations=1)
+        Advance the grid by some generations.
+    close()
+        Stop the worker processes.
+    """
+
+    def __init__(self, N, tiles=None, timeout=TIMEOUT):
+        if tiles is None:
+            tiles = (min(os.cpu_count() or 1, N), 1)
+        n_rows, n_cols = tiles
+        if not (1 <= n_rows <= N and 1 <= n_cols <= N):
+            raise ValueError(f'cannot cut a {N}x{N} grid into {n_rows}x'
+                             f'{n_cols} tiles')
+        self.N = N
+        self.tiles = (n_rows, n_cols)
+        self.timeout = timeout
+        self._buffers = tuple(multiprocessing.RawArray('B', N * N)
+                              for _ in range(2))
+        self._grids = [np.frombuffer(buffer, dtype=np.uint8).reshape(N, N)
+                       for buffer in self._buffers]
+        self._current = 0
+        row_edges, col_edges = _edges(N, n_rows), _edges(N, n_cols)
+        self._bounds = [(top, bottom, left, right)
+                        for top, bottom in zip(row_edges, row_edges[1:])
+                        for left, right in zip(col_edges, col_edges[1:])]
+        self._processes = []
+
+    @classmethod
+    def from_grid(cls, grid, wrap=True):
+        """Grid holding a square array of 0 and 1."""
+        world = cls.zeros(grid.shape[0], wrap)
+        world.set_block(0, 0, grid)
+        return world
+
+    @classmethod
+    def zeros(cls, N, wrap=True):
+        """Grid of dead cells."""
+        _check_wrap(wrap)
+        return cls(N)
+
+    @classmethod
+    def random(cls, N, density=0.2, seed=None, wrap=True):
+        """Grid of cells alive at random.
+
+        Parameters
+        ----------
+        N : int
+            Size of the grid.
+        density : float, optional
+            Probability of a cell to be alive (default is 0.2).
+        seed : int, optional
+            Seed of the random generator (default is None).
+        wrap : bool, optional
+            Whether the grid wraps around its edges, which tiled grids
+            always do (default is True).
+        """
+        world = cls.zeros(N, wrap)
+        rng = np.random.RandomState(seed)
+        for start in range(0, N, BLOCK_ROWS):
+            stop = min(start + BLOCK_ROWS, N)
+            world.cells[start:stop] = (
+                rng.random_sample((stop - start, N)) < density)
+        return world
+
+    @property
+    def cells(self):
+        """The uint8 array of the current generation."""
+        return self._grids[self._current]
+
+    def to_grid(self):
+        """The cells as an int array of 0 and 1."""
+        return self.cells.astype(int)
+
+    def set_block(self, row, col, block):
+        """Overwrite a block of cells.
+
+        Parameters
+        ----------
+        row : int
+            Row of the top-left cell of the block.
+        col : int
+            Column of the top-left cell of the block.
+        block : numpy.ndarray
+            2D array of 0 and 1; it must fit in the grid.
+        """
+        block = np.asarray(block)
+        n_rows, n_cols = block.shape
+        self.cells[row:row + n_rows, col:col + n_cols] = block != 0
+
+    def population(self):
+        """Number of live cells."""
+        return int(np.count_nonzero(self.cells))
+
+    def step(self, generations=1):
+        """Advance the grid by some generations.
+
+        Parameters
+        ----------
+        generations : int, optional
+            Number of generations (default is 1). The worker processes
+            start on the first call, even for 0 generations.
+
+        Raises
+        ------
+        RuntimeError
+            If a worker process failed, or a generation took longer
+            than timeout. The workers are stopped, and the grid holds
+            the last generation they all finished.
+        """
+        if len(self._bounds) == 1:
+            for _ in range(generations):
+                _step_tile(self._grids, self._current, self.N,
+                           self._bounds[0])
+                self._current = 1 - self._current
+            return
+        if not self._processes:
+            self._start()
+        try:
+            for _ in range(generations):
+                for connection in self._connections:
+                    connection.send(self._current)
+                self._wait()
+                self._current = 1 - self._current
+        except (OSError, EOFError, TimeoutError) as error:
+            self.close()
+            raise RuntimeError('a worker process of the tiled grid failed '
+                               'or timed out') from error
+
+    def _wait(self):
+        """Wait for every worker to be done with a generation."""
+        pending = list(self._connections)
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            ready = multiprocessing.connection.wait(
+                pending, max(deadline - time.monotonic(), 0))
+            if not ready:
+                raise TimeoutError(f'a generation took more than '
+                                   f'{self.timeout} s')
+            for connection in ready:
+                # Raises EOFError if the worker died.
+                connection.recv()
+                pending.remove(connection)
+
+    def _start(self):
+        """Start a worker process per tile."""
+        self._connections = []
+        for bounds in self._bounds:
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(self._buffers, self.N, bounds, worker_connection),
+                daemon=True)
+            process.start()
+            # Only the worker holds its end, so the pipe closes when it
+            # dies.
+            worker_connection.close()
+            self._processes.append(process)
+            self._connections.append(connection)
+        self._finalizer = weakref.finalize(self, _stop, self._processes,
+                                           self._connections)
+
+    def close(self):
+        """Stop the worker processes; they restart on the next step."""
+        if self._processes:
+            self._finalizer()
+            self._processes = []